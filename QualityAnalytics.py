@@ -0,0 +1,163 @@
+"""
+Description: Statistics across many urban areas at once, such as whether the Housing score follows the median salary
+of a job. The data of the urban areas is put into a table with a row for every urban area and a column for every
+feature (quality of life scores, salary percentiles and cost of living items), with NaN where an urban area has no
+value. Correlations and straight line fits between every pair of columns are worked out in one pass of matrix products,
+each pair using the urban areas that have both values, so missing values need no loops.
+"""
+
+import numpy as np
+
+_MIN_PAIRS = 3  # fewer urban areas than this with both values gives no correlation
+
+
+class FeatureTable:
+    """Values of many features for many urban areas, aligned into one matrix."""
+
+    def __init__(self, areas, features, values):
+        """creates a table
+
+        :param areas: a list of strings of urban areas, one per row
+        :param features: a list of strings naming the features, one per column
+        :param values: a matrix with a row for every urban area and a column for every feature, NaN where missing
+        """
+        self.areas = list(areas)
+        self.features = list(features)
+        self.values = np.asarray(values, dtype=float).reshape(len(self.areas), len(self.features))
+
+    def column(self, feature):
+        """gets the values of one feature
+
+        :param feature: a string naming the feature
+        :return: an array with a value for every urban area, NaN where missing
+        """
+        return self.values[:, self.features.index(feature)]
+
+    def select(self, features):
+        """makes a table with only some of the features
+
+        :param features: a list of strings naming the features to keep
+        :return: a FeatureTable
+        """
+        columns = [self.features.index(f) for f in features]
+        return FeatureTable(self.areas, features, self.values[:, columns])
+
+    @staticmethod
+    def join(tables):
+        """puts the columns of tables for the same urban areas side by side
+
+        :param tables: a list of FeatureTables with the same urban areas in the same order
+        :return: a FeatureTable
+        """
+        features = [f for t in tables for f in t.features]
+        values = np.hstack([t.values for t in tables]) if tables else np.empty((0, 0))
+        return FeatureTable(tables[0].areas if tables else [], features, values)
+
+
+def _pairSums(values):
+    """works out the sums needed for the statistics of every pair of columns, each pair over the rows that have both
+
+    :param values: a matrix with NaN where values are missing
+    :return: a tuple of matrices (n, mean of column i, mean of column j, variance of i, variance of j, covariance), each
+    with a row for column i and a column for column j, and NaN where a pair has fewer than _MIN_PAIRS rows
+    """
+    present = ~np.isnan(values)
+    x = np.where(present, values, 0.0)
+    m = present.astype(float)
+
+    n = m.T @ m  # rows with both i and j
+    sumI = x.T @ m  # sum of column i over the rows that also have j
+    sumII = (x * x).T @ m
+    sumIJ = x.T @ x
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        enough = n >= _MIN_PAIRS
+        n = np.where(enough, n, np.nan)
+        meanI = sumI / n
+        meanJ = meanI.T
+        varI = sumII / n - meanI ** 2
+        varJ = varI.T
+        cov = sumIJ / n - meanI * meanJ
+    return n, meanI, meanJ, np.clip(varI, 0, None), np.clip(varJ, 0, None), cov
+
+
+def correlate(table):
+    """works out the Pearson correlation between every pair of features
+
+    :param table: a FeatureTable
+    :return: a tuple containing (matrix of correlations from -1 to 1, NaN where a pair has too few urban areas or a
+    feature does not vary, matrix of the number of urban areas each correlation uses)
+    """
+    n, _, _, varI, varJ, cov = _pairSums(table.values)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        r = cov / np.sqrt(varI * varJ)
+    r[~np.isfinite(r)] = np.nan
+    return np.clip(r, -1, 1), np.nan_to_num(n).astype(int)
+
+
+def regress(table, x):
+    """fits a straight line for every feature against one feature, y = slope * x + intercept, by least squares
+
+    :param table: a FeatureTable
+    :param x: a string naming the feature used as x
+    :return: a dictionary with the other features as keys and tuples containing (slope, intercept, r squared, number
+    of urban areas used) as values, NaN where a fit cannot be made
+    """
+    n, meanI, meanJ, varI, varJ, cov = _pairSums(table.values)
+    i = table.features.index(x)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        slope = cov[i] / varI[i]
+        intercept = meanJ[i] - slope * meanI[i]
+        r2 = cov[i] ** 2 / (varI[i] * varJ[i])
+    for values in (slope, intercept, r2):
+        values[~np.isfinite(values)] = np.nan
+
+    return {f: (float(slope[j]), float(intercept[j]), float(r2[j]), int(np.nan_to_num(n[i, j])))
+            for j, f in enumerate(table.features) if j != i}
+
+
+def drawCorrelations(ax, table):
+    """draws the correlations between every pair of features as a heat map
+
+    :param ax: the axes to draw on
+    :param table: a FeatureTable
+    :return: the image drawn, for a colour bar
+    """
+    r, _ = correlate(table)
+    image = ax.imshow(np.ma.masked_invalid(r), cmap='RdBu_r', vmin=-1, vmax=1)
+    ticks = np.arange(len(table.features))
+    ax.set_xticks(ticks)
+    ax.set_xticklabels(table.features, rotation=90, fontsize=7)
+    ax.set_yticks(ticks)
+    ax.set_yticklabels(table.features, fontsize=7)
+    return image
+
+
+def drawScatter(ax, table, x, y, highlight=()):
+    """draws one feature against another for every urban area that has both, with the fitted straight line
+
+    :param ax: the axes to draw on
+    :param table: a FeatureTable
+    :param x: a string naming the feature across
+    :param y: a string naming the feature up
+    :param highlight: a list of strings of urban areas to name on the plot
+    :return: a tuple containing (slope, intercept, r squared, number of urban areas), see regress()
+    """
+    xs, ys = table.column(x), table.column(y)
+    both = ~(np.isnan(xs) | np.isnan(ys))
+    ax.scatter(xs[both], ys[both], s=12, alpha=0.7, zorder=3)
+    fit = regress(table.select([x, y]), x)[y]
+    slope, intercept = fit[0], fit[1]
+    if np.isfinite(slope):
+        ends = np.array([np.nanmin(xs[both]), np.nanmax(xs[both])])
+        ax.plot(ends, slope * ends + intercept, color='C3', zorder=4)
+
+    positions = {a: i for i, a in enumerate(table.areas)}
+    for a in highlight:
+        i = positions.get(a)
+        if i is not None and both[i]:
+            ax.annotate(a, (xs[i], ys[i]), xytext=(3, 3), textcoords='offset points', fontsize=8)
+    ax.set_xlabel(x)
+    ax.set_ylabel(y)
+    ax.grid(zorder=0)
+    return fit
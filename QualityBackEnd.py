@@ -5,13 +5,921 @@ urban areas. There are methods for retrieving certain parts of the API, plotting
 and calculating distances between urban areas.
 """
 
-import requests
+import collections
 import threading
-import matplotlib.pyplot as plt
-import matplotlib.ticker as mtick
-from PIL import Image
 from io import BytesIO
 import math
+import os
+import time
+
+import QualityProfile
+
+# requests, matplotlib and PIL are heavy to import, so they are imported inside the methods that use them. This keeps
+# the start up of the application (and of scripts that only want the data) from paying for modules it does not need yet
+
+# the API can be pointed somewhere else (such as the stub server in benchmarks/) with the URBAN_AREAS_API environment
+# variable
+_API_URL = os.environ.get('URBAN_AREAS_API', 'https://api.teleport.org/api/')
+# world map for plotMap() and plotTrip(), which can be changed with the URBAN_AREAS_MAP environment variable. It is only
+# downloaded once, and cut into tiles kept on disk (see QualityTiles.py), so the full resolution image costs no more to
+# draw than a small one and zoomed in maps stay sharp
+_MAP_URL = os.environ.get('URBAN_AREAS_MAP',
+                          'https://upload.wikimedia.org/wikipedia/commons/8/83/Equirectangular_projection_SW.jpg')
+
+_MAX_WORKERS = 32  # the most requests that are ever sent to the API at once when retrieving data for many urban areas
+_RETRIES = 3  # how many times a request that was throttled or failed on the server is tried again
+_REQUEST_TIMEOUT = 30  # seconds without an answer after which a request is given up on (and tried again)
+_CEILING_MEMORY = 60  # seconds a limit at which the API throttled is kept below, before it is probed again
+
+# the most seconds the methods comparing many urban areas wait for their pages before going on with the pages that
+# arrived, which can be changed with the URBAN_AREAS_BUDGET environment variable or UrbanAreas.setLatencyBudget()
+# (0 waits for every page). Pages that arrive later are still cached, and the refresh listeners are told about them
+_latencyBudget = float(os.environ.get('URBAN_AREAS_BUDGET', 20)) or None
+
+# charts comparing more urban areas than _BAR_LIMIT switch from one bar per area to sorted horizontal bars shown
+# _PAGE_SIZE areas at a time, and past _RANKED_LIMIT to the distribution of the values with the picked areas marked
+_BAR_LIMIT = 25
+_RANKED_LIMIT = 120
+_PAGE_SIZE = 40
+_TREND_LIMIT = 10  # lines drawn by the 'trend' view, for the urban areas that moved the most
+
+_EARTH_RADIUS = 6373  # radius of the earth in km
+_PLANE_SPEED = 926  # average cruising speed of commercial planes in km/h
+
+_RECENT_AREAS = 10  # how many recently used urban areas are remembered for prefetching
+
+_sessions = threading.local()  # one requests session per thread, so connections to the API are reused
+_recentAreas = []  # urban areas used in plots most recently, newest first, shared by every UrbanAreas object
+
+
+class _ConcurrencyController:
+    """Adjusts how many requests are sent to the API at once (additive increase, multiplicative decrease).
+
+    The limit starts small and grows by one for every successful request (slow start) until the latency starts to rise,
+    after that it grows by about a quarter for every limit's worth of successful requests. It is halved when the API
+    throttles (429) or fails (5xx), and cut by a tenth when the average latency rises well above the lowest average
+    latency seen recently. The average is compared rather than single latencies, since the time spent on this side
+    (thread scheduling, parsing) makes single latencies vary a lot. A Retry-After header pauses every request until the
+    time it gives. The limit at which the API throttled is remembered for _CEILING_MEMORY seconds, and in that time the
+    limit only grows to a fifth below it.
+    """
+
+    def __init__(self, initial=4, minimum=1, maximum=_MAX_WORKERS, latencyTolerance=1.9):
+        """creates a controller
+
+        :param initial: the number of requests allowed at once to start with
+        :param minimum: the smallest the limit can go
+        :param maximum: the largest the limit can go
+        :param latencyTolerance: how many times the lowest recent average latency is treated as congestion
+        """
+        self._limit = float(initial)
+        self._minimum = minimum
+        self._maximum = maximum
+        self._latencyTolerance = latencyTolerance
+        self._slowStart = True
+        self._inFlight = 0
+        self._baseline = None  # lowest recent average latency, in seconds, rising by 1% a second to follow a slower API
+        self._baselineAt = 0.0  # when the baseline was last updated
+        self._smoothed = None  # moving average of the latency, in seconds
+        self._lastDecrease = 0.0
+        self._pausedUntil = 0.0
+        self._ceiling = None  # limit at which the API last throttled
+        self._ceilingUntil = 0.0
+        self._throttled = 0
+        self._condition = threading.Condition()
+
+    def getLimit(self):
+        """gets the number of requests currently allowed at once
+
+        :return: an integer
+        """
+        return int(self._limit)
+
+    def getThrottled(self):
+        """gets the number of requests that were throttled or failed on the server so far
+
+        :return: an integer
+        """
+        return self._throttled
+
+    def acquire(self):
+        """waits until another request can be sent"""
+        with self._condition:
+            while True:
+                wait = self._pausedUntil - time.monotonic()
+                if wait <= 0 and self._inFlight < int(self._limit):
+                    break
+                self._condition.wait(wait if wait > 0 else None)
+            self._inFlight += 1
+
+    def release(self, latency, throttled=False, retryAfter=None):
+        """records how a request went and adjusts the limit
+
+        :param latency: how long the request took, in seconds
+        :param throttled: True if the API throttled the request or failed on the server
+        :param retryAfter: seconds to wait before any more requests, from the Retry-After header
+        """
+        with self._condition:
+            self._inFlight -= 1
+            now = time.monotonic()
+
+            if throttled:
+                self._throttled += 1
+                if retryAfter:
+                    self._pausedUntil = max(self._pausedUntil, now + retryAfter)
+                if now - self._lastDecrease >= 2 * (self._smoothed or 0):  # the first of a burst of throttled requests
+                    self._ceiling = self._limit if now >= self._ceilingUntil else min(self._ceiling, self._limit)
+                    self._ceilingUntil = now + _CEILING_MEMORY
+                self._decrease(now, 0.5)
+            else:
+                self._smoothed = latency if self._smoothed is None else 0.95 * self._smoothed + 0.05 * latency
+                drift = 1 + 0.01 * (now - self._baselineAt)
+                self._baseline = min(self._smoothed, self._baseline * drift) if self._baseline else self._smoothed
+                self._baselineAt = now
+
+                if self._smoothed > self._baseline * self._latencyTolerance:
+                    self._decrease(now, 0.9)
+                elif self._slowStart and latency > self._baseline * (1 + self._latencyTolerance) / 2:
+                    self._slowStart = False  # the latency is starting to rise, so stop doubling before it overshoots
+                elif self._slowStart:
+                    self._limit = min(self._maximum, self._limit + 1)
+                else:
+                    ceiling = self._maximum if now >= self._ceilingUntil else min(self._maximum, self._ceiling * 0.8)
+                    self._limit = max(self._limit, min(ceiling, self._limit + 0.25 / self._limit))
+
+            self._condition.notify_all()
+
+    def _decrease(self, now, factor):
+        """shrinks the limit, at most once every two round trips so that a burst of bad responses counts as one signal
+
+        Two round trips are needed for the responses to requests sent before the limit shrank to leave the average.
+        """
+        if now - self._lastDecrease < 2 * (self._smoothed or 0):
+            return
+        self._lastDecrease = now
+        self._slowStart = False
+        self._limit = max(self._minimum, self._limit * factor)
+
+
+_controller = _ConcurrencyController()  # shared by every UrbanAreas object, since they all use the same API
+
+
+def _retryAfter(page):
+    """reads the Retry-After header of a response
+
+    :param page: a requests response
+    :return: the number of seconds to wait, or None if the header is missing or can't be read
+    """
+    from email.utils import parsedate_to_datetime
+
+    value = page.headers.get('Retry-After')
+    if value is None:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def _getJson(url):
+    """retrieves a page from the API, reusing the connection of the current thread
+
+    Requests go through the concurrency controller. Requests that are throttled (429) or fail on the server (5xx) are
+    tried again up to _RETRIES times.
+
+    :param url: a string containing the url of the page
+    :return: the decoded JSON of the page
+    """
+    import requests
+
+    if not hasattr(_sessions, 'session'):
+        _sessions.session = requests.Session()
+
+    for attempt in range(_RETRIES + 1):
+        _controller.acquire()
+        start = time.monotonic()
+        try:
+            page = _sessions.session.get(url, timeout=_REQUEST_TIMEOUT)
+        except requests.RequestException:
+            _controller.release(time.monotonic() - start, throttled=True)
+            if attempt == _RETRIES:
+                raise
+            time.sleep(0.1 * 2 ** attempt)
+            continue
+        latency = time.monotonic() - start
+
+        if page.status_code == 429 or page.status_code >= 500:
+            retryAfter = _retryAfter(page)
+            _controller.release(latency, throttled=True, retryAfter=retryAfter)
+            if attempt == _RETRIES:
+                page.raise_for_status()
+            if retryAfter is None:
+                time.sleep(0.1 * 2 ** attempt)
+            continue
+
+        _controller.release(latency)
+        page.raise_for_status()
+        with QualityProfile.phase('parse', anyThread=True):
+            return page.json()
+
+
+# a page is used for _CACHE_SECONDS after it is retrieved. After that, and for up to _maxStale more seconds, the old
+# page is still handed back straight away while a fresh copy is retrieved in the background (stale-while-revalidate).
+# Past that, retrieving the page waits for the API again. Both can be set with environment variables, and the stale
+# period with UrbanAreas.setMaxStaleness(), it is 0 (off) by default
+_CACHE_SECONDS = float(os.environ.get('URBAN_AREAS_CACHE_SECONDS', 3600))
+_maxStale = float(os.environ.get('URBAN_AREAS_MAX_STALE', 0))
+_BACKGROUND_WORKERS = 4  # requests that can be open at once for pages retrieved ahead of time or revalidated
+# the most pages kept in the cache, enough for every page of the catalog. Past that the least recently used are dropped
+_CACHE_PAGES = int(os.environ.get('URBAN_AREAS_CACHE_PAGES', 2048))
+
+_cache = collections.OrderedDict()  # url -> (time retrieved, decoded JSON), least recently used first
+_pending = {}  # url -> Future of a page that is being retrieved right now
+_prefetched = {}  # url -> Future of a page queued by UrbanAreas.prefetch()
+_revalidating = set()  # urls of stale pages being retrieved again in the background
+_listeners = []  # functions called with the url of a cached page whenever its data changes
+_cacheLock = threading.Lock()
+_backgroundPool = None
+_fetchPool = None
+
+_tracking = threading.local()  # pages used by the plot being drawn on this thread, see _showsDataAge()
+
+
+def _track(url, retrieved):
+    """notes that the plot being drawn on this thread used a page
+
+    :param url: a string containing the url of the page
+    :param retrieved: the time the page was retrieved
+    """
+    pages = getattr(_tracking, 'pages', None)
+    if pages is not None:
+        pages[url] = min(retrieved, pages.get(url, retrieved))
+
+
+def _trackLate(url):
+    """notes that the plot being drawn on this thread went on without a page that missed the latency budget
+
+    :param url: a string containing the url of the page
+    """
+    late = getattr(_tracking, 'late', None)
+    if late is not None:
+        late.add(url)
+
+
+def _cached(url):
+    """looks up a page in the cache, starting a background revalidation if it is stale
+
+    :param url: a string containing the url of the page
+    :return: a tuple containing (time retrieved, decoded JSON), or None if the page has to be retrieved before use
+    """
+    with _cacheLock:
+        entry = _cache.get(url)
+        if entry is None:
+            return None
+        _cache.move_to_end(url)
+
+    age = time.time() - entry[0]
+    if age < _CACHE_SECONDS:
+        return entry
+    if age < _CACHE_SECONDS + _maxStale:
+        _revalidate(url)
+        return entry
+    return None
+
+
+def _store(url, resultDict):
+    """puts a page into the cache, telling the listeners if its data changed
+
+    :param url: a string containing the url of the page
+    :param resultDict: the decoded JSON of the page
+    :return: the time the page was stored
+    """
+    now = time.time()
+    with _cacheLock:
+        old = _cache.pop(url, None)
+        _cache[url] = (now, resultDict)
+        while len(_cache) > _CACHE_PAGES:
+            _cache.popitem(last=False)
+        listeners = list(_listeners)
+    if old is not None and old[1] != resultDict:
+        for listener in listeners:
+            listener(url)
+    return now
+
+
+def _background():
+    """gets the pool of workers used for prefetching and revalidating, creating it on first use"""
+    global _backgroundPool
+    from concurrent.futures import ThreadPoolExecutor
+
+    with _cacheLock:
+        if _backgroundPool is None:
+            _backgroundPool = ThreadPoolExecutor(max_workers=_BACKGROUND_WORKERS, thread_name_prefix='background')
+        return _backgroundPool
+
+
+def _revalidate(url):
+    """retrieves a stale page again in the background, unless that is already happening
+
+    :param url: a string containing the url of the page
+    """
+    with _cacheLock:
+        if url in _pending or url in _revalidating:
+            return
+        _revalidating.add(url)
+    _background().submit(_refresh, url)
+
+
+def _refresh(url):
+    """retrieves a page for _revalidate()"""
+    try:
+        _store(url, _getJson(url))
+    except Exception:
+        pass  # the stale page keeps being used, and is tried again the next time it is asked for
+    finally:
+        with _cacheLock:
+            _revalidating.discard(url)
+
+
+def _fetchPage(url):
+    """retrieves a page from the cache, or from the API if it is not cached or is too old
+
+    If another thread is already retrieving the same page, this waits for it instead of sending a second request.
+
+    :param url: a string containing the url of the page
+    :return: the decoded JSON of the page
+    """
+    from concurrent.futures import Future
+
+    entry = _cached(url)
+    if entry is not None:
+        _track(url, entry[0])
+        return entry[1]
+
+    with _cacheLock:
+        future = _pending.get(url)
+        owner = future is None
+        if owner:
+            future = Future()
+            _pending[url] = future
+
+    if not owner:
+        with QualityProfile.phase('fetch'):
+            resultDict = future.result()
+        _track(url, time.time())
+        return resultDict
+
+    try:
+        with QualityProfile.phase('fetch'):
+            resultDict = _getJson(url)
+    except BaseException as e:
+        with _cacheLock:
+            del _pending[url]
+        future.set_exception(e)
+        raise
+
+    retrieved = _store(url, resultDict)
+    with _cacheLock:
+        del _pending[url]
+    future.set_result(resultDict)
+    _track(url, retrieved)
+    return resultDict
+
+
+def _pool():
+    """gets the pool of workers used for retrieving many pages at once, creating it on first use"""
+    global _fetchPool
+    from concurrent.futures import ThreadPoolExecutor
+
+    with _cacheLock:
+        if _fetchPool is None:
+            _fetchPool = ThreadPoolExecutor(max_workers=_MAX_WORKERS, thread_name_prefix='fetch')
+        return _fetchPool
+
+
+def _iterFetch(urls, budget=None, status=None):
+    """retrieves many pages at once and hands each one back as soon as it arrives, from the cache where possible, with
+    the number of requests open at a time set by the concurrency controller
+
+    Only a limited number of pages are waited on at a time and the cache keeps at most _CACHE_PAGES pages, so that going
+    through a long list of urls does not hold all of the pages in memory at once. Once the budget runs out, the pages
+    not there yet are left out, they keep being retrieved in the background and the refresh listeners are called with
+    each one as it arrives.
+
+    :param urls: a list of strings of urls
+    :param budget: the most seconds to wait for the pages, None waits for every page
+    :param status: an optional dictionary, filled in with the url of every page as keys and 'ok', 'timeout' (the page
+    missed the budget) or 'error' (the page could not be retrieved) as values
+    :return: a generator of tuples containing (url, decoded JSON), pages that could not be retrieved are left out
+    """
+    import requests
+    from concurrent.futures import wait, FIRST_COMPLETED
+
+    if status is None:
+        status = {}
+    deadline = None if budget is None else time.monotonic() + budget
+    urls = list(dict.fromkeys(urls))  # removes duplicates, keeping the order
+
+    missing = []
+    for url in urls:
+        entry = _cached(url)
+        if entry is not None:
+            _track(url, entry[0])
+            status[url] = 'ok'
+            yield url, entry[1]
+        else:
+            missing.append(url)
+    if not missing:
+        return
+
+    pool = _pool()
+    window = 2 * _MAX_WORKERS  # the most pages waited on at a time
+    queued = iter(missing)
+    futures = {}
+    while True:
+        for url in queued:
+            futures[pool.submit(QualityProfile.bind(_fetchPage), url)] = url
+            if len(futures) >= window:
+                break
+        if not futures:
+            break
+
+        timeout = None if deadline is None else max(0.0, deadline - time.monotonic())
+        with QualityProfile.phase('fetch'):
+            done, _ = wait(futures, timeout=timeout, return_when=FIRST_COMPLETED)
+        if not done:  # out of time, the rest are left to arrive in the background
+            for url in queued:
+                futures[pool.submit(QualityProfile.bind(_fetchPage), url)] = url
+            for f, url in futures.items():
+                status[url] = 'timeout'
+                _trackLate(url)
+                f.add_done_callback(lambda f, url=url: _arrivedLate(url, f))
+            return
+
+        for f in done:
+            url = futures.pop(f)
+            try:
+                resultDict = f.result()
+            except (requests.RequestException, ValueError):
+                status[url] = 'error'
+                continue
+            _track(url, time.time())
+            status[url] = 'ok'
+            yield url, resultDict
+
+
+def _arrivedLate(url, future):
+    """tells the refresh listeners about a page that arrived after the latency budget ran out"""
+    if future.cancelled() or future.exception() is not None:
+        return
+    with _cacheLock:
+        listeners = list(_listeners)
+    for listener in listeners:
+        listener(url)
+
+
+def _fetchAll(urls, budget=None, status=None):
+    """retrieves many pages at once, see _iterFetch()
+
+    :param urls: a list of strings of urls
+    :param budget: the most seconds to wait for the pages, None waits for every page
+    :param status: an optional dictionary filled in with the status of every page, see _iterFetch()
+    :return: a dictionary with the urls as keys and their decoded JSON as values, pages that could not be retrieved
+    within the budget are left out
+    """
+    return dict(_iterFetch(urls, budget, status))
+
+
+def _budgetFor(budget):
+    """gets the latency budget a method should use
+
+    :param budget: the budget given to the method, None for the one set with UrbanAreas.setLatencyBudget()
+    :return: a number of seconds, or None to wait for every page
+    """
+    if budget is None:
+        return _latencyBudget
+    return budget if 0 < budget < float('inf') else None
+
+
+def _prefetch(urls):
+    """queues pages to be retrieved in the background by a small pool of workers
+
+    :param urls: a list of strings of urls
+    """
+    pool = _background()
+    queued = []
+    with _cacheLock:
+        for url in urls:
+            if url in _cache or url in _pending or url in _prefetched:
+                continue
+            future = pool.submit(_fetchPage, url)
+            _prefetched[url] = future
+            queued.append((url, future))
+    for url, future in queued:  # outside of the lock, since a future that is already done calls back straight away
+        future.add_done_callback(lambda f, url=url: _forgetPrefetch(url, f))
+
+
+def _forgetPrefetch(url, future):
+    """removes a finished or cancelled prefetch, called by the future when it is done"""
+    with _cacheLock:
+        if _prefetched.get(url) is future:
+            del _prefetched[url]
+    if not future.cancelled():
+        future.exception()  # a failed prefetch is retrieved again when the page is needed
+
+
+def _cancelPrefetch(urls):
+    """cancels pages queued by _prefetch() that have not started yet, pages already being retrieved are still cached
+
+    :param urls: a list of strings of urls
+    """
+    with _cacheLock:
+        futures = [_prefetched.get(url) for url in urls]
+    for f in futures:
+        if f is not None:
+            f.cancel()
+
+
+def _showsDataAge(plot):
+    """decorator for the plotting methods, which writes the time the oldest data in the plot was retrieved onto the
+    figure and remembers which pages it was drawn from, or went on without because they missed the latency budget (in
+    fig.urbanAreasPages), so that it can be redrawn when they change or arrive
+
+    :param plot: a plotting method that returns a figure
+    :return: the decorated method
+    """
+    import functools
+
+    @functools.wraps(plot)
+    def wrapper(*args, **kwargs):
+        outer, outerLate = getattr(_tracking, 'pages', None), getattr(_tracking, 'late', None)
+        _tracking.pages, _tracking.late = {}, set()
+        try:
+            fig = plot(*args, **kwargs)
+        finally:
+            pages, late = _tracking.pages, _tracking.late
+            _tracking.pages, _tracking.late = outer, outerLate
+        if outer is not None:  # a plot drawn inside another plot counts towards the outer one as well
+            for url, retrieved in pages.items():
+                outer[url] = min(retrieved, outer.get(url, retrieved))
+            outerLate |= late
+
+        if pages:
+            asOf = time.strftime('%Y-%m-%d %H:%M', time.localtime(min(pages.values())))
+            fig.text(0.995, 0.005, f'Data as of {asOf}', ha='right', va='bottom', fontsize=8, color='grey')
+        fig.urbanAreasPages = frozenset(pages) | late  # pages still arriving are included, so the plot fills them in
+        return fig
+
+    return wrapper
+
+
+# job (or None) -> (SimilarityIndex of every urban area, set of urls of its pages that changed since, the decoded
+# catalog page it was last brought up to date with, set of urban areas whose pages could not be retrieved then)
+_indexes = {}
+_indexLock = threading.Lock()
+
+
+def _indexPageChanged(url):
+    """refresh listener that notes score and salary pages that changed, so the similarity indexes can update their
+    rows on the next query"""
+    if url.endswith('scores/') or url.endswith('salaries/'):
+        with _indexLock:
+            for _, changed, _, _ in _indexes.values():
+                changed.add(url)
+
+
+_listeners.append(_indexPageChanged)
+
+
+def _figure(fig=None, figsize=(12, 8)):
+    """gets a figure to plot on
+
+    The figure is a plain matplotlib Figure rather than one made with pyplot, so pyplot does not keep it alive after the
+    window showing it is closed.
+
+    :param fig: a figure to reuse, it is cleared first, or None to make a new one
+    :param figsize: the size of a new figure in inches, (width, height)
+    :return: a tuple containing (figure, axes)
+    """
+    if fig is None:
+        from matplotlib.figure import Figure
+
+        fig = Figure(figsize=figsize)
+    else:
+        fig.clear()
+    fig.urbanAreasPaging = None  # set by charts shown a page at a time, as (page shown, number of pages)
+    fig.urbanAreasStatus = {}  # set by charts of many urban areas, see _showStatus()
+    return fig, fig.add_subplot()
+
+
+def _tightLayout(fig, **kwargs):
+    """lays out a figure so that its labels fit, which is timed as the phase 'layout' when profiling (see
+    QualityProfile.py)
+
+    :param fig: the figure being drawn
+    :param kwargs: passed on to fig.tight_layout()
+    :return: None
+    """
+    with QualityProfile.phase('layout'):
+        fig.tight_layout(**kwargs)
+
+
+_STATUS_TEXT = {'missing-data': 'no data', 'timeout': 'still loading', 'error': 'failed'}
+
+
+def _areaStatus(pageStatus, url, hasData):
+    """works out the status of an urban area from the status of its page
+
+    :param pageStatus: a dictionary of the status of every page, filled in by _fetchAll()
+    :param url: a string containing the url of the page of the urban area
+    :param hasData: True if the page has the data asked for
+    :return: 'ok', 'missing-data' (the page has no data for what was asked), 'timeout' (the page missed the latency
+    budget) or 'error' (the page could not be retrieved)
+    """
+    status = pageStatus.get(url, 'error')
+    if status == 'ok' and not hasData:
+        return 'missing-data'
+    return status
+
+
+def _worstStatus(*statuses):
+    """picks the status that explains best why an urban area that needs several pages has no data
+
+    :return: 'error', 'timeout', 'missing-data' or 'ok'
+    """
+    for status in ('error', 'timeout', 'missing-data'):
+        if status in statuses:
+            return status
+    return 'ok'
+
+
+def _showStatus(fig, status):
+    """keeps the status of every urban area in a chart on the figure (as fig.urbanAreasStatus), and writes the urban
+    areas left out of it, and why, along the bottom, one line above the time the data was retrieved
+
+    :param fig: the figure being drawn
+    :param status: a dictionary with urban areas as keys and 'ok', 'missing-data', 'timeout' or 'error' as values
+    :return: None
+    """
+    fig.urbanAreasStatus = dict(status)
+    parts = []
+    for s, text in _STATUS_TEXT.items():
+        areas = [a for a, v in status.items() if v == s]
+        if areas:
+            more = f' and {len(areas) - 3} more' if len(areas) > 3 else ''
+            parts.append(f'{text}: {", ".join(areas[:3])}{more}')
+    if parts:
+        from matplotlib.transforms import ScaledTranslation
+
+        # raised by a line of text, so that it stays clear of the 'Data as of' line however narrow the figure is
+        above = fig.transFigure + ScaledTranslation(0, 11 / 72, fig.dpi_scale_trans)
+        fig.text(0.005, 0.005, 'Not shown - ' + '; '.join(parts), ha='left', va='bottom', fontsize=8, color='firebrick',
+                 transform=above)
+
+
+def _chooseView(view, count, views=('bars', 'ranked', 'distribution')):
+    """works out how to draw a chart comparing many urban areas
+
+    :param view: one of views, or 'auto' to choose between 'bars', 'ranked' and 'distribution' by the number of urban
+    areas
+    :param count: the number of urban areas in the chart
+    :param views: a tuple of the views the chart can be drawn as, such as 'trend' for the charts that have one
+    :return: one of views
+    """
+    if view == 'auto':
+        if count <= _BAR_LIMIT:
+            return 'bars'
+        return 'ranked' if count <= _RANKED_LIMIT else 'distribution'
+    if view not in views:
+        raise ValueError(f"unknown view {view!r}, expected 'auto', {', '.join(repr(v) for v in views)}")
+    return view
+
+
+def _rankedBars(fig, ax, labels, layers, page, key=None):
+    """draws sorted horizontal bars one page at a time, the largest first. Each layer of bars is drawn as a single
+    collection instead of one rectangle per urban area
+
+    :param fig: the figure being drawn
+    :param ax: the axes to draw on
+    :param labels: a list of strings of urban areas
+    :param layers: a list of tuples containing (values in the order of labels, legend label, colour), drawn in order
+    :param page: the page to show, starting at 0
+    :param key: the values in the order of labels that the bars are sorted by, by default those of the last layer
+    :return: None, the page shown and the number of pages are kept on the figure as fig.urbanAreasPaging
+    """
+    import numpy as np
+    from matplotlib.collections import PolyCollection
+
+    order = np.argsort(-np.asarray(layers[-1][0] if key is None else key, dtype=float), kind='stable')
+    pageCount = max(1, -(-len(order) // _PAGE_SIZE))
+    page = min(max(page, 0), pageCount - 1)
+    shown = order[page * _PAGE_SIZE:(page + 1) * _PAGE_SIZE]
+
+    y = np.arange(len(shown))
+    top, bottom = y - 0.4, y + 0.4
+    largest = 0
+    for values, label, colour in layers:
+        right = np.asarray(values, dtype=float)[shown]
+        left = np.zeros_like(right)
+        corners = np.stack([np.column_stack(c) for c in ((left, top), (left, bottom), (right, bottom), (right, top))],
+                           axis=1)
+        ax.add_collection(PolyCollection(corners, facecolors=colour, edgecolors='none', label=label, zorder=3))
+        largest = max(largest, np.nanmax(right, initial=0))
+
+    ax.set_yticks(y)
+    ax.set_yticklabels([labels[i] for i in shown], fontsize=8)
+    ax.set_ylim(len(shown) - 0.5, -0.5)  # largest at the top
+    ax.set_xlim(0, largest * 1.05 or 1)
+    ax.grid(axis='x', zorder=0)
+    fig.subplots_adjust(left=0.25, right=0.97, top=0.93, bottom=0.08)  # tight_layout is slow with many labels
+    fig.urbanAreasPaging = (page, pageCount)
+
+
+def _distribution(fig, ax, labels, values, highlight, title):
+    """draws a histogram of the values of many urban areas, with a box plot above it and the highlighted urban areas
+    marked. The histogram and the marks are each a single artist, however many urban areas there are
+
+    :param fig: the figure being drawn
+    :param ax: the axes to draw on
+    :param labels: a list of strings of urban areas
+    :param values: the values in the order of labels
+    :param highlight: a list of strings of urban areas to mark, or None for the three highest and lowest
+    :param title: a string with the title of the chart, shown above the box plot
+    :return: None
+    """
+    import numpy as np
+
+    values = np.asarray(values, dtype=float)
+    if highlight is None:
+        order = np.argsort(values)
+        picks = list(order[-3:][::-1]) + list(order[:3]) if len(order) > 6 else list(order)
+    else:
+        positions = {a: i for i, a in enumerate(labels)}
+        picks = [positions[a] for a in highlight if a in positions]
+
+    counts, edges = np.histogram(values, bins=min(30, max(5, len(values) // 8)))
+    ax.stairs(counts, edges, fill=True, color='C0', alpha=0.6, zorder=3)
+    height = max(counts.max(initial=0), 1)
+    ax.vlines(values[picks], 0, height, colors='C3', linewidth=1.5, zorder=4)
+    for i in picks:
+        ax.annotate(labels[i], (values[i], height), xytext=(2, -2), textcoords='offset points', rotation=90,
+                    ha='left', va='top', fontsize=8, color='C3')
+    ax.set_ylim(0, height * 1.05)
+    ax.set_ylabel('Number of Urban Areas')
+    ax.grid(axis='y', zorder=0)
+
+    box = ax.inset_axes([0, 1.02, 1, 0.12], sharex=ax)
+    box.boxplot(values, vert=False, widths=0.7)
+    box.axis('off')
+    box.set_title(title)
+    fig.subplots_adjust(left=0.08, right=0.97, top=0.82, bottom=0.1)
+
+
+def _trends(ax, history, feature, labels, values):
+    """draws how a feature of many urban areas changed over time, from the history (see QualityHistory.py), as a line
+    of steps per urban area ending at its value now. Only the _TREND_LIMIT urban areas that moved the most are drawn
+
+    :param ax: the axes to draw on
+    :param history: a HistoryStore
+    :param feature: a string naming the feature, such as 'Housing'
+    :param labels: a list of strings of urban areas
+    :param values: the values now in the order of labels
+    :return: the number of urban areas drawn
+    """
+    import datetime
+    import matplotlib.dates
+    import numpy as np
+
+    now = time.time()
+    lines = []
+    for label, value in zip(labels, values):
+        times, past = history.series(label, feature)
+        times, past = np.append(times, now), np.append(past, value)
+        lines.append((np.ptp(past), label, times, past))
+    lines.sort(key=lambda line: -line[0])
+
+    for _, label, times, past in lines[:_TREND_LIMIT]:
+        ax.step([datetime.datetime.fromtimestamp(t) for t in times], past, where='post', marker='o', markersize=3,
+                label=label, zorder=3)
+    locator = matplotlib.dates.AutoDateLocator()
+    ax.xaxis.set_major_locator(locator)
+    ax.xaxis.set_major_formatter(matplotlib.dates.ConciseDateFormatter(locator))
+    if lines:
+        ax.legend(fontsize=8, loc='upper left', bbox_to_anchor=(1.01, 1))
+    ax.grid(zorder=0)
+    return min(len(lines), _TREND_LIMIT)
+
+
+def _latLon(resultDict):
+    """finds the centre of the bounding box of an urban area
+
+    :param resultDict: the decoded JSON of the page of an urban area
+    :return: a tuple containing (latitude, longitude) in degrees
+    """
+    box = resultDict['bounding_box']['latlon']
+    return (box['north'] + box['south']) / 2, (box['east'] + box['west']) / 2
+
+
+def _greatCircleKm(lat1, lon1, lat2, lon2):
+    """calculates the distance between two points along the surface of the earth (haversine formula)
+
+    :return: the distance in km
+    """
+    lat1, lon1, lat2, lon2 = (math.radians(v) for v in (lat1, lon1, lat2, lon2))
+    ar = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2
+    return 2 * _EARTH_RADIUS * math.atan2(math.sqrt(ar), math.sqrt(1 - ar))
+
+
+_history = None  # snapshots of the scores and salaries of every urban area, see QualityHistory.py
+_historyLock = threading.Lock()
+
+
+def _getHistory():
+    """gets the history of the scores and salaries, opening it the first time it is needed
+
+    :return: a HistoryStore shared by every UrbanAreas object
+    """
+    global _history
+    with _historyLock:
+        if _history is None:
+            from QualityHistory import HistoryStore
+
+            _history = HistoryStore()
+        return _history
+
+
+_basemap = None  # tiles of the world map, see QualityTiles.py
+_basemapLock = threading.Lock()
+
+
+def _getBasemap():
+    """gets the tiles of the world map, which are built from _MAP_URL the first time a map is ever plotted and kept on
+    disk after that, so the image is only downloaded once
+
+    :return: a TilePyramid
+    """
+    global _basemap
+    with _basemapLock:
+        if _basemap is None:
+            from QualityTiles import openPyramid
+
+            def download():
+                import requests
+                from PIL import Image
+
+                response = requests.get(_MAP_URL, timeout=_REQUEST_TIMEOUT)
+                response.raise_for_status()
+                return Image.open(BytesIO(response.content))
+
+            _basemap = openPyramid(_MAP_URL, download)
+        return _basemap
+
+
+def _drawBasemap(ax, longitudes, latitudes):
+    """draws the part of the world map around some points, zoomed in as far as they allow with some room around them.
+    The axes use degrees, longitude across and latitude up
+
+    :param ax: the axes to draw on
+    :param longitudes: a list of the longitudes of the points in degrees
+    :param latitudes: a list of the latitudes of the points in degrees, in the same order
+    :return: None
+    """
+    west, east = min(longitudes), max(longitudes)
+    south, north = min(latitudes), max(latitudes)
+    padLon = max(0.15 * (east - west), 5)
+    padLat = max(0.15 * (north - south), 4)
+    west, east, south, north = west - padLon, east + padLon, south - padLat, north + padLat
+
+    # wider than tall like the figure, so the map fills it
+    extraLon = max(0.0, 1.5 * (north - south) - (east - west)) / 2
+    extraLat = max(0.0, (east - west) / 1.5 - (north - south)) / 2
+    west, east = max(-180.0, west - extraLon), min(180.0, east + extraLon)
+    south, north = max(-90.0, south - extraLat), min(90.0, north + extraLat)
+
+    width = int(ax.figure.get_figwidth() * ax.figure.dpi)
+    image, extent = _getBasemap().render(west, south, east, north, width)
+    ax.imshow(image, extent=extent, interpolation='bilinear', zorder=0)
+    ax.set_xlim(west, east)
+    ax.set_ylim(south, north)
+
+
+def _costOfLivingItems(resultDict):
+    """finds the cost of living items in the details of an urban area
+
+    :param resultDict: the decoded JSON of the details/ page of an urban area
+    :return: a list of tuples containing (label, cost in dollars)
+    """
+    items = []
+    for r in resultDict['categories']:
+        if r['data'][0]['id'] == 'CONSUMER-PRICE-INDEX-TELESCORE':
+            for d in r['data']:
+                if 'currency_dollar_value' in d:
+                    items.append((d['label'], d['currency_dollar_value']))
+    return items
 
 
 class UrbanAreas:
@@ -21,19 +929,18 @@ class UrbanAreas:
         """creates an object containing the list of urban areas and methods to access it's data"""
 
         # retrieve urban areas
-        url = 'https://api.teleport.org/api/urban_areas/'
-        page = requests.get(url)
-        resultDict = page.json()
+        url = _API_URL + 'urban_areas/'
+        resultDict = _fetchPage(url)
 
         urbanAreasID = {}  # dictionary with the country names as keys, links to salary data as values
         for d in resultDict['_links']["ua:item"]:
             urbanAreasID[d['name']] = d['href']
         self._urbanAreasID = urbanAreasID
+        self._catalog = resultDict  # the catalog page the urban areas were last read from
 
         # retrieve list of jobs
-        url2 = 'https://api.teleport.org/api/urban_areas/slug%3Aaarhus/salaries/'
-        page2 = requests.get(url2)
-        resultDict2 = page2.json()
+        url2 = _API_URL + 'urban_areas/slug%3Aaarhus/salaries/'
+        resultDict2 = _fetchPage(url2)
 
         jobs = []
         for d in resultDict2['salaries']:
@@ -41,9 +948,8 @@ class UrbanAreas:
         self._jobs = jobs
 
         # retrieve list of metrics
-        url3 = 'https://api.teleport.org/api/urban_areas/slug%253Aaarhus/scores/'
-        page3 = requests.get(url3)
-        resultDict3 = page3.json()
+        url3 = _API_URL + 'urban_areas/slug%253Aaarhus/scores/'
+        resultDict3 = _fetchPage(url3)
 
         metrics = []
         for d in resultDict3['categories']:
@@ -53,12 +959,6 @@ class UrbanAreas:
         # for sharing data and creating an SQLite database
         self._qualityData = None
 
-        # retrieving image for plotMap()
-        # url4 = 'https://upload.wikimedia.org/wikipedia/commons/8/83/Equirectangular_projection_SW.jpg'
-        url4 = 'https://upload.wikimedia.org/wikipedia/commons/thumb/8/83/Equirectangular_projection_SW.jpg/1280px-Equirectangular_projection_SW.jpg'
-        response4 = requests.get(url4)
-        self._img = Image.open(BytesIO(response4.content))
-
     def getUrbanAreas(self):
         """gets a list of urban areas without the id
 
@@ -80,58 +980,138 @@ class UrbanAreas:
         """
         return self._metrics
 
-    def plotSalaries(self, job, urbanAreas):
-        """plots the salaries for a given job for a list of urban areas
+    def getRecentAreas(self):
+        """gets the urban areas used in plots most recently
+
+        :return: a list of urban areas, newest first
+        """
+        with _cacheLock:
+            return list(_recentAreas)
+
+    def _useAreas(self, urbanAreas):
+        """remembers urban areas that were just used in a plot, so they can be prefetched next time
 
-        :param job: a string containing the name of the job
         :param urbanAreas: a list of strings of urban areas
-        :return: None, but produces a plot that can be accessed through a lambda function
         """
-        data = {}
+        with _cacheLock:
+            for a in reversed(list(urbanAreas)):
+                if a in _recentAreas:
+                    _recentAreas.remove(a)
+                _recentAreas.insert(0, a)
+            del _recentAreas[_RECENT_AREAS:]
 
-        def salaryData(urbanArea, urbanAreasID):
-            url = urbanAreasID[urbanArea] + 'salaries/'
-            page = requests.get(url)
-            resultDict = page.json()
+    def prefetch(self, urbanAreas, page):
+        """starts retrieving a page for urban areas in the background, so that a plot made soon after finds the data
+        already cached
 
-            salary = [None] * 3
-            for r in resultDict['salaries']:
-                if r['job']['title'] == job:
-                    salary[0] = r['salary_percentiles']['percentile_25']
-                    salary[1] = r['salary_percentiles']['percentile_50']
-                    salary[2] = r['salary_percentiles']['percentile_75']
-                    data[urbanArea] = salary
-                    break
+        :param urbanAreas: a list of strings of urban areas
+        :param page: a string with the page to retrieve, 'salaries/', 'scores/', 'details/' or '' for the urban area itself
+        :return: None
+        """
+        _prefetch([self._urbanAreasID[a] + page for a in urbanAreas if a in self._urbanAreasID])
 
-        # threading to retrieve data faster
-        threads = []
+    def cancelPrefetch(self, urbanAreas, page):
+        """cancels pages started by prefetch() that are still waiting for a worker
 
-        for a in urbanAreas:  # convert this to multithreading
-            t = threading.Thread(target=salaryData, args=(a, self._urbanAreasID))
-            threads.append(t)
+        :param urbanAreas: a list of strings of urban areas
+        :param page: a string with the page, 'salaries/', 'scores/', 'details/' or '' for the urban area itself
+        :return: None
+        """
+        _cancelPrefetch([self._urbanAreasID[a] + page for a in urbanAreas if a in self._urbanAreasID])
 
-        for t in threads:
-            t.start()
+    def setMaxStaleness(self, seconds):
+        """sets how long past its expiry a cached page is still used straight away while it is retrieved again in the
+        background, after that the page is waited for. The plots show how old their data is
 
-        for t in threads:
-            t.join()
+        :param seconds: a number of seconds, 0 to always wait for expired pages
+        :return: None
+        """
+        global _maxStale
+        _maxStale = max(0.0, float(seconds))
 
-        # moving data away from thread safe container for plotting
-        labels = []
-        percentile_25 = []
-        percentile_50 = []
-        percentile_75 = []
-
-        i = 0
-        for k, v in data.items():
-            labels.append(k)
-            percentile_25.append(v[0])
-            percentile_50.append(v[1])
-            percentile_75.append(v[2])
-            i += 1
+    def setLatencyBudget(self, seconds):
+        """sets how long the methods comparing many urban areas wait for their pages by default. After that they go on
+        with the pages that arrived, and tell which urban areas are missing and why, the rest keep being retrieved in
+        the background and the refresh listeners are told as each one arrives
+
+        :param seconds: a number of seconds, 0 to wait for every page
+        :return: None
+        """
+        global _latencyBudget
+        _latencyBudget = float(seconds) or None
+
+    def addRefreshListener(self, listener):
+        """registers a function to be called when a background revalidation finds that the data of a page has changed,
+        or when a page that missed the latency budget arrives. It is called on a background thread with the url of the
+        page, which can be looked for in the urbanAreasPages of a figure to see if the figure is out of date
+
+        :param listener: a function taking the url of the page
+        :return: None
+        """
+        with _cacheLock:
+            _listeners.append(listener)
+
+    def removeRefreshListener(self, listener):
+        """unregisters a function added with addRefreshListener()
+
+        :param listener: the function to remove
+        :return: None
+        """
+        with _cacheLock:
+            if listener in _listeners:
+                _listeners.remove(listener)
+
+    @_showsDataAge
+    def plotSalaries(self, job, urbanAreas, fig=None, view='auto', page=0, highlight=None, budget=None):
+        """plots the salaries for a given job for a list of urban areas
+
+        :param job: a string containing the name of the job
+        :param urbanAreas: a list of strings of urban areas
+        :param fig: an optional figure to reuse
+        :param view: 'bars' for one bar per urban area, 'ranked' for sorted horizontal bars shown a page at a time,
+        'distribution' for a histogram of the median salaries, or 'auto' to choose by the number of urban areas
+        :param page: the page of a 'ranked' chart to show, starting at 0
+        :param highlight: a list of strings of urban areas to mark in a 'distribution' chart, by default the highest and
+        lowest
+        :param budget: the most seconds to wait for the pages, see setLatencyBudget(), urban areas still loading after
+        that are noted on the chart and filled in when they arrive
+        :return: a figure to be displayed in tkinter
+        """
+        import matplotlib.ticker as mtick
+
+        # retrieving the pages at once, the concurrency controller decides how many requests are open at a time
+        self._useAreas(urbanAreas)
+        status = {}
+        data = self.getSalaries(job, urbanAreas, budget, status)
+
+        labels = list(data)
+        percentile_25 = [v[0] for v in data.values()]
+        percentile_50 = [v[1] for v in data.values()]
+        percentile_75 = [v[2] for v in data.values()]
 
         # forming stacked bar chart
-        fig, ax = plt.subplots()
+        fig, ax = _figure(fig, (6.4, 4.8))
+        view = _chooseView(view, len(labels))
+        if view == 'ranked':
+            fig.set_size_inches(8, 9)
+            layers = [(percentile_75, '75th Percentile', 'C0'), (percentile_50, '50th Percentile', 'C1'),
+                      (percentile_25, '25th Percentile', 'C2')]
+            _rankedBars(fig, ax, labels, layers, page, key=percentile_50)  # ranked by the median
+            ax.xaxis.set_major_formatter(mtick.StrMethodFormatter('${x:,.0f}'))
+            ax.set_xlabel('Salary ($)')
+            page, pageCount = fig.urbanAreasPaging
+            ax.set_title(f'Salaries By Urban Area (page {page + 1} of {pageCount})')
+            ax.legend(loc='lower right')
+            _showStatus(fig, status)
+            return fig
+        if view == 'distribution':
+            fig.set_size_inches(8, 6)
+            _distribution(fig, ax, labels, percentile_50, highlight,
+                          f'Median Salaries of {job} in {len(labels)} Urban Areas')
+            ax.xaxis.set_major_formatter(mtick.StrMethodFormatter('${x:,.0f}'))
+            ax.set_xlabel('Median Salary ($)')
+            _showStatus(fig, status)
+            return fig
 
         ax.bar(labels, percentile_75, label='75th Percentile', zorder=3)
         ax.bar(labels, percentile_50, label='50th Percentile', zorder=3)
@@ -143,96 +1123,115 @@ class UrbanAreas:
         ax.set_title('Salaries By Urban Area')
         ax.legend()
 
-        xLocations = tuple([i for i in range(0, len(urbanAreas))])
-        if len(urbanAreas) > 5:
+        xLocations = tuple([i for i in range(0, len(labels))])
+        if len(labels) > 5:
             degrees = 90
         else:
             degrees = 0
-        plt.xticks(xLocations, labels, rotation=degrees)
-        plt.xticks()
-        plt.grid(axis='y')
-        plt.tight_layout()
+        ax.set_xticks(xLocations)
+        ax.set_xticklabels(labels, rotation=degrees)
+        ax.grid(axis='y')
+        _tightLayout(fig, rect=(0, 0.03, 1, 1))
+        _showStatus(fig, status)
 
-        # plt.show()
         return fig  # this is needed to display subplots in tkinter
 
-    def plotCompareQuality(self, metric, urbanAreas):
+    @_showsDataAge
+    def plotCompareQuality(self, metric, urbanAreas, fig=None, view='auto', page=0, highlight=None, budget=None):
         """Compares and plots a single quality of life metric between multiple urban areas
 
         :param metric: a string with the quality of life metric
         :param urbanAreas: a list of strings of urban areas
-        :return: None, but produces a plot that can be accessed through a lambda function
+        :param fig: an optional figure to reuse
+        :param view: 'bars' for one bar per urban area, 'ranked' for sorted horizontal bars shown a page at a time,
+        'distribution' for a histogram of the scores, 'trend' for how the scores changed over the snapshots taken with
+        recordHistory(), or 'auto' to choose by the number of urban areas
+        :param page: the page of a 'ranked' chart to show, starting at 0
+        :param highlight: a list of strings of urban areas to mark in a 'distribution' chart, by default the highest and
+        lowest
+        :param budget: the most seconds to wait for the pages, see setLatencyBudget(), urban areas still loading after
+        that are noted on the chart and filled in when they arrive
+        :return: a figure to be displayed in tkinter
         """
-        data = {}
-
-        def metricData(urbanArea, metricIn, urbanAreasID):
-            url = urbanAreasID[urbanArea] + 'scores/'
-            page = requests.get(url)
-            resultDict = page.json()
-
-            for r in resultDict['categories']:
-                if r['name'] == metricIn:
-                    data[urbanArea] = r['score_out_of_10']
-                    break
-
-        # threading to retrieve data faster
-        threads = []
+        # retrieving the pages at once, the concurrency controller decides how many requests are open at a time
+        self._useAreas(urbanAreas)
+        status = {}
+        allScores = self.getScores(urbanAreas, budget, status)
 
-        for a in urbanAreas:  # convert this to multithreading
-            t = threading.Thread(target=metricData, args=(a, metric, self._urbanAreasID))
-            threads.append(t)
-
-        for t in threads:
-            t.start()
-
-        for t in threads:
-            t.join()
-
-        # forming stacked bar chart
         labels = []
         scores = []
-
-        for k, v in data.items():
-            labels.append(k)
-            scores.append(v)
-
-        plt.bar(labels, scores, zorder=3)
+        for a, areaScores in allScores.items():
+            if metric in areaScores:
+                labels.append(a)
+                scores.append(areaScores[metric])
+            else:
+                status[a] = 'missing-data'
+
+        fig, ax = _figure(fig)
+        view = _chooseView(view, len(labels), ('bars', 'ranked', 'distribution', 'trend'))
+        if view == 'ranked':
+            _rankedBars(fig, ax, labels, [(scores, None, 'C0')], page)
+            ax.set_xlim(0, 10)
+            ax.set_xlabel('Score out of 10')
+            page, pageCount = fig.urbanAreasPaging
+            ax.set_title(f'Scores for {metric} by Urban Area (page {page + 1} of {pageCount})')
+            _showStatus(fig, status)
+            return fig
+        if view == 'distribution':
+            _distribution(fig, ax, labels, scores, highlight, f'Scores for {metric} in {len(labels)} Urban Areas')
+            ax.set_xlim(0, 10)
+            ax.set_xlabel('Score out of 10')
+            _showStatus(fig, status)
+            return fig
+        if view == 'trend':
+            drawn = _trends(ax, self.getHistory(), metric, labels, scores)
+            ax.set_ylim(0, 10)
+            ax.set_ylabel('Score out of 10')
+            most = f' ({drawn} That Changed the Most)' if drawn < len(labels) else ''
+            ax.set_title(f'Scores for {metric} Over Time{most}')
+            _tightLayout(fig, rect=(0, 0.03, 1, 1))
+            _showStatus(fig, status)
+            return fig
+
+        ax.bar(labels, scores, zorder=3)
 
         # x-axis markings
-        plt.xlabel('Urban Area')
-        xLocations = tuple([i for i in range(0, len(urbanAreas))])
-        if len(urbanAreas) > 5:
+        ax.set_xlabel('Urban Area')
+        xLocations = tuple([i for i in range(0, len(labels))])
+        if len(labels) > 5:
             degrees = 90
         else:
             degrees = 0
-        plt.xticks(xLocations, labels, rotation=degrees)
+        ax.set_xticks(xLocations)
+        ax.set_xticklabels(labels, rotation=degrees)
 
         # y-axis markings
         yLocations = tuple([i for i in range(0, 11)])
-        plt.yticks(yLocations, yLocations)
-        plt.ylabel('Score out of 10')
+        ax.set_yticks(yLocations)
+        ax.set_ylabel('Score out of 10')
 
         # general plot markings
-        plt.title(f'Scores for {metric} by Urban Area')
-        (xMin, xMax, yMin, yMax) = plt.axis()
-        plt.axis((xMin, xMax, 0, 10))
-        plt.grid(axis='y')
-        plt.tight_layout()
+        ax.set_title(f'Scores for {metric} by Urban Area')
+        ax.set_ylim(0, 10)
+        ax.grid(axis='y')
+        _tightLayout(fig, rect=(0, 0.03, 1, 1))
+        _showStatus(fig, status)
 
-        # plt.show()
+        return fig
 
-    def plotAllQuality(self, urbanArea):
+    @_showsDataAge
+    def plotAllQuality(self, urbanArea, fig=None):
         """plots all quality of life metrics for one urban area
 
         :param urbanArea: a string containing a single urban area
-        :return: None, but produces a plot that can be accessed through a lambda function
+        :param fig: an optional figure to reuse
+        :return: a figure to be displayed in tkinter
         """
-
+        self._useAreas([urbanArea])
         metrics = []
         scores = []
         url = self._urbanAreasID[urbanArea] + 'scores/'
-        page = requests.get(url)
-        resultDict = page.json()
+        resultDict = _fetchPage(url)
 
         for r in resultDict['categories']:
             metrics.append(r['name'])
@@ -241,26 +1240,52 @@ class UrbanAreas:
         # saves data into instances variable to be used in the SQLite database
         self._qualityData = (urbanArea, metrics, scores)
 
-        plt.bar(metrics, scores, zorder=3)
+        fig, ax = _figure(fig)
+        ax.bar(metrics, scores, zorder=3)
 
         # x-axis markings
-        plt.xlabel('Metric')
+        ax.set_xlabel('Metric')
         xLocations = tuple([i for i in range(0, len(metrics))])
-        plt.xticks(xLocations, metrics, rotation=90)
+        ax.set_xticks(xLocations)
+        ax.set_xticklabels(metrics, rotation=90)
 
         # y-axis markings
         yLocations = tuple([i for i in range(0, 11)])
-        plt.yticks(yLocations, yLocations)
-        plt.ylabel('Score out of 10')
+        ax.set_yticks(yLocations)
+        ax.set_ylabel('Score out of 10')
 
         # general plot markings
-        plt.title(f'Quality of Life Scores in {urbanArea}')
-        (xMin, xMax, yMin, yMax) = plt.axis()
-        plt.axis((xMin, xMax, 0, 10))
-        plt.grid(axis='y')
-        plt.tight_layout()
+        ax.set_title(f'Quality of Life Scores in {urbanArea}')
+        ax.set_ylim(0, 10)
+        ax.grid(axis='y')
+        _tightLayout(fig)
+
+        return fig
 
-        # plt.show()
+    def getHistory(self):
+        """gets the history of the quality of life scores and salaries of every urban area, see QualityHistory.py
+
+        :return: a HistoryStore shared by every UrbanAreas object
+        """
+        return _getHistory()
+
+    def recordHistory(self, history=None, jobs=None, budget=0, status=None):
+        """retrieves the quality of life scores and salary percentiles of every urban area and adds them to the history
+        as a snapshot, writing only the values that changed since the last one. Urban areas whose pages cannot be
+        retrieved keep their last values, and are told apart from unchanged ones in status
+
+        :param history: an optional HistoryStore to add to, the one from getHistory() by default
+        :param jobs: a list of strings of the jobs whose salaries are kept, every job by default
+        :param budget: the most seconds to wait for the pages, by default every page is waited for
+        :param status: an optional dictionary, filled in with every urban area as keys and 'ok', 'timeout' or 'error'
+        (some of its pages could not be retrieved, so their values were kept) as values
+        :return: a tuple containing (the id of the snapshot, the number of values that changed)
+        """
+        table, statuses = self._getFeatureTable(None, self._jobs if jobs is None else jobs, False, budget)
+        if status is not None:
+            for a in table.areas:
+                status[a] = _worstStatus(*(s for s in statuses[a] if s != 'missing-data'))
+        return (history or self.getHistory()).record(table.areas, table.features, table.values)
 
     def getData(self):
         """getting the most recent quality of life data to be saved into a text file from the front end
@@ -269,126 +1294,740 @@ class UrbanAreas:
         """
         return self._qualityData
 
-    def plotCostOfLiving(self, urbanArea):
+    def iterResults(self, urbanAreas, job=None, startingArea=None, status=None):
+        """retrieves the salaries, scores, cost of living and distances for many urban areas and hands them back one row
+        at a time as the pages arrive, for exporting to a file. Every page is waited for, there is no latency budget
+
+        :param urbanAreas: a list of strings of urban areas
+        :param job: an optional string containing the name of a job, salaries are left out without it
+        :param startingArea: an optional string containing an urban area to measure distances from, distances are left
+        out without it
+        :param status: an optional dictionary, filled in once the rows run out with every urban area as keys and 'ok' or
+        'error' (some of its pages could not be retrieved, so some of its rows are missing) as values
+        :return: a generator of tuples containing (urban area, category, item, statistic, value), where the category is
+        'salary', 'score', 'cost_of_living' or 'distance'
+        """
+        pages = {}  # url -> (urban area, page)
+        for a in urbanAreas:
+            href = self._urbanAreasID[a]
+            if job is not None:
+                pages[href + 'salaries/'] = (a, 'salaries/')
+            pages[href + 'scores/'] = (a, 'scores/')
+            pages[href + 'details/'] = (a, 'details/')
+            if startingArea is not None:
+                pages[href] = (a, '')
+
+        if startingArea is not None:
+            startLat, startLon = _latLon(_fetchPage(self._urbanAreasID[startingArea]))
+
+        pageStatus = {}
+        for url, resultDict in _iterFetch(list(pages), None, pageStatus):
+            a, page = pages[url]
+            if page == 'salaries/':
+                for r in resultDict['salaries']:
+                    if r['job']['title'] == job:
+                        for statistic in ('percentile_25', 'percentile_50', 'percentile_75'):
+                            yield a, 'salary', job, statistic, r['salary_percentiles'][statistic]
+                        break
+            elif page == 'scores/':
+                for r in resultDict['categories']:
+                    yield a, 'score', r['name'], 'score_out_of_10', r['score_out_of_10']
+            elif page == 'details/':
+                for label, cost in _costOfLivingItems(resultDict):
+                    yield a, 'cost_of_living', label, 'usd', cost
+            else:
+                km = _greatCircleKm(startLat, startLon, *_latLon(resultDict))
+                yield a, 'distance', startingArea, 'km', km
+                yield a, 'distance', startingArea, 'flight_hours', km / _PLANE_SPEED
+
+        if status is not None:
+            for a in urbanAreas:
+                status[a] = 'ok'
+            for url, (a, _) in pages.items():
+                status[a] = _worstStatus(status[a], pageStatus.get(url, 'error'))
+
+    @_showsDataAge
+    def plotCostOfLiving(self, urbanArea, fig=None):
         """plot details for cost of living
 
         :param urbanArea: a string containing a single urban area
-        :return: None, but produces a plot that can be accessed through a lambda function
+        :param fig: an optional figure to reuse
+        :return: a figure to be displayed in tkinter
         """
+        self._useAreas([urbanArea])
         url = self._urbanAreasID[urbanArea] + 'details/'
-        page = requests.get(url)
-        resultDict = page.json()
+        resultDict = _fetchPage(url)
 
         labels = []
         costs = []
-        for r in resultDict['categories']:
-            if r['data'][0]['id'] == 'CONSUMER-PRICE-INDEX-TELESCORE':
-                for d in r['data']:
-                    if 'currency_dollar_value' in d:
-                        labels.append(d['label'])
-                        costs.append(d['currency_dollar_value'])
+        for label, cost in _costOfLivingItems(resultDict):
+            labels.append(label)
+            costs.append(cost)
 
+        fig, ax = _figure(fig)
         if costs: # if data is available
-            bars = plt.bar(labels, costs, zorder=3)
+            bars = ax.bar(labels, costs, zorder=3)
             for bar in bars:
                 yval = bar.get_height()
-                plt.text(bar.get_x(), yval+0.005, f'${yval}')
+                ax.text(bar.get_x(), yval+0.005, f'${yval}')
             xLocations = tuple([i for i in range(0, len(labels))])
-            plt.xticks(xLocations, labels, rotation=90)
+            ax.set_xticks(xLocations)
+            ax.set_xticklabels(labels, rotation=90)
         else: # if data is not available
-            plt.text(1,1,'(No Data Available)', fontsize=20, horizontalalignment='center',
-                     verticalalignment='center')
-            xLocations = (0,1,2)
-            plt.xticks(xLocations,None)
-            yLocations = (0,1,2)
-            plt.yticks(yLocations,None)
-            plt.axis('off')
-
-        plt.xlabel('Metric')
-        plt.ylabel('Cost ($)')
-        plt.title(f'Cost of living in {urbanArea}')
-        plt.grid(axis='y')
-        plt.tight_layout()
-
-        # plt.show()
-
-    def plotMap(self, startingArea, urbanAreas):
-        """plots the urban areas the user wants to go to on a map
+            ax.text(1,1,'(No Data Available)', fontsize=20, horizontalalignment='center',
+                    verticalalignment='center')
+            ax.set_xlim(0, 2)
+            ax.set_ylim(0, 2)
+            ax.axis('off')
 
-        :param startingArea: a string containing the starting urban area of the user
-        :param urbanAreas: a list of strings of urbanAreas the user intends to move to
-        :return: None
+        ax.set_xlabel('Metric')
+        ax.set_ylabel('Cost ($)')
+        ax.set_title(f'Cost of living in {urbanArea}')
+        ax.grid(axis='y')
+        _tightLayout(fig)
+
+        return fig
+
+    def getCostOfLiving(self, urbanAreas, budget=None, status=None):
+        """retrieves the cost of living items for many urban areas at once and aligns them into a matrix
+
+        :param urbanAreas: a list of strings of urban areas
+        :param budget: the most seconds to wait for the pages, by default the one set with setLatencyBudget()
+        :param status: an optional dictionary, filled in with every urban area as keys and 'ok', 'missing-data',
+        'timeout' or 'error' as values
+        :return: a tuple containing ([list of urban areas], [list of items], matrix of costs in dollars with a row for
+        every urban area and a column for every item, NaN where an area has no price for an item)
         """
+        import numpy as np
 
-        imgWidth, imgHeight = self._img.size
+        urls = [self._urbanAreasID[a] + 'details/' for a in urbanAreas]
+        pageStatus = {}
+        pages = _fetchAll(urls, _budgetFor(budget), pageStatus)
 
-        def mapCoord(urbanAreaID, area):
-            url1 = urbanAreaID[area]
-            page = requests.get(url1)
-            resultDict = page.json()
+        items = {}  # item label -> column, in the order the items are first seen
+        rows = []
+        cols = []
+        costs = []
+        for i, url in enumerate(urls):
+            found = _costOfLivingItems(pages[url]) if url in pages else []
+            for label, cost in found:
+                rows.append(i)
+                cols.append(items.setdefault(label, len(items)))
+                costs.append(cost)
+            if status is not None:
+                status[urbanAreas[i]] = _areaStatus(pageStatus, url, bool(found))
+
+        matrix = np.full((len(urbanAreas), len(items)), np.nan)
+        matrix[rows, cols] = costs
+        return list(urbanAreas), list(items), matrix
+
+    def getSalaries(self, job, urbanAreas, budget=None, status=None):
+        """retrieves the 25th, 50th and 75th percentile salaries for a job in many urban areas at once
 
-            data = {}
-            for k, v in resultDict['bounding_box']['latlon'].items():
-                data[k] = v
+        :param job: a string containing the name of the job
+        :param urbanAreas: a list of strings of urban areas
+        :param budget: the most seconds to wait for the pages, by default the one set with setLatencyBudget()
+        :param status: an optional dictionary, filled in with every urban area as keys and 'ok', 'missing-data',
+        'timeout' or 'error' as values
+        :return: a dictionary with the urban areas as keys and [25th, 50th, 75th percentile] as values, urban areas
+        without data for the job are left out
+        """
+        pageStatus = {}
+        pages = _fetchAll([self._urbanAreasID[a] + 'salaries/' for a in urbanAreas], _budgetFor(budget), pageStatus)
 
-            lon = (data['east'] + data['west']) / 2
-            lat = (data['north'] + data['south']) / 2
+        data = {}
+        for a in urbanAreas:
+            url = self._urbanAreasID[a] + 'salaries/'
+            for r in pages.get(url, {}).get('salaries', []):
+                if r['job']['title'] == job:
+                    p = r['salary_percentiles']
+                    data[a] = [p['percentile_25'], p['percentile_50'], p['percentile_75']]
+                    break
+            if status is not None:
+                status[a] = _areaStatus(pageStatus, url, a in data)
+        return data
 
-            xCoord = ((lon + 180) / 360) * imgWidth
-            yCoord = (1 - ((lat + 90) / 180)) * imgHeight
+    def getScores(self, urbanAreas, budget=None, status=None):
+        """retrieves all quality of life scores for many urban areas at once
 
-            return xCoord, yCoord
+        :param urbanAreas: a list of strings of urban areas
+        :param budget: the most seconds to wait for the pages, by default the one set with setLatencyBudget()
+        :param status: an optional dictionary, filled in with every urban area as keys and 'ok', 'missing-data',
+        'timeout' or 'error' as values
+        :return: a dictionary with the urban areas as keys and dictionaries of {metric: score out of 10} as values,
+        urban areas that could not be retrieved are left out
+        """
+        pageStatus = {}
+        pages = _fetchAll([self._urbanAreasID[a] + 'scores/' for a in urbanAreas], _budgetFor(budget), pageStatus)
 
-        startingAreaCoord = mapCoord(self._urbanAreasID, startingArea)
+        data = {}
+        for a in urbanAreas:
+            url = self._urbanAreasID[a] + 'scores/'
+            resultDict = pages.get(url)
+            if resultDict is not None and resultDict['categories']:
+                data[a] = {r['name']: r['score_out_of_10'] for r in resultDict['categories']}
+            if status is not None:
+                status[a] = _areaStatus(pageStatus, url, a in data)
+        return data
+
+    def getDistances(self, startingArea, urbanAreas, budget=None, status=None):
+        """calculates the distance and flight time from one urban area to many others
+
+        :param startingArea: a string containing the starting urban area, an error is raised if it cannot be retrieved
+        :param urbanAreas: a list of strings of urban areas
+        :param budget: the most seconds to wait for the pages, by default the one set with setLatencyBudget()
+        :param status: an optional dictionary, filled in with every urban area as keys and 'ok', 'missing-data',
+        'timeout' or 'error' as values
+        :return: a dictionary with the urban areas as keys and (distance in km, hours by flight) as values
+        """
+        pageStatus = {}
+        pages = self._fetchStart(startingArea, urbanAreas, budget, pageStatus)
+        startLat, startLon = _latLon(pages[self._urbanAreasID[startingArea]])
 
-        destinationCoord = {}
+        data = {}
         for a in urbanAreas:
-            destinationCoord[a] = mapCoord(self._urbanAreasID, a)
+            resultDict = pages.get(self._urbanAreasID[a])
+            if resultDict is not None:
+                km = _greatCircleKm(startLat, startLon, *_latLon(resultDict))
+                data[a] = (km, km / _PLANE_SPEED)
+            if status is not None:
+                status[a] = _areaStatus(pageStatus, self._urbanAreasID[a], a in data)
+        return data
+
+    def getLocations(self, urbanAreas, budget=None, status=None):
+        """retrieves where many urban areas are, as the centre of their bounding box
+
+        :param urbanAreas: a list of strings of urban areas
+        :param budget: the most seconds to wait for the pages, by default the one set with setLatencyBudget()
+        :param status: an optional dictionary, filled in with every urban area as keys and 'ok', 'timeout' or 'error' as
+        values
+        :return: a tuple containing (array of latitudes, array of longitudes) in degrees in the same order as
+        urbanAreas, NaN where an urban area could not be retrieved
+        """
+        import numpy as np
+
+        urls = [self._urbanAreasID[a] for a in urbanAreas]
+        pageStatus = {}
+        pages = _fetchAll(urls, _budgetFor(budget), pageStatus)
+
+        locations = np.full((len(urbanAreas), 2), np.nan)
+        for i, url in enumerate(urls):
+            if url in pages:
+                locations[i] = _latLon(pages[url])
+            if status is not None:
+                status[urbanAreas[i]] = _areaStatus(pageStatus, url, url in pages)
+        return locations[:, 0], locations[:, 1]
+
+    def _fetchStart(self, startingArea, urbanAreas, budget, pageStatus):
+        """retrieves the pages of a starting urban area and of many others, for the methods measuring distances
+
+        :param startingArea: a string containing the starting urban area
+        :param urbanAreas: a list of strings of urban areas
+        :param budget: the most seconds to wait for the pages, None for the one set with setLatencyBudget()
+        :param pageStatus: a dictionary filled in with the status of every page
+        :return: a dictionary with the urls as keys and their decoded JSON as values
+        """
+        pages = _fetchAll([self._urbanAreasID[a] for a in [startingArea] + list(urbanAreas)], _budgetFor(budget),
+                          pageStatus)
+        url = self._urbanAreasID[startingArea]
+        if url not in pages:
+            raise RuntimeError(f'{startingArea} could not be retrieved ({pageStatus.get(url, "error")})')
+        return pages
+
+    def getSalaryMedians(self, job, urbanAreas, budget=None, status=None):
+        """retrieves the median salary for a job in many urban areas at once
+
+        :param job: a string containing the name of the job
+        :param urbanAreas: a list of strings of urban areas
+        :param budget: the most seconds to wait for the pages, by default the one set with setLatencyBudget()
+        :param status: an optional dictionary, filled in with every urban area as keys and 'ok', 'missing-data',
+        'timeout' or 'error' as values
+        :return: an array of median salaries in the same order as urbanAreas, NaN where there is no data
+        """
+        import numpy as np
+
+        urls = [self._urbanAreasID[a] + 'salaries/' for a in urbanAreas]
+        pageStatus = {}
+        pages = _fetchAll(urls, _budgetFor(budget), pageStatus)
+
+        medians = np.full(len(urbanAreas), np.nan)
+        for i, url in enumerate(urls):
+            for r in pages.get(url, {}).get('salaries', []):
+                if r['job']['title'] == job:
+                    medians[i] = r['salary_percentiles']['percentile_50']
+                    break
+            if status is not None:
+                status[urbanAreas[i]] = _areaStatus(pageStatus, url, not np.isnan(medians[i]))
+        return medians
+
+    def getPurchasingPower(self, job, urbanAreas, basket=None, budget=None, status=None):
+        """calculates how much a median salary for a job buys in each urban area
+
+        The basket is a dictionary with cost of living items as keys and the number bought as values. By default one of
+        every item is bought. Items that are missing from some of the urban areas are left out of the basket so that
+        every area is priced on the same items.
+
+        :param job: a string containing the name of the job
+        :param urbanAreas: a list of strings of urban areas
+        :param basket: an optional dictionary of {item: quantity}
+        :param budget: the most seconds to wait for the pages, by default the one set with setLatencyBudget()
+        :param status: an optional dictionary, filled in with every urban area as keys and 'ok', 'missing-data',
+        'timeout' or 'error' as values
+        :return: a tuple containing ([list of urban areas], array of median salaries, array of basket costs, array of
+        purchasing power indices), where the indices are scaled so that the average urban area is 100 and are NaN for
+        areas without data
+        """
+        import numpy as np
+
+        self._useAreas(urbanAreas)
+        costStatus, salaryStatus = {}, {}
+        areas, items, costs = self.getCostOfLiving(urbanAreas, budget, costStatus)
+        salaries = self.getSalaryMedians(job, urbanAreas, budget, salaryStatus)
+        if status is not None:
+            for a in urbanAreas:
+                status[a] = _worstStatus(costStatus[a], salaryStatus[a])
+
+        weights = np.zeros(len(items))
+        if basket is None:
+            weights[:] = 1
+        else:
+            for i, item in enumerate(items):
+                weights[i] = basket.get(item, 0)
+
+        # areas without any cost of living data are left out when deciding which items are priced everywhere
+        hasData = ~np.isnan(costs).all(axis=1)
+        shared = ~np.isnan(costs[hasData]).any(axis=0) & (weights > 0)
+
+        basketCost = np.where(hasData, np.nan_to_num(costs[:, shared]) @ weights[shared], np.nan)
+        basketCost[basketCost == 0] = np.nan
+
+        power = salaries / basketCost
+        if np.isfinite(power).any():
+            power = power / np.nanmean(power) * 100
+
+        return areas, salaries, basketCost, power
+
+    @_showsDataAge
+    def plotPurchasingPower(self, job, urbanAreas, basket=None, fig=None, budget=None):
+        """plots the median salary, the cost of a basket of goods and the purchasing power for a job across many urban
+        areas as one grouped bar chart, each relative to the average of the urban areas
+
+        :param job: a string containing the name of the job
+        :param urbanAreas: a list of strings of urban areas
+        :param basket: an optional dictionary of {item: quantity}, see getPurchasingPower()
+        :param fig: an optional figure to reuse
+        :param budget: the most seconds to wait for the pages, see setLatencyBudget(), urban areas still loading after
+        that are marked on the chart and filled in when they arrive
+        :return: a figure to be displayed in tkinter
+        """
+        import numpy as np
+
+        status = {}
+        areas, salaries, basketCost, power = self.getPurchasingPower(job, urbanAreas, basket, budget, status)
+
+        def relative(values):
+            if np.isfinite(values).any():
+                return values / np.nanmean(values) * 100
+            return values
+
+        x = np.arange(len(areas))
+        width = 0.27
+
+        fig, ax = _figure(fig)
+        ax.bar(x - width, relative(salaries), width, label=f'Median salary ({job})', zorder=3)
+        ax.bar(x, relative(basketCost), width, label='Cost of basket', zorder=3)
+        ax.bar(x + width, power, width, label='Purchasing power', zorder=3)
+        ax.axhline(100, color='k', linewidth=0.8, zorder=4)
+
+        missing = np.isnan(power)
+        labels = [f'{a} ({_STATUS_TEXT.get(status[a], "no data")})' if m else a for a, m in zip(areas, missing)]
+        fig.urbanAreasStatus = status
+        degrees = 90 if len(areas) > 5 else 0
+        ax.set_xticks(x)
+        ax.set_xticklabels(labels, rotation=degrees)
+
+        ax.set_ylabel('Relative to the average urban area (100)')
+        ax.set_xlabel('Urban Areas')
+        ax.set_title(f'Purchasing Power for {job} by Urban Area')
+        ax.legend()
+        ax.grid(axis='y')
+        _tightLayout(fig)
+
+        return fig  # this is needed to display subplots in tkinter
+
+    @_showsDataAge
+    def plotMap(self, startingArea, urbanAreas, fig=None, budget=None):
+        """plots the urban areas the user wants to go to on a map
+
+        :param startingArea: a string containing the starting urban area of the user
+        :param urbanAreas: a list of strings of urbanAreas the user intends to move to
+        :param fig: an optional figure to reuse
+        :param budget: the most seconds to wait for the pages, see setLatencyBudget(), urban areas still loading after
+        that are noted on the map and filled in when they arrive
+        :return: a figure to be displayed in tkinter
+        """
+        pageStatus = {}
+        pages = self._fetchStart(startingArea, urbanAreas, budget, pageStatus)
+        startLat, startLon = _latLon(pages[self._urbanAreasID[startingArea]])
+        startingAreaCoord = (startLon, startLat)
 
         flightLength = {}
         pathCoord = {}
-
+        status = {}
         for a in urbanAreas:
-            xVal = [startingAreaCoord[0], destinationCoord[a][0]]
-            yVal = [startingAreaCoord[1], destinationCoord[a][1]]
-            pathCoord[a] = (xVal, yVal)
-
-            lon1 = pathCoord[a][0][0]
-            lat1 = pathCoord[a][1][0]
-            lon2 = pathCoord[a][0][1]
-            lat2 = pathCoord[a][1][1]
-
-            R = 6373  # radius of the earth in km
-            dlon = lon2 - lon1
-            dlat = lat2 - lat1
-            ar = (math.sin(dlat / 2)) ** 2 + math.cos(lat1) * math.cos(lat2) * (math.sin(dlon / 2)) ** 2
-            c = 2 * math.atan2(math.sqrt(ar), math.sqrt(1 - ar))
-            d = R * c
-            vPlane = 926  # average cruising speed of commercial planes in km/h
-            flightHours = d / vPlane
+            resultDict = pages.get(self._urbanAreasID[a])
+            status[a] = _areaStatus(pageStatus, self._urbanAreasID[a], resultDict is not None)
+            if resultDict is None:
+                continue
+            lat, lon = _latLon(resultDict)
+            pathCoord[a] = ([startLon, lon], [startLat, lat])
+            flightHours = _greatCircleKm(startLat, startLon, lat, lon) / _PLANE_SPEED
             flightLength[a] = round(flightHours*2)/2
 
-        fig, ax = plt.subplots()
-        fig.set_figheight(7)
-        fig.set_figwidth(10)
-        ax.imshow(self._img)
+        fig, ax = _figure(fig, (10, 7))
+        _drawBasemap(ax, [startLon] + [p[0][1] for p in pathCoord.values()],
+                     [startLat] + [p[1][1] for p in pathCoord.values()])
 
-        plt.plot(startingAreaCoord[0], startingAreaCoord[1], 'ro')
-        plt.annotate(startingArea, startingAreaCoord, color='k')
-
-        for a in urbanAreas:
-            plt.plot(pathCoord[a][0], pathCoord[a][1], 'r', label=a)
-            plt.plot(pathCoord[a][0][1], pathCoord[a][1][1], 'ro')
-            plt.annotate(f'{a}, {flightLength[a]:.1f} hours', (pathCoord[a][0][1], pathCoord[a][1][1]), color='k')
+        ax.plot(startingAreaCoord[0], startingAreaCoord[1], 'ro')
+        ax.annotate(startingArea, startingAreaCoord, color='k')
 
-        plt.title('Location of Urban Areas and Hours by Flight')
-        plt.axis('off')
-        plt.tight_layout()
+        for a in pathCoord:
+            ax.plot(pathCoord[a][0], pathCoord[a][1], 'r', label=a)
+            ax.plot(pathCoord[a][0][1], pathCoord[a][1][1], 'ro')
+            ax.annotate(f'{a}, {flightLength[a]:.1f} hours', (pathCoord[a][0][1], pathCoord[a][1][1]), color='k')
 
-        # plt.show()
+        ax.set_title('Location of Urban Areas and Hours by Flight')
+        ax.axis('off')
+        _tightLayout(fig)
+        _showStatus(fig, status)
 
         return fig  # this is needed to display subplots in tkinter
 
+    def getSimilarityIndex(self, job=None):
+        """gets the index of quality of life scores (and the median salary for a job) of every urban area, see
+        QualitySimilarity.py. It is built the first time, and after that only urban areas that are new to the catalog,
+        whose pages changed or whose pages could not be retrieved last time are retrieved and written into it
+
+        :param job: an optional string containing the name of a job whose median salary is added to the scores
+        :return: a SimilarityIndex shared by every UrbanAreas object
+        """
+        from QualitySimilarity import SimilarityIndex
+
+        # the catalog is only read again once its cached page expired and was retrieved again, it may have grown
+        url = _API_URL + 'urban_areas/'
+        entry = _cached(url)
+        if entry is None or entry[1] is not self._catalog:
+            self._catalog = _fetchPage(url)
+            for d in self._catalog['_links']['ua:item']:
+                self._urbanAreasID.setdefault(d['name'], d['href'])
+        else:
+            _track(url, entry[0])
+
+        with _indexLock:
+            if job not in _indexes:
+                features = self._metrics + ([job] if job is not None else [])
+                _indexes[job] = (SimilarityIndex(features), set(), None, set())
+            index, changed, catalog, failed = _indexes[job]
+            if catalog is self._catalog and not changed and not failed:  # up to date, nothing new to retrieve
+                return index
+            stale = {a for a, href in self._urbanAreasID.items() if href + 'scores/' in changed
+                     or (job is not None and href + 'salaries/' in changed)}
+            changed.clear()
+
+        missing = [a for a in self._urbanAreasID if a not in index or a in stale or a in failed]
+        failed = set()
+        if missing:
+            found = {}
+            scores = self.getScores(missing, None, found)
+            areas = list(scores)
+            medians = self.getSalaryMedians(job, areas, None, found) if job is not None else None
+            failed = {a for a, s in found.items() if s in ('error', 'timeout')}  # tried again on the next query
+            vectors = {}
+            for i, a in enumerate(areas):
+                vectors[a] = [scores[a].get(m, float('nan')) for m in self._metrics]
+                if medians is not None:
+                    vectors[a].append(medians[i])
+            with _indexLock:
+                index.update(vectors)
+        with _indexLock:
+            _indexes[job] = (index, changed, self._catalog, failed)
+        return index
+
+    def similarAreas(self, urbanArea, k=5, job=None):
+        """finds the urban areas whose quality of life scores (and median salary for a job) are most like one
+
+        :param urbanArea: a string containing an urban area
+        :param k: the number of urban areas to find
+        :param job: an optional string containing the name of a job whose median salary is compared as well
+        :return: a list of tuples containing (urban area, distance in standard deviations), most alike first
+        """
+        index = self.getSimilarityIndex(job)
+        with _indexLock:
+            return index.nearest(urbanArea, k)
+
+    def clusterAreas(self, k, job=None):
+        """groups every urban area into k clusters of areas with alike quality of life scores (and median salary)
+
+        :param k: the number of clusters
+        :param job: an optional string containing the name of a job whose median salary is compared as well
+        :return: a list of k lists of urban areas, largest cluster first
+        """
+        index = self.getSimilarityIndex(job)
+        with _indexLock:
+            labels, _ = index.cluster(k)
+            areas = index.getAreas()
+
+        clusters = [[] for _ in range(max(labels, default=-1) + 1)]
+        for a, label in zip(areas, labels):
+            clusters[label].append(a)
+        return sorted((c for c in clusters if c), key=len, reverse=True)
+
+    @_showsDataAge
+    def plotSimilarAreas(self, urbanArea, k=10, job=None, fig=None):
+        """plots the urban areas most like one, with how far their scores are from it
+
+        :param urbanArea: a string containing an urban area
+        :param k: the number of urban areas to show
+        :param job: an optional string containing the name of a job whose median salary is compared as well
+        :param fig: an optional figure to reuse
+        :return: a figure to be displayed in tkinter
+        """
+        similar = self.similarAreas(urbanArea, k, job)
+        names = [a for a, _ in similar][::-1]
+        distances = [d for _, d in similar][::-1]
+
+        fig, ax = _figure(fig, (8, 6))
+        ax.barh(names, distances, color='seagreen')
+        ax.set_xlabel('Difference in Standard Deviations (Smaller Is More Alike)')
+        ax.set_title(f'Urban Areas Most Like {urbanArea}' + (f' for {job}' if job is not None else ''))
+        _tightLayout(fig)
+
+        return fig
+
+    def getFeatureTable(self, urbanAreas=None, jobs=(), costs=False, budget=None, status=None):
+        """lines up the quality of life scores, the salary percentiles for some jobs and optionally the cost of living
+        items of many urban areas into one table, see QualityAnalytics.py
+
+        :param urbanAreas: a list of strings of urban areas, every urban area in the catalog by default
+        :param jobs: a list of strings of jobs, each adds the columns '<job> p25', '<job> p50' and '<job> p75'
+        :param costs: True to add a column 'Cost: <item>' for every cost of living item
+        :param budget: the most seconds to wait for the pages, by default the one set with setLatencyBudget()
+        :param status: an optional dictionary, filled in with every urban area as keys and 'ok' (it has at least one
+        value), 'missing-data', 'timeout' or 'error' as values
+        :return: a FeatureTable with a row for every urban area and NaN where an urban area has no value
+        """
+        import numpy as np
+
+        table, statuses = self._getFeatureTable(urbanAreas, jobs, costs, budget)
+        if status is not None:
+            hasData = ~np.isnan(table.values).all(axis=1)
+            for a, has in zip(table.areas, hasData):
+                status[a] = 'ok' if has else _worstStatus(*statuses[a])
+        return table
+
+    def _getFeatureTable(self, urbanAreas, jobs, costs, budget):
+        """does the work of getFeatureTable()
+
+        :return: a tuple containing (FeatureTable, dictionary with the urban areas as keys and lists of the status of
+        each of their pages as values)
+        """
+        import numpy as np
+        from QualityAnalytics import FeatureTable
+
+        areas = list(self._urbanAreasID) if urbanAreas is None else list(urbanAreas)
+        statuses = {a: [] for a in areas}
+
+        def collect(found):
+            for a, s in found.items():
+                statuses[a].append(s)
+
+        found = {}
+        scores = self.getScores(areas, budget, found)
+        collect(found)
+        tables = [FeatureTable(areas, self._metrics,
+                               [[scores.get(a, {}).get(m, np.nan) for m in self._metrics] for a in areas])]
+
+        for job in jobs:
+            found = {}
+            salaries = self.getSalaries(job, areas, budget, found)
+            collect(found)
+            tables.append(FeatureTable(areas, [f'{job} p25', f'{job} p50', f'{job} p75'],
+                                       [salaries.get(a, [np.nan] * 3) for a in areas]))
+
+        if costs:
+            found = {}
+            _, items, matrix = self.getCostOfLiving(areas, budget, found)
+            collect(found)
+            tables.append(FeatureTable(areas, ['Cost: ' + item for item in items], matrix))
+
+        return FeatureTable.join(tables), statuses
+
+    @_showsDataAge
+    def plotCorrelations(self, urbanAreas=None, jobs=(), costs=False, fig=None, budget=None):
+        """plots the correlation between every pair of features of getFeatureTable() as a heat map
+
+        :param urbanAreas: a list of strings of urban areas, every urban area in the catalog by default
+        :param jobs: a list of strings of jobs whose salary percentiles are added
+        :param costs: True to add the cost of living items
+        :param fig: an optional figure to reuse
+        :param budget: the most seconds to wait for the pages, see setLatencyBudget()
+        :return: a figure to be displayed in tkinter
+        """
+        from QualityAnalytics import drawCorrelations
+
+        status = {}
+        table = self.getFeatureTable(urbanAreas, jobs, costs, budget, status)
+
+        fig, ax = _figure(fig, (10, 9))
+        image = drawCorrelations(ax, table)
+        fig.colorbar(image, ax=ax, label='Correlation')
+        ax.set_title(f'Correlations Across {sum(s == "ok" for s in status.values())} Urban Areas')
+        _tightLayout(fig)
+        _showStatus(fig, status)
+
+        return fig
+
+    @_showsDataAge
+    def plotScatter(self, xFeature, yFeature, urbanAreas=None, jobs=(), costs=False, highlight=(), fig=None,
+                    budget=None):
+        """plots one feature of getFeatureTable() against another for many urban areas, with a straight line fitted
+        through them
+
+        :param xFeature: a string naming the feature across, such as 'Housing' or 'Software Engineer p50'
+        :param yFeature: a string naming the feature up
+        :param urbanAreas: a list of strings of urban areas, every urban area in the catalog by default
+        :param jobs: a list of strings of jobs whose salary percentiles are added
+        :param costs: True to add the cost of living items
+        :param highlight: a list of strings of urban areas to name on the plot
+        :param fig: an optional figure to reuse
+        :param budget: the most seconds to wait for the pages, see setLatencyBudget()
+        :return: a figure to be displayed in tkinter
+        """
+        from QualityAnalytics import drawScatter
+
+        status = {}
+        table = self.getFeatureTable(urbanAreas, jobs, costs, budget, status)
+        for feature in (xFeature, yFeature):
+            if feature not in table.features:
+                raise ValueError(f'no feature called {feature!r}')
+
+        fig, ax = _figure(fig, (9, 7))
+        slope, intercept, r2, n = drawScatter(ax, table, xFeature, yFeature, highlight)
+        if n:
+            ax.set_title(f'{yFeature} Against {xFeature} Across {n} Urban Areas\n'
+                         f'y = {slope:.3g}x + {intercept:.3g}, R² = {r2:.2f}')
+        else:
+            ax.set_title(f'No Urban Areas Have Both {xFeature} and {yFeature}')
+        _tightLayout(fig)
+        _showStatus(fig, status)
+
+        return fig
+
+    def getRelocationScorer(self, jobs=(), budget=0, status=None):
+        """retrieves the location, quality of life scores and median salaries for some jobs of every urban area at once,
+        to score urban areas to move to for many people, see QualityRelocation.py
+
+        :param jobs: a list of strings of the jobs of the people to score, jobs that are not known are left out
+        :param budget: the most seconds to wait for the pages, by default every page is waited for
+        :param status: an optional dictionary, filled in with every urban area as keys and 'ok', 'timeout' or 'error'
+        (some of its pages could not be retrieved, so it is left out or scored without them) as values
+        :return: a RelocationScorer
+        """
+        import numpy as np
+        from QualityRelocation import RelocationScorer
+
+        areas = self.getUrbanAreas()
+        known = [j for j in jobs if j in self._jobs]
+        found = {}
+        latitudes, longitudes = self.getLocations(areas, budget, found)
+        statuses = {a: [s] for a, s in found.items()}
+        table, tableStatuses = self._getFeatureTable(areas, (), False, budget)
+        salaries = []
+        for j in known:
+            found = {}
+            salaries.append(self.getSalaryMedians(j, areas, budget, found))
+            for a, s in found.items():
+                statuses[a].append(s)
+        salaries = np.array(salaries).reshape(len(known), len(areas))
+        if status is not None:
+            for a in areas:
+                status[a] = _worstStatus(*(s for s in statuses[a] + tableStatuses[a] if s != 'missing-data'))
+        return RelocationScorer(areas, latitudes, longitudes, table.features, table.values, known, salaries,
+                                _EARTH_RADIUS, _PLANE_SPEED)
+
+    def planTrip(self, startingArea, urbanAreas, roundTrip=False, budget=None, status=None):
+        """works out a short order to fly to many urban areas in, see QualityTrip.py. Urban areas that cannot be
+        retrieved within the budget are left out of the trip
+
+        :param startingArea: a string containing the urban area the trip starts from
+        :param urbanAreas: a list of strings of urban areas to visit
+        :param roundTrip: True if the trip ends back at startingArea
+        :param budget: the most seconds to wait for the pages, by default the one set with setLatencyBudget()
+        :param status: an optional dictionary, filled in with every urban area as keys and 'ok', 'missing-data',
+        'timeout' or 'error' as values
+        :return: a tuple containing (a list of the urban areas in the order visited, starting with startingArea and on a
+        round trip ending with it too, a list of the hours by flight of each leg, the total hours by flight)
+        """
+        import numpy as np
+        from QualityTrip import distanceMatrix, planTour
+
+        areas = [startingArea] + [a for a in dict.fromkeys(urbanAreas) if a != startingArea]
+        pageStatus = {}
+        pages = self._fetchStart(startingArea, areas[1:], budget, pageStatus)
+        points = [_latLon(pages[self._urbanAreasID[startingArea]])]
+        visited = [startingArea]
+        for a in areas[1:]:
+            resultDict = pages.get(self._urbanAreasID[a])
+            if resultDict is not None:
+                points.append(_latLon(resultDict))
+                visited.append(a)
+            if status is not None:
+                status[a] = _areaStatus(pageStatus, self._urbanAreasID[a], resultDict is not None)
+
+        latitudes, longitudes = np.array(points).T
+        hours = distanceMatrix(latitudes, longitudes, _EARTH_RADIUS) / _PLANE_SPEED
+        order = planTour(hours, roundTrip)
+        if roundTrip and len(order) > 1:
+            order.append(0)
+        legs = hours[order[:-1], order[1:]]
+        return [visited[i] for i in order], legs.tolist(), float(legs.sum())
+
+    @_showsDataAge
+    def plotTrip(self, startingArea, urbanAreas, roundTrip=False, fig=None, budget=None):
+        """plots a trip through many urban areas on a map as one route, in the order worked out by planTrip()
+
+        :param startingArea: a string containing the urban area the trip starts from
+        :param urbanAreas: a list of strings of urban areas to visit
+        :param roundTrip: True if the trip ends back at startingArea
+        :param fig: an optional figure to reuse
+        :param budget: the most seconds to wait for the pages, see setLatencyBudget(), urban areas still loading after
+        that are noted on the map and the trip is planned again when they arrive
+        :return: a figure to be displayed in tkinter
+        """
+        import numpy as np
+
+        status = {}
+        order, legs, total = self.planTrip(startingArea, urbanAreas, roundTrip, budget, status)
+        pages = _fetchAll([self._urbanAreasID[a] for a in order])
+        coords = np.array([_latLon(pages[self._urbanAreasID[a]])[::-1] for a in order])  # (longitude, latitude)
+
+        fig, ax = _figure(fig, (10, 7))
+        _drawBasemap(ax, coords[:, 0], coords[:, 1])
+        ax.plot(coords[:, 0], coords[:, 1], 'r-', marker='o', markersize=4)  # the whole trip is one line
+        ax.plot(coords[0, 0], coords[0, 1], 'ko')
+
+        stops = len(order) - 1 if roundTrip and len(order) > 1 else len(order)
+        for i in range(stops):
+            label = startingArea if i == 0 else f'{i}. {order[i]}'
+            ax.annotate(label, coords[i], color='k', fontsize=8 if stops <= 20 else 6)
+
+        ax.set_title(f'Trip Through {stops - 1} Urban Areas, {total:.1f} Hours by Flight')
+        ax.axis('off')
+        _tightLayout(fig)
+        _showStatus(fig, status)
+
+        return fig
+
     def nearestArea(self, latitude, longitude):
         """finds the nearest urban area to the user and an image of it
 
@@ -397,21 +2036,26 @@ class UrbanAreas:
         :return: a tuple containing the nearest urban area of the user and an image of it (nearestArea, image)
 
         """
-        url2 = 'https://api.teleport.org/api/locations/' + str(latitude) + ',' + str(longitude)
-        page2 = requests.get(url2)
-        resultDict2 = page2.json()
+        import requests
+        from PIL import Image
+
+        url2 = _API_URL + 'locations/' + str(latitude) + ',' + str(longitude)
+        resultDict2 = _fetchPage(url2)
         nearestUrbanAreaImage = None
 
         try:
             nearestUrbanArea = resultDict2['_embedded']['location:nearest-urban-areas'][0]['_links']['location:nearest-' 
                                                                                                 'urban-area']['name']
             url3 = self._urbanAreasID[nearestUrbanArea] + 'images/'
-            page3 = requests.get(url3)
-            resultDict3 = page3.json()
+            resultDict3 = _fetchPage(url3)
 
             imgLink = resultDict3['photos'][0]['image']['web']
-            response = requests.get(imgLink)
-            nearestUrbanAreaImage = Image.open(BytesIO(response.content))
+            try:
+                response = requests.get(imgLink, timeout=_REQUEST_TIMEOUT)
+                response.raise_for_status()
+                nearestUrbanAreaImage = Image.open(BytesIO(response.content))
+            except requests.RequestException:
+                pass  # the urban area is still handed back, without an image
 
         except (IndexError, TypeError):
             try:
@@ -423,6 +2067,15 @@ class UrbanAreas:
         return nearestUrbanArea, nearestUrbanAreaImage
 
 
+# every public method is timed when profiling is on, and the plots count as the phase 'plot', see QualityProfile.py.
+# Called outside of an action, only the plots and the methods retrieving data are profiled as actions of their own
+_PROFILED_ACTIONS = {'getCostOfLiving', 'getSalaries', 'getScores', 'getDistances', 'getLocations', 'getSalaryMedians',
+                     'getPurchasingPower', 'getSimilarityIndex', 'similarAreas', 'clusterAreas', 'getFeatureTable',
+                     'getRelocationScorer', 'recordHistory', 'planTrip', 'nearestArea'}
+QualityProfile.instrument(UrbanAreas, lambda name: 'plot' if name.startswith('plot') else None,
+                          lambda name: name.startswith('plot') or name in _PROFILED_ACTIONS)
+
+
 ### ---------- Documentation ---------- ###
 
 ### UrbanAreas() creates an object for accessing information for an urban area
@@ -466,8 +2119,8 @@ class UrbanAreas:
 ### Usage: plotSalaries(job, urbanAreas)
 ### Plots out salaries for the job 'Account Manager' and the urban areas ['Aarhus','Adelaide','Albuquerque']
 
-### run the example below and uncomment #plt.show in plotSalaries() to see an example plot without tkinter:
-# u.plotSalaries('Account Manager', ['Aarhus', 'Adelaide', 'Albuquerque'])
+### run the example below to save an example plot without tkinter:
+# u.plotSalaries('Account Manager', ['Aarhus', 'Adelaide', 'Albuquerque']).savefig('salaries.png')
 
 ### an example of how to use this with tkinter, where PlotWindow is the tk.TopLevel class:
 # PlotWindow(lambda: u.plotSalaries('Account Manager', ['Aarhus', 'Adelaide', 'Albuquerque']))
@@ -479,21 +2132,50 @@ class UrbanAreas:
 ### Plots out quality of life scores for a given metric across multiple urban areas
 ### returns a figure to be used in PlotWindow() class, has multiple *subplots*
 
-### run the example below and uncomment #plt.show in plotCompareQuality() to see an example plot without tkinter:
-# u.plotCompareQuality('Housing', ['Aarhus', 'Adelaide', 'Albuquerque'])
+### run the example below to save an example plot without tkinter:
+# u.plotCompareQuality('Housing', ['Aarhus', 'Adelaide', 'Albuquerque']).savefig('quality.png')
+
+### the charts of many urban areas wait at most setLatencyBudget() seconds (20 by default) for their pages, urban areas
+### that are still loading, failed or have no data are named along the bottom and kept in fig.urbanAreasStatus:
+# print(u.plotCompareQuality('Housing', u.getUrbanAreas(), budget=2).urbanAreasStatus)
+# status = {}
+# u.getSalaries('Account Manager', u.getUrbanAreas(), budget=2, status=status)
+
+### with more than 25 urban areas the chart becomes sorted horizontal bars shown 40 areas a page (page=0, 1, ...), and
+### with more than 120 a histogram of the scores with the highest and lowest (or highlight=[...]) marked. view='bars',
+### 'ranked' or 'distribution' picks one of them, the same works for plotSalaries():
+# u.plotCompareQuality('Housing', u.getUrbanAreas(), highlight=['Aarhus']).savefig('quality.png')
+# u.plotSalaries('Account Manager', u.getUrbanAreas(), view='ranked', page=1).savefig('salaries.png')
 
 ### an example of how to use this with tkinter, where PlotWindow is the tk.TopLevel class:
 # use a PlotWindow() class that takes in a figure from this method
 # PlotWindow(lambda: u.plotCompareQuality('Housing', ['Aarhus', 'Adelaide', 'Albuquerque']))
 
 
+### ---------- Keeping a History of Scores and Salaries (Choice 2) -----------###
+
+### Usage: recordHistory(history=None, jobs=None, budget=0, status=None)
+### Adds the scores and salaries of every urban area to the history as a snapshot of what changed, run it every so often
+### (python QualityHistory.py record does the same from cron). It waits for every page, and status tells which urban
+### areas could not be retrieved and kept their last values
+
+### Usage: getHistory()
+### Returns the HistoryStore, with series(area, feature), valuesAt(feature, when) and biggestChanges(feature)
+
+# run the example below to see how the scores and salaries moved:
+# u.recordHistory()
+# print(u.getHistory().series('Aarhus', 'Housing'))
+# print(u.getHistory().biggestChanges('Account Manager p50', n=5))
+# u.plotCompareQuality('Housing', ['Aarhus', 'Adelaide', 'Albuquerque'], view='trend').savefig('trend.png')
+
+
 ### ---------- Plotting Comparing Quality of Life Across One Area (Choice 3A) -----------###
 
 ### Usage: plotAllQuality(urbanArea)
 ### Plots out all quality of life scores for a given urban area, returns data in an SQLite database
 
-### run the example below and uncomment #plt.show in plotCompareQuality() to see an example plot without tkinter:
-# u.plotAllQuality('Aarhus')
+### run the example below to save an example plot without tkinter:
+# u.plotAllQuality('Aarhus').savefig('quality.png')
 
 
 ### an example of how to use this with tkinter, where PlotWindow is the tk.TopLevel class:
@@ -505,8 +2187,8 @@ class UrbanAreas:
 ### Usage: plotCostOfLiving(urbanArea)
 ### Plots out costs of living for a given urban area
 
-### run the example below and uncomment #plt.show in plotCostOfLiving() to see an example plot without tkinter:
-# u.plotCostOfLiving('Aarhus')
+### run the example below to save an example plot without tkinter:
+# u.plotCostOfLiving('Aarhus').savefig('cost.png')
 
 ### an example of how to use this with tkinter, where PlotWindow is the tk.TopLevel class:
 # PlotWindow(lambda: u.plotCostOfLiving('Aarhus'))
@@ -524,14 +2206,96 @@ class UrbanAreas:
 # print(data)
 
 
+### ---------- Comparing Purchasing Power Across Multiple Areas (Choice 5) -----------###
+
+### Usage: getCostOfLiving(urbanAreas)
+### Retrieves the cost of living items for all the urban areas in one batch, returns (areas, items, matrix of costs)
+
+### Usage: getPurchasingPower(job, urbanAreas, basket=None)
+### Divides the median salary for the job by the cost of a basket of goods in every urban area,
+### returns (areas, median salaries, basket costs, purchasing power indices where the average area is 100)
+
+### Usage: plotPurchasingPower(job, urbanAreas, basket=None)
+### returns a figure to be used in PlotWindow() class, has a *subplot*
+
+### run the example below to save an example plot without tkinter:
+# u.plotPurchasingPower('Account Manager', ['Aarhus', 'Adelaide', 'Albuquerque']).savefig('power.png')
+# u.plotPurchasingPower('Account Manager', ['Aarhus', 'Adelaide'], basket={'Cappuccino': 30, 'Lunch': 20})
+
+
+### ---------- Exporting Data for Many Urban Areas -----------###
+
+### Usage: iterResults(urbanAreas, job=None, startingArea=None, status=None)
+### Hands back (urban area, category, item, statistic, value) rows as the data arrives, used by QualityExport.py
+
+### run the example below to write the data for every urban area to a file (.csv, .jsonl or .parquet), it hands back
+### the number of rows and the urban areas whose data could not all be retrieved:
+# from QualityExport import exportResults
+# rows, missing = exportResults(u, 'urban_areas.csv', u.getUrbanAreas(), job='Account Manager', startingArea='Aarhus')
+
+
 ### ---------- Mapping Distances of Urban Areas (Choice 4) -----------###
 
 ### Usage: plotMap(startingArea, urbanAreas)
 ### Plots out the locations from a starting area to multiple urban areas
 ### returns a figure to be used in PlotWindow() class, has a *subplot*
 
-# run the example below and uncomment #plt.show in plotMap() to see an example plot without tkinter:
-# u.plotMap('Aarhus', ['Adelaide', 'Albuquerque', 'Almaty'])
+# run the example below to save an example plot without tkinter:
+# u.plotMap('Aarhus', ['Adelaide', 'Albuquerque', 'Almaty']).savefig('map.png')
+
+
+### ---------- Finding Alike Urban Areas (Choice 3C) -----------###
+
+### Usage: similarAreas(urbanArea, k=5, job=None)
+### Finds the k urban areas with the most alike quality of life scores (and median salary for the job if given)
+
+### Usage: clusterAreas(k, job=None)
+### Groups every urban area into k clusters of alike areas with k-means, returns lists of urban areas
+
+### Usage: plotSimilarAreas(urbanArea, k=10, job=None)
+### returns a figure to be used in PlotWindow() class
+
+# run the example below to save an example plot without tkinter:
+# u.plotSimilarAreas('Aarhus').savefig('similar.png')
+# print(u.clusterAreas(6))
+
+### ---------- Planning a Trip Through Many Urban Areas (Choice 4) -----------###
+
+### Usage: planTrip(startingArea, urbanAreas, roundTrip=False)
+### Works out a short order to fly to the urban areas in, returns (areas in order, hours of each leg, total hours)
+
+### Usage: plotTrip(startingArea, urbanAreas, roundTrip=False)
+### Plots the trip as one route on the world map, returns a figure to be used in PlotWindow() class
+
+# run the example below to save an example plot without tkinter:
+# u.plotTrip('Aarhus', u.getUrbanAreas()[:50], roundTrip=True).savefig('trip.png')
+
+
+### ---------- Comparing Features Across the Catalog (Choice 6) -----------###
+
+### Usage: getFeatureTable(urbanAreas=None, jobs=(), costs=False)
+### Lines up the scores, salary percentiles for the jobs ('<job> p50' and so on) and cost of living items
+### ('Cost: <item>') of every urban area into a FeatureTable, see QualityAnalytics.py for correlate() and regress()
+
+### Usage: plotCorrelations(urbanAreas=None, jobs=(), costs=False) and plotScatter(xFeature, yFeature, ...)
+### returns a figure to be used in PlotWindow() class
+
+# run the example below to see whether the Housing score follows the median salary of a job:
+# from QualityAnalytics import correlate, regress
+# table = u.getFeatureTable(jobs=['Account Manager'])
+# print(regress(table, 'Account Manager p50')['Housing'])
+# u.plotScatter('Account Manager p50', 'Housing', jobs=['Account Manager']).savefig('scatter.png')
+# u.plotCorrelations(jobs=['Account Manager']).savefig('correlations.png')
+
+
+### ---------- Shortlists of Urban Areas to Move To for Many People -----------###
+
+### Usage: getRelocationScorer(jobs)
+### Retrieves the data of every urban area once, returns a RelocationScorer that scores urban areas for many people
+
+### run the example below to write the best 5 urban areas for every person in a CSV (see QualityRelocation.py):
+# from QualityRelocation import relocate
+# relocate(u, 'employees.csv', 'shortlists.csv', k=5)
 
 
 ### ---------- Nearest Urban Area (Choice 4) -----------###
@@ -0,0 +1,113 @@
+"""
+Description: Exports the data of many urban areas (salaries, quality of life scores, cost of living and distances) to a
+CSV, JSON Lines or Parquet file. Rows are written in chunks as the pages arrive from the API, so exporting every urban
+area does not need the whole export to be held in memory. The file is written next to its final name and only moved
+into place once it is complete. Every page is waited for, and the urban areas whose pages could not be retrieved are
+handed back, so that a partial export is never taken for a complete one.
+"""
+
+import csv
+import json
+import os
+
+COLUMNS = ('urban_area', 'category', 'item', 'statistic', 'value')
+FORMATS = ('csv', 'jsonl', 'parquet')
+
+
+class _CsvWriter:
+    """writes chunks of rows to a CSV file"""
+
+    def __init__(self, path):
+        self._file = open(path, 'w', newline='', encoding='utf-8', buffering=2 ** 16)
+        self._writer = csv.writer(self._file)
+        self._writer.writerow(COLUMNS)
+
+    def write(self, rows):
+        self._writer.writerows(rows)
+
+    def close(self):
+        self._file.close()
+
+
+class _JsonlWriter:
+    """writes chunks of rows to a JSON Lines file, one object per row"""
+
+    def __init__(self, path):
+        self._file = open(path, 'w', encoding='utf-8', buffering=2 ** 16)
+
+    def write(self, rows):
+        self._file.write(''.join(json.dumps(dict(zip(COLUMNS, r))) + '\n' for r in rows))
+
+    def close(self):
+        self._file.close()
+
+
+class _ParquetWriter:
+    """writes chunks of rows to a Parquet file, one row group per chunk (needs pyarrow)"""
+
+    def __init__(self, path):
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise ImportError('exporting to Parquet needs pyarrow, which can be installed with: pip install pyarrow')
+
+        self._pa = pa
+        self._schema = pa.schema([(c, pa.string()) for c in COLUMNS[:-1]] + [(COLUMNS[-1], pa.float64())])
+        self._writer = pq.ParquetWriter(path, self._schema)
+
+    def write(self, rows):
+        columns = list(zip(*rows))
+        self._writer.write_table(self._pa.Table.from_arrays(
+            [self._pa.array(c, type=f.type) for c, f in zip(columns, self._schema)], schema=self._schema))
+
+    def close(self):
+        self._writer.close()
+
+
+_WRITERS = {'csv': _CsvWriter, 'jsonl': _JsonlWriter, 'parquet': _ParquetWriter}
+
+
+def exportResults(urbanAreas, path, areas, job=None, startingArea=None, fileFormat=None, chunkSize=1000):
+    """exports the data for many urban areas to a file, with one row per value in the columns urban_area, category,
+    item, statistic and value
+
+    :param urbanAreas: an UrbanAreas object
+    :param path: a string with the path of the file to write, it is never changed to a different directory
+    :param areas: a list of strings of urban areas
+    :param job: an optional string containing the name of a job to export salaries for
+    :param startingArea: an optional string containing an urban area to export distances from
+    :param fileFormat: 'csv', 'jsonl' or 'parquet', by default taken from the extension of path
+    :param chunkSize: the number of rows written at a time
+    :return: a tuple containing (the number of rows written, a list of the urban areas whose data could not all be
+    retrieved, so that some of their rows are missing)
+    """
+    if fileFormat is None:
+        fileFormat = os.path.splitext(path)[1].lstrip('.')
+    fileFormat = fileFormat.lower()
+    if fileFormat not in _WRITERS:
+        raise ValueError(f'unknown export format {fileFormat!r}, expected one of {", ".join(FORMATS)}')
+
+    partPath = path + '.part'
+    writer = _WRITERS[fileFormat](partPath)
+    count = 0
+    status = {}
+    try:
+        chunk = []
+        for row in urbanAreas.iterResults(areas, job, startingArea, status):
+            chunk.append(row)
+            if len(chunk) >= chunkSize:
+                writer.write(chunk)
+                count += len(chunk)
+                chunk = []
+        if chunk:
+            writer.write(chunk)
+            count += len(chunk)
+    except BaseException:
+        writer.close()
+        os.remove(partPath)
+        raise
+
+    writer.close()
+    os.replace(partPath, path)
+    return count, [a for a in areas if status.get(a) != 'ok']
@@ -7,12 +7,14 @@ they would like to visualize or compare.
 
 import tkinter as tk
 import tkinter.messagebox as tkmb
-import matplotlib.pyplot as plt
-from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
 import tkinter.filedialog
 import os
+import QualityProfile
 from QualityBackEnd import UrbanAreas
-from PIL import ImageTk
+from QualityExport import exportResults
+
+# matplotlib and PIL are imported by the windows that display plots and images, so the main window appears without
+# waiting for them to load
 
 
 class SingClickWin(tk.Toplevel):
@@ -65,12 +67,14 @@ class SingClickWin(tk.Toplevel):
 
 class MultUrbanAreaWin(tk.Toplevel):
     """
-    Top level class that allows the user to choose multiple urban areas to look at.
+    Top level class that allows the user to choose multiple urban areas to look at. While the user is choosing, the
+    data for the urban areas they highlight (and for the ones they used recently) is retrieved in the background.
     """
-    def __init__(self, master):
+    def __init__(self, master, prefetch=()):
         """
         Constructor of the window that contains a listbox of all urban areas, a scrollbar that is configured to the
-        listbox, and a button that allows the user to confirm their choices.
+        listbox, and a button that allows the user to confirm their choices. prefetch is a tuple of the pages to
+        retrieve ahead of time for highlighted urban areas, such as ('salaries/',).
         """
         super().__init__(master)
         self._UrbanAreas = UrbanAreas()
@@ -83,6 +87,8 @@ class MultUrbanAreaWin(tk.Toplevel):
         self.resizable(True, True)
 
         self._user_choices = []  # Will contain user choices
+        self._prefetch = prefetch  # Pages retrieved in the background for highlighted urban areas
+        self._highlighted = set()  # Urban areas highlighted in the listbox so far
 
         self.LB = tk.Listbox(self, height=10, width=50, selectmode="multiple")  # Creates a Listbox
         self.LB.grid()  # Grids the Listbox
@@ -94,10 +100,38 @@ class MultUrbanAreaWin(tk.Toplevel):
 
         self._ua_list = self._UrbanAreas.getUrbanAreas()
         self.LB.insert(tk.END, *self._ua_list)
+        self.LB.bind('<<ListboxSelect>>', self.prefetch_selection)
 
         b1 = tk.Button(self, text="OK", command=self.set_urban_areas)
         b1.grid(row=1)  # Grids the button
 
+        for page in self._prefetch:  # the user is likely to pick some of the same urban areas again
+            self._UrbanAreas.prefetch(self._UrbanAreas.getRecentAreas(), page)
+
+        self.protocol("WM_DELETE_WINDOW", self.on_closing)
+
+    def prefetch_selection(self, event=None):
+        """
+        Starts retrieving data for urban areas as soon as they are highlighted, and cancels it for urban areas that are
+        no longer highlighted.
+        """
+        highlighted = {self._ua_list[i] for i in self.LB.curselection()}
+        added = [a for a in self._ua_list if a in highlighted - self._highlighted]
+        removed = list(self._highlighted - highlighted)
+        self._highlighted = highlighted
+        for page in self._prefetch:
+            self._UrbanAreas.cancelPrefetch(removed, page)
+            self._UrbanAreas.prefetch(added, page)
+
+    def on_closing(self):
+        """
+        Cancels the data still waiting to be retrieved for highlighted urban areas when the user closes the window
+        without choosing.
+        """
+        for page in self._prefetch:
+            self._UrbanAreas.cancelPrefetch(list(self._highlighted), page)
+        self.destroy()
+
     def set_urban_areas(self):
         """
         Sets the user choices as a list of all the urban areas selected by user in the listbox
@@ -115,22 +149,24 @@ class MultUrbanAreaWin(tk.Toplevel):
 
 class QolForOneUAWin(tk.Toplevel):
     """
-    Top level class that allows user to choose to plot the quality of life data or cost of living data.
-    If the user chooses the first option, a PlotWin object is created. When the PlotWin window is closed,
-    the user can select to save that data to the file. If the user chooses the second option, a PlotWin object
-    is created and the cost of living data is plotted.
+    Top level class that allows user to choose to plot the quality of life data, the urban areas most like the chosen
+    one or cost of living data. If the user chooses the first option, a PlotWin object is created. When the PlotWin
+    window is closed, the user can select to save that data to the file. If the user chooses the second or third
+    option, a PlotWin object is created and the alike urban areas or the cost of living data is plotted.
     """
+    wait_window = QualityProfile.paused(tk.Toplevel.wait_window)  # time waiting for the user is not profiled
+
     def __init__(self, master, ua):
         """
-        Constructor of the window that contains two buttons, one to plot the quality of life data and another to
-        plot the cost of living data.
+        Constructor of the window that contains three buttons, one to plot the quality of life data, one to plot the
+        urban areas with the most alike quality of life and another to plot the cost of living data.
         """
         super().__init__(master)
         self._UrbanAreas = UrbanAreas()
         self._ua = ua
         self.title("Option Window")
-        self.geometry("550x250+1100+300")
-        self.minsize(550, 250)
+        self.geometry("850x250+800+300")
+        self.minsize(850, 250)
         self.resizable(True, True)
         self.configure(bg='orange2')
         tk.Label(self, text="Choose one of the following options:", fg='dark green', font=('Trebuchet MS', 18),
@@ -139,6 +175,11 @@ class QolForOneUAWin(tk.Toplevel):
                   bg='linen', fg='dark green').grid(row=1, column=0, padx=30, pady=10)
         tk.Label(self, text='Select this option to see all\nquality of life data plotted', fg='dark green',
                  font=('Trebuchet MS', 12), bg='orange2', justify=tk.LEFT).grid(row=3, column=0, padx=30, pady=10)
+        tk.Button(self, text="Find Alike Urban Areas", command=self.plt_similar, font=('Arial', 12), width=20,
+                  height=3, bg='linen', fg='dark green').grid(row=1, column=1, padx=30, pady=10)
+        tk.Label(self, text='Select this option to see the\nurban areas with the most\nalike quality of life',
+                 fg='dark green', font=('Trebuchet MS', 12), bg='orange2', justify=tk.LEFT).grid(row=3, column=1,
+                                                                                                 padx=30, pady=10)
         tk.Button(self, text="Plot Cost of Living Data", command=self.plt_col, font=('Arial', 12), width=20, height=3,
                   bg='linen', fg='dark green').grid(row=1, column=2, padx=30, pady=10)
         tk.Label(self, text='Select this option plot\ndetailed cost of living data', fg='dark green',
@@ -147,12 +188,13 @@ class QolForOneUAWin(tk.Toplevel):
         self.grid_columnconfigure(2, weight=1)
         self.grid_rowconfigure(0, weight=1)
 
+    @QualityProfile.action
     def plt_qol(self):
         """
         This method creates a PlotWin object that plots the quality of life data. When the window is closed, the user
         can select to save the data to a file. If they choose it, then the save_to_file static method is called.
         """
-        win = PlotWin(self, lambda: self._UrbanAreas.plotAllQuality(self._ua))
+        win = PlotWin(self, lambda fig=None: self._UrbanAreas.plotAllQuality(self._ua, fig=fig), self._UrbanAreas)
         self.wait_window(win)
         save_choice = tkmb.askokcancel("Save", "Save result to file?")
         if save_choice:
@@ -162,47 +204,54 @@ class QolForOneUAWin(tk.Toplevel):
     @staticmethod
     def save_to_file(s_data):
         """
-        This static method asks for the user's directory and changes their current directory to it. An output text file
-        is open/created and the data is written into the file.
+        This static method asks for the user's directory. An output text file is open/created in it and the data is
+        written into the file.
         """
         d = tk.filedialog.askdirectory(initialdir='.')  # user is prompted to choose a directory
         if d != '':  # in case the user selects to save but then cancels when directory opens
-            os.chdir(d)  # the current directory will now be at the user-chosen directory
-            with open('saved.txt', 'w') as outFile:
-                outFile.write('Urban Area: ')
-                outFile.write(s_data[0])
-                outFile.write('\n')
-                for i in range(len(s_data[1])):
-                    outFile.write(s_data[1][i])
-                    outFile.write(": ")
-                    outFile.write(str(s_data[2][i]))
-                    outFile.write("\n")
-                outFile.write("\n\n")
+            lines = ['Urban Area: ' + s_data[0]]
+            for metric, score in zip(s_data[1], s_data[2]):
+                lines.append(f'{metric}: {score}')
+            with open(os.path.join(d, 'saved.txt'), 'w') as outFile:
+                outFile.write('\n'.join(lines) + '\n\n\n')
 
+    @QualityProfile.action
+    def plt_similar(self):
+        """
+        A PlotWin object is created that plots the urban areas whose quality of life scores are most like the
+        user-chosen urban area.
+        """
+        win = PlotWin(self, lambda fig=None: self._UrbanAreas.plotSimilarAreas(self._ua, fig=fig), self._UrbanAreas)
+        win.transient()
+
+    @QualityProfile.action
     def plt_col(self):
         """
         A PlotWin object is created that plots the cost of living for the user-chosen urban area.
         """
-        win = PlotWin(self, lambda: self._UrbanAreas.plotCostOfLiving(self._ua))
+        win = PlotWin(self, lambda fig=None: self._UrbanAreas.plotCostOfLiving(self._ua, fig=fig), self._UrbanAreas)
         win.transient()
 
 
 class DistanceUAWin(tk.Toplevel):
     """
-    Top level window that contains two buttons: one that allows the user to choose urban areas and to plot their locations
-    on a map, and the other to get the nearest urban area to the coordinates of their choosing.
+    Top level window that contains three buttons: one that allows the user to choose urban areas and to plot their
+    locations on a map, one to plan a trip through many urban areas, and one to get the nearest urban area to the
+    coordinates of their choosing.
 
     * NOTE: In the project proposal, we were going to have the user select an urban area first before choosing one of
     the buttons. However, we found that using the coordinates of an urban area to show the nearest urban area would actually
     give the user the current urban area, rather than the nearest one. So, if the user chooses to show the nearest urban
     area, they will input coordinates instead of choosing an urban area.
     """
+    wait_window = QualityProfile.paused(tk.Toplevel.wait_window)  # time waiting for the user is not profiled
+
     def __init__(self, master):
         super().__init__(master)
         self._UrbanAreas = UrbanAreas()
         self.title("Option Window")
-        self.geometry("600x250+1100+300")
-        self.minsize(600, 250)
+        self.geometry("950x250+800+300")
+        self.minsize(950, 250)
         self.resizable(True, True)
         self.configure(bg='orange2')
 
@@ -213,6 +262,11 @@ class DistanceUAWin(tk.Toplevel):
         tk.Label(self, text='Select this option to map\nselected area to other areas and\nsee distance by flight',
                  fg='dark green', font=('Trebuchet MS', 12), bg='orange2', justify=tk.LEFT).grid(row=3, column=0,
                                                                                                  padx=30, pady=10)
+        tk.Button(self, text="Plan a Trip", command=self.plan_trip, font=('Arial', 12), width=25, height=3,
+                  bg='linen', fg='dark green').grid(row=1, column=1, padx=30, pady=10)
+        tk.Label(self, text='Select this option to plan a\nshort trip through many areas\nand see its hours by flight',
+                 fg='dark green', font=('Trebuchet MS', 12), bg='orange2', justify=tk.LEFT).grid(row=3, column=1,
+                                                                                                 padx=30, pady=10)
         tk.Button(self, text="Show Nearest Urban Area", command=self.show_ua, font=('Arial', 12), width=25, height=3,
                   bg='linen', fg='dark green').grid(row=1, column=2, padx=30, pady=10)
         tk.Label(self, text='Select this option to see nearest\nurban area and an image of it\n(depending on location '
@@ -222,24 +276,48 @@ class DistanceUAWin(tk.Toplevel):
         self.grid_columnconfigure(2, weight=1)
         self.grid_rowconfigure(0, weight=1)
 
+    @QualityProfile.action
     def select_ua(self):
         """
         Method that creates a SingClickWin object and gets the user's urban area choice. Then, a MultUrbanAreaWin object
         is created, where the user can select multiple urban areas to compare their initial urban area choice to.
-        A PlotFigureWin is then created with those choices, where the locations are plotted on a world map.
+        A PlotWin is then created with those choices, where the locations are plotted on a world map.
         """
         ua_list = self._UrbanAreas.getUrbanAreas()
         sqol_win = SingClickWin(self, ua_list)
         self.wait_window(sqol_win)
         ua = sqol_win.get_choice()
         if ua:
-            mult = MultUrbanAreaWin(self)
+            mult = MultUrbanAreaWin(self, prefetch=('',))
+            self.wait_window(mult)
+            ua_choices = mult.get_urban_areas()
+            if ua_choices:
+                win = PlotWin(self, lambda fig=None: self._UrbanAreas.plotMap(ua, ua_choices, fig=fig),
+                              self._UrbanAreas)
+                win.transient()
+
+    @QualityProfile.action
+    def plan_trip(self):
+        """
+        Method that gets the urban area the trip starts from with a SingClickWin object and the urban areas to visit
+        with a MultUrbanAreaWin object, asks whether the trip returns to where it started, and then plots a short order
+        to visit them in as one route on a world map in a PlotWin.
+        """
+        ua_list = self._UrbanAreas.getUrbanAreas()
+        start_win = SingClickWin(self, ua_list)
+        self.wait_window(start_win)
+        ua = start_win.get_choice()
+        if ua:
+            mult = MultUrbanAreaWin(self, prefetch=('',))
             self.wait_window(mult)
             ua_choices = mult.get_urban_areas()
             if ua_choices:
-                win = PlotFigureWin(self, lambda: self._UrbanAreas.plotMap(ua, ua_choices))
+                round_trip = tkmb.askyesno("Round Trip", "Return to " + ua + " at the end of the trip?", parent=self)
+                win = PlotWin(self, lambda fig=None: self._UrbanAreas.plotTrip(ua, ua_choices, round_trip, fig=fig),
+                              self._UrbanAreas)
                 win.transient()
 
+    @QualityProfile.action
     def show_ua(self):
         """
         Method that creates a NearestAreaWin object.
@@ -284,6 +362,7 @@ class NearestAreaWin(tk.Toplevel):
 
         tk.Button(self, text="OK", width=10, height=1, command=self.get_nearest).grid(row=3, column=1, padx=10, pady=10)
 
+    @QualityProfile.action
     def get_nearest(self):
         """
         Method that is called when the user selects coordinates. If the user chooses valid coordinates, a ShowNearestUAWin
@@ -317,6 +396,8 @@ class ShowNearestUAWin(tk.Toplevel):
         displayed. If the image doesn't exists, then a text label is displayed showing the user there is no available
         image.
         """
+        from PIL import ImageTk
+
         super().__init__(master)
         label1_str = "Nearest Urban Area: " + n_area
         label1 = tk.Label(self, text=label1_str, font=14)  # label for the name of the nearest urban area
@@ -332,58 +413,131 @@ class ShowNearestUAWin(tk.Toplevel):
             tk.Label(self, text="There is no available image for this urban area.").grid()
 
 
-class PlotFigureWin(tk.Toplevel):
+class PlotWin(tk.Toplevel):
     """
-    Top level class that is used to plot the world map and the nearest urban areas. Differs from the PlotWin class
-    since it passes the plotting function when creating the canvas, rather than just a pyplot figure.
+    Top level class that is used to display the plots from the back end. The plotting function returns a matplotlib
+    figure, which is drawn onto a canvas in the window. The figure is handed back to the plotting function (as fig) to
+    be drawn on again when the plot is redrawn or turns a page, and when the window is closed it is cleared so that the
+    memory it uses is released instead of growing with every plot opened. If the plot was drawn from cached data that
+    has since been refreshed in the background and changed, the plot is drawn again. Plots of many urban areas that are
+    shown a page at a time get buttons to turn the pages, and the plotting function is then called with the page.
     """
-    def __init__(self, master, plot_func):
+    def __init__(self, master, plot_func, urban_areas=None):
         """
-        Constructor of the plotting window. Puts a matplotlib plot onto the top level window
+        Constructor of the plotting window. Puts a matplotlib plot onto the top level window, and listens for changes
+        to its data through the UrbanAreas object if one is given.
         """
         super().__init__(master)
         self.title('Plotting Window')
-        figure = plot_func()
-        plot_func()
-        canvas = FigureCanvasTkAgg(figure, master=self)  # Creates a canvas specific for matplotlib plots
-        canvas.get_tk_widget().grid()  # Grids the canvas object
-        canvas.draw()  # Shows the plot to the user
+        self._plot_func = plot_func
+        self._figure = None
+        self._canvas = None
+        self._changed = False  # set from a background thread when data used by the plot changes
+        self._page = 0  # page shown of a plot of many urban areas that is shown a page at a time
+        self._page_label = None
+        self._urban_areas = urban_areas
+        self.draw_plot()
+        if urban_areas is not None:
+            urban_areas.addRefreshListener(self.data_changed)
+            self._poll = self.after(500, self.check_changed)
+        self.bind('<Destroy>', self.release_figure)
+
+    @QualityProfile.action
+    def draw_plot(self):
+        """
+        Calls the plotting function with the figure shown so far to draw on again, and shows the figure. A figure the
+        plotting function hands back in place of the old one replaces it.
+        """
+        from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+
+        if self._page:
+            figure = self._plot_func(page=self._page, fig=self._figure)
+        else:
+            figure = self._plot_func(fig=self._figure)
+        with QualityProfile.phase('draw'):
+            if figure is self._figure and self._canvas is not None:
+                self._canvas.draw()  # the same figure was drawn on again, so the canvas only needs to show it
+            else:
+                if self._canvas is not None:
+                    self._canvas.get_tk_widget().destroy()
+                    self._figure.clear()
+                self._figure = figure
+                self._canvas = FigureCanvasTkAgg(self._figure, master=self)  # Creates a canvas for matplotlib plots
+                self._canvas.get_tk_widget().grid(row=0, column=0)  # Grids the canvas object
+                self._canvas.draw()  # Shows the plot to the user
 
+        paging = getattr(figure, 'urbanAreasPaging', None)
+        if paging is not None:
+            self._page, page_count = paging
+            if self._page_label is None:  # the buttons are made the first time a plot is shown a page at a time
+                buttons = tk.Frame(self)
+                buttons.grid(row=1, column=0)
+                tk.Button(buttons, text="< Previous", command=lambda: self.turn_page(-1)).grid(row=0, column=0)
+                self._page_label = tk.Label(buttons)
+                self._page_label.grid(row=0, column=1, padx=20)
+                tk.Button(buttons, text="Next >", command=lambda: self.turn_page(1)).grid(row=0, column=2)
+            self._page_label.config(text=f"Page {self._page + 1} of {page_count}")
 
-class PlotWin(tk.Toplevel):
-    """
-    Top level class that is used to plot the world map and the nearest urban areas. Differs from the PlotFigureWin class
-    since it passes the pyplot figure when creating the canvas, rather than just a plotting function.
-    """
-    def __init__(self, master, plot_func):
+    def turn_page(self, step):
         """
-        Constructor of the plotting window. Puts a matplotlib plot onto the top level window
+        Shows the previous or next page of a plot of many urban areas.
         """
-        super().__init__(master)
-        self.title('Plotting Window')
-        figure = plt.figure(figsize=(12, 8))
-        plot_func()
-        canvas = FigureCanvasTkAgg(figure, master=self)  # Creates a canvas specific for matplotlib plots
-        canvas.get_tk_widget().grid()  # Grids the canvas object
-        canvas.draw()  # Shows the plot to the user
+        page, page_count = self._figure.urbanAreasPaging
+        if 0 <= page + step < page_count:
+            self._page = page + step
+            self.draw_plot()
+
+    def data_changed(self, url):
+        """
+        Called from a background thread when the data of a cached page changes. Only notes the change, since tkinter
+        can only be used from the main thread.
+        """
+        figure = self._figure
+        if figure is not None and url in getattr(figure, 'urbanAreasPages', ()):
+            self._changed = True
+
+    def check_changed(self):
+        """
+        Redraws the plot if its data changed, and checks again shortly after.
+        """
+        if self._changed:
+            self._changed = False
+            self.draw_plot()
+        self._poll = self.after(500, self.check_changed)
+
+    def release_figure(self, event):
+        """
+        Clears the figure and lets go of the canvas once the window is destroyed, whether it was closed by the user or
+        along with the window that opened it.
+        """
+        if event.widget is self and self._figure is not None:
+            if self._urban_areas is not None:
+                self._urban_areas.removeRefreshListener(self.data_changed)
+                self.after_cancel(self._poll)
+            self._figure.clear()
+            self._figure = None
+            self._canvas = None
 
 
 class MainWin(tk.Tk):
     """
-    Tkinter class that serves as the main window to the application. Has 4 buttons for the user to choose from, of which
+    Tkinter class that serves as the main window to the application. Has 7 buttons for the user to choose from, of which
     each is used to compare or search for different data metrics of urban areas.
     """
+    wait_window = QualityProfile.paused(tk.Tk.wait_window)  # time waiting for the user is not profiled
+
     def __init__(self):
         """
-        Constructor of the Main Window, which has 4 buttons, all of which call a unique function that performs several
-        tasks for the user. The user can compare salary data or quality of life across multiple urban areas, search
-        for quality of life in one urban area, or find the distance between urban areas.
+        Constructor of the Main Window, which has 7 buttons in three columns, all of which call a unique function that
+        performs several tasks for the user. The user can compare salary data, quality of life or purchasing power
+        across multiple urban areas, search for quality of life in one urban area, find the distance between urban
+        areas, correlate data across all urban areas, or export data to a file.
         """
         super().__init__()
         self._UrbanAreas = UrbanAreas()
         self.title("Urban Data")
-        self.minsize(700, 700)
-        self.geometry('700x700+300+300')
+        self.minsize(1000, 850)
+        self.geometry('1060x880+150+50')
         self.resizable(True, True)
         self.configure(bg='orange2')
         tk.Label(self, text="Welcome to the Urban Data Application\nPlease select one of the following options:",
@@ -394,55 +548,78 @@ class MainWin(tk.Tk):
                   font=('Arial', 12), width=30, height=3, bg='linen', fg='dark green').grid(row=1, column=0, padx=30,
                                                                                             pady=10)
         tk.Button(self, text="Compare Quality of Life", command=self.comp_qol,
+                  font=('Arial', 12), width=30, height=3, bg='linen', fg='dark green').grid(row=1, column=1, padx=30,
+                                                                                            pady=10)
+        tk.Button(self, text="Compare Purchasing Power", command=self.purchasing_power,
                   font=('Arial', 12), width=30, height=3, bg='linen', fg='dark green').grid(row=1, column=2, padx=30,
                                                                                             pady=10)
-        tk.Label(self, text='A graph that displays salaries by\npercentile in a stacked bar graph\n\n\n'
+        tk.Label(self, text='A graph that displays salaries by\npercentile in a stacked bar graph\n\n'
                             '1. Select a job field\n2. Select multiple urban areas', fg='dark green',
                  font=('Trebuchet MS', 12), bg='orange2', justify=tk.LEFT).grid(row=2,column=0, pady=10, sticky='N')
         tk.Label(self, text='A graph that compares a single\nquality of life metric across\nmultiple urban areas\n\n'
                             '1. Select a quality of life metric\n2. Select multiple urban areas', fg='dark green',
+                 font=('Trebuchet MS', 12), bg='orange2', justify=tk.LEFT).grid(row=2,column=1, pady=10, sticky='N')
+        tk.Label(self, text='A graph that compares what the median\nsalary for a job buys across multiple\n'
+                            'urban areas\n\n1. Select a job field\n2. Select multiple urban areas', fg='dark green',
                  font=('Trebuchet MS', 12), bg='orange2', justify=tk.LEFT).grid(row=2,column=2, pady=10, sticky='N')
         tk.Button(self, text="Search Quality of Life", command=self.search_qol,
                   font=('Arial', 12), width=30, height=3, bg='linen', fg='dark green').grid(row=4, column=0, padx=30,
                                                                                             pady=10)
         tk.Button(self, text="Distances Between Urban Areas", command=self.distance_ua,
+                  font=('Arial', 12), width=30, height=3, bg='linen', fg='dark green').grid(row=4, column=1, padx=30,
+                                                                                            pady=10)
+        tk.Button(self, text="Correlate Across All Areas", command=self.correlate,
                   font=('Arial', 12), width=30, height=3, bg='linen', fg='dark green').grid(row=4, column=2, padx=30,
                                                                                             pady=10)
-        tk.Label(self, text='A graph that displays all quality\nof life metrics or cost of living\n'
-                            'metrics for a single urban area\n\n1. Select an urban area\n'
-                            '2. Select an option:\n    i) Plot quality of life\n    ii) Plot cost of living\n'
-                            '3. If quality of life is selected,\n    data may be saved', fg='dark green',
+        tk.Label(self, text='All quality of life or cost of\nliving metrics for one urban area,\n'
+                            'the quality of life may be saved\n\n1. Select an urban area\n'
+                            '2. Plot quality of life or\n    cost of living', fg='dark green',
                  font=('Trebuchet MS', 12), bg='orange2', justify=tk.LEFT).grid(row=5,column=0, pady=10, sticky='N')
-        tk.Label(self, text='Shows a map of distances or an\nimage of the nearest urban area\n\n\n'
-                            '1. Select an urban area\n2. Select an option:\n     i) Show a map between selected area\n'
-                            '        to another\n    ii) Show the nearest urban area to\n        a coordinate and an '
-                            'image of it', fg='dark green', font=('Trebuchet MS', 12), bg='orange2',
-                 justify=tk.LEFT).grid(row=5,column=2, pady=10, sticky='N')
+        tk.Label(self, text='A map of distances from an urban\narea, or the nearest urban area to\n'
+                            'a coordinate and an image of it\n\n1. Select an urban area\n'
+                            '2. Show a map to other areas or\n    the nearest urban area', fg='dark green',
+                 font=('Trebuchet MS', 12), bg='orange2', justify=tk.LEFT).grid(row=5,column=1, pady=10, sticky='N')
+        tk.Label(self, text='A scatter plot of a quality of life\nmetric against the median salary\nfor a job in every '
+                            'urban area,\nand a heat map of how all of them\nfollow each other\n\n'
+                            '1. Select a job field\n2. Select a quality of life metric', fg='dark green',
+                 font=('Trebuchet MS', 12), bg='orange2', justify=tk.LEFT).grid(row=5,column=2, pady=10, sticky='N')
+        tk.Button(self, text="Export Data", command=self.export_data,
+                  font=('Arial', 12), width=30, height=3, bg='linen', fg='dark green').grid(row=7, column=0, padx=30,
+                                                                                            pady=10)
+        tk.Label(self, text='Saves salaries, quality of life, cost\nof living and distances of many urban\n'
+                            'areas to CSV, JSONL or Parquet\n\n1. Select a job field (optional)\n'
+                            '2. Select multiple urban areas\n3. Pick an area to measure distances\n'
+                            '    from (optional) and a file', fg='dark green', font=('Trebuchet MS', 12), bg='orange2',
+                 justify=tk.LEFT).grid(row=8,column=0, pady=10, sticky='N')
 
-        self.grid_columnconfigure(1, weight=1)
+        self.grid_columnconfigure((0, 1, 2), weight=1)
         self.grid_rowconfigure(3, weight=1)
 
         self.protocol("WM_DELETE_WINDOW", self.on_closing)
 
+    @QualityProfile.action
     def salary_by_ua(self):
         """
         Method that is called when user wants to compare salary data across multiple urban areas. A SingClickWin object
         is created and the user choice for jobs is taken. A MultUrbanAreaWin object is then created, where the user
-        selects urban areas to search from. A PlotFigureWin object is then created to plot the 25th, 50th, and 75th
+        selects urban areas to search from. A PlotWin object is then created to plot the 25th, 50th, and 75th
         percentile of salaries of the user-chosen job title in the user-chosen urban areas.
         """
         job_list = self._UrbanAreas.getJobs()
+        self._UrbanAreas.prefetch(self._UrbanAreas.getRecentAreas(), 'salaries/')  # salaries are the same for every job
         sbua_win = SingClickWin(self, job_list)
         self.wait_window(sbua_win)
         job = sbua_win.get_choice()
         if job:  # if user closes window without choosing anything
-            ua_win = MultUrbanAreaWin(self)
+            ua_win = MultUrbanAreaWin(self, prefetch=('salaries/',))
             self.wait_window(ua_win)
             urb_area = ua_win.get_urban_areas()
             if urb_area:  # if user closes window without choosing anything
-                sbua_plt = PlotFigureWin(self, lambda: self._UrbanAreas.plotSalaries(job, urb_area))
+                sbua_plt = PlotWin(self, lambda page=0, fig=None: self._UrbanAreas.plotSalaries(
+                    job, urb_area, fig, page=page), self._UrbanAreas)
                 sbua_plt.transient()
 
+    @QualityProfile.action
     def comp_qol(self):
         """
         Method that is called when the user wants to compare quality of life metrics across multiple urban areas. A
@@ -451,17 +628,102 @@ class MainWin(tk.Tk):
         then created to plot the user-chosen quality of life score for all the user-selected urban areas.
         """
         qol_list = self._UrbanAreas.getMetrics()
+        self._UrbanAreas.prefetch(self._UrbanAreas.getRecentAreas(), 'scores/')  # scores are the same for every metric
         sbqol_win = SingClickWin(self, qol_list)
         self.wait_window(sbqol_win)
         qol = sbqol_win.get_choice()
         if qol:  # if user closes window without choosing anything
-            ua_win = MultUrbanAreaWin(self)
+            ua_win = MultUrbanAreaWin(self, prefetch=('scores/',))
             self.wait_window(ua_win)
             urb_area = ua_win.get_urban_areas()
             if urb_area:  # if user closes window without choosing anything
-                sbqol_plt = PlotWin(self, lambda: self._UrbanAreas.plotCompareQuality(qol, urb_area))
+                sbqol_plt = PlotWin(self, lambda page=0, fig=None: self._UrbanAreas.plotCompareQuality(
+                    qol, urb_area, fig, page=page), self._UrbanAreas)
                 sbqol_plt.transient()
 
+    @QualityProfile.action
+    def purchasing_power(self):
+        """
+        Method that is called when the user wants to compare purchasing power across multiple urban areas. A
+        SingClickWin object is created and the user choice for jobs is taken. A MultUrbanAreaWin object is then created,
+        where the user selects urban areas to compare. A PlotWin object is then created to plot the median salary,
+        the cost of a basket of goods and the purchasing power of the user-chosen job in all the user-chosen urban areas.
+        """
+        job_list = self._UrbanAreas.getJobs()
+        pp_win = SingClickWin(self, job_list)
+        self.wait_window(pp_win)
+        job = pp_win.get_choice()
+        if job:  # if user closes window without choosing anything
+            ua_win = MultUrbanAreaWin(self, prefetch=('salaries/', 'details/'))
+            self.wait_window(ua_win)
+            urb_area = ua_win.get_urban_areas()
+            if urb_area:  # if user closes window without choosing anything
+                pp_plt = PlotWin(self, lambda fig=None: self._UrbanAreas.plotPurchasingPower(job, urb_area, fig=fig),
+                                 self._UrbanAreas)
+                pp_plt.transient()
+
+    @QualityProfile.action
+    def export_data(self):
+        """
+        Method that is called when the user wants to save data for many urban areas to a file. The user can choose a job
+        in a SingClickWin object (closing it leaves salaries out), then chooses urban areas in a MultUrbanAreaWin object
+        and, optionally, an urban area to measure distances from. The data is then written to the file the user picks.
+        """
+        job_win = SingClickWin(self, self._UrbanAreas.getJobs())
+        self.wait_window(job_win)
+        job = job_win.get_choice() or None  # if user closes window without choosing, salaries are left out
+        ua_win = MultUrbanAreaWin(self, prefetch=('scores/', 'details/'))
+        self.wait_window(ua_win)
+        urb_area = ua_win.get_urban_areas()
+        if not urb_area:  # if user closes window without choosing anything
+            return
+
+        start = None
+        if tkmb.askyesno("Distances", "Include flight distances from an urban area?", parent=self):
+            start_win = SingClickWin(self, self._UrbanAreas.getUrbanAreas())
+            self.wait_window(start_win)
+            start = start_win.get_choice() or None
+
+        path = tk.filedialog.asksaveasfilename(parent=self, defaultextension='.csv', initialfile='urban_areas.csv',
+                                               filetypes=[('CSV', '*.csv'), ('JSON Lines', '*.jsonl'),
+                                                          ('Parquet', '*.parquet')])
+        if path:  # in case the user cancels when the file dialog opens
+            try:
+                count, missing = exportResults(self._UrbanAreas, path, urb_area, job=job, startingArea=start)
+                if missing:  # the file is written, but without some of the data
+                    shown = ', '.join(missing[:20]) + (f' and {len(missing) - 20} more' if len(missing) > 20 else '')
+                    tkmb.showwarning("Export", f"Saved {count} rows to {path}\n\nSome of the data of {len(missing)} "
+                                               f"urban areas could not be retrieved and is missing:\n{shown}",
+                                     parent=self)
+                else:
+                    tkmb.showinfo("Export", f"Saved {count} rows to {path}", parent=self)
+            except (ImportError, ValueError, OSError) as e:
+                tkmb.showerror("Error", f"[Error] {e}", parent=self)  # Error message
+
+    @QualityProfile.action
+    def correlate(self):
+        """
+        Method that is called when the user wants to see whether a quality of life metric follows the salary for a job
+        across every urban area. A SingClickWin object is created for the job and another for the metric. Two PlotWin
+        objects are then created, one plotting the metric against the median salary with a fitted line, and one with
+        the correlations between every metric and the salary percentiles.
+        """
+        job_win = SingClickWin(self, self._UrbanAreas.getJobs())
+        self.wait_window(job_win)
+        job = job_win.get_choice()
+        if job:  # if user closes window without choosing anything
+            metric_win = SingClickWin(self, self._UrbanAreas.getMetrics())
+            self.wait_window(metric_win)
+            metric = metric_win.get_choice()
+            if metric:  # if user closes window without choosing anything
+                corr_plt = PlotWin(self, lambda fig=None: self._UrbanAreas.plotCorrelations(jobs=[job], fig=fig),
+                                   self._UrbanAreas)
+                corr_plt.transient()
+                scatter_plt = PlotWin(self, lambda fig=None: self._UrbanAreas.plotScatter(
+                    f'{job} p50', metric, jobs=[job], fig=fig), self._UrbanAreas)
+                scatter_plt.transient()
+
+    @QualityProfile.action
     def search_qol(self):
         """
         Method that is called when the user wants to search the quality of life metrics for one urban area. A
@@ -476,6 +738,7 @@ class MainWin(tk.Tk):
             choice_win = QolForOneUAWin(self, ua)
             self.wait_window(choice_win)
 
+    @QualityProfile.action
     def distance_ua(self):
         """
         Method that is called when the user wants to find the distance between urban areas. A DistanceUAWin object is
@@ -495,6 +758,17 @@ class MainWin(tk.Tk):
 
 
 if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Visualizes and compares urban areas.')
+    parser.add_argument('--profile', nargs='?', const='timers', metavar='MODES',
+                        help='profile every action, MODES is any of timers, cprofile, tracemalloc and stacks (or all) '
+                             'separated by commas, see QualityProfile.py')
+    parser.add_argument('--profile-dir', metavar='DIR', help='the directory profiles are written to')
+    args = parser.parse_args()
+    if args.profile or args.profile_dir:
+        QualityProfile.enable(args.profile or os.environ.get('URBAN_AREAS_PROFILE') or 'timers', args.profile_dir)
+
     app = MainWin()  # Creates a Main Window object
     app.mainloop()  # Runs the Main Window
 
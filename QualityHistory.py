@@ -0,0 +1,245 @@
+"""
+Description: Keeps a history of the quality of life scores and salaries of every urban area, so that how they move
+between pulls from the API can be looked at later. Each pull is a snapshot, and only the values that changed since the
+one before are written, so a pull where little changed costs a few rows. The values are kept in an SQLite file indexed
+by urban area and feature, so the history of one value ("Housing in Berlin") or of one feature in every urban area
+("which urban areas' median salary for a job changed the most") is answered by one query.
+
+Usage (running record every day, for example from cron, builds up the history):
+    python QualityHistory.py record
+    python QualityHistory.py series <urban area> <feature>
+    python QualityHistory.py changes <feature> [number of urban areas]
+
+Features are named as in UrbanAreas.getFeatureTable(), such as 'Housing' or 'Account Manager p50'. The file is kept at
+~/.cache/urban_areas/history.sqlite, or wherever the URBAN_AREAS_HISTORY environment variable points.
+"""
+
+import os
+import sqlite3
+import sys
+import threading
+import time
+
+import numpy as np
+
+# the value of one feature in every urban area as of a snapshot. Next to MAX(), SQLite hands back the other columns of
+# the row with the largest snapshot, which is the newest change of each series
+_VALUES_AT = ('SELECT s.area, c.value, MAX(c.snapshot) FROM changes AS c JOIN series AS s ON s.id = c.series '
+              'WHERE s.feature = ? AND c.snapshot <= ? GROUP BY c.series')
+
+
+def historyPath():
+    """works out where the history is kept
+
+    :return: a string with the path of the file
+    """
+    return os.environ.get('URBAN_AREAS_HISTORY') or os.path.join(os.path.expanduser('~'), '.cache', 'urban_areas',
+                                                                 'history.sqlite')
+
+
+class HistoryStore:
+    """Snapshots of many values of many urban areas, each written as the values that changed since the last one."""
+
+    def __init__(self, path=None):
+        """opens the history, creating it if it does not exist yet
+
+        :param path: a string with the path of the file, by default historyPath(), ':memory:' keeps it in memory
+        """
+        path = path or historyPath()
+        if path != ':memory:':
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.executescript('''
+            CREATE TABLE IF NOT EXISTS snapshots (id INTEGER PRIMARY KEY, taken REAL NOT NULL);
+            CREATE TABLE IF NOT EXISTS series (id INTEGER PRIMARY KEY, area TEXT NOT NULL, feature TEXT NOT NULL,
+                                               UNIQUE (feature, area));
+            CREATE TABLE IF NOT EXISTS changes (series INTEGER NOT NULL, snapshot INTEGER NOT NULL, value REAL NOT NULL,
+                                                PRIMARY KEY (series, snapshot)) WITHOUT ROWID;
+        ''')
+
+        # the id and newest value of every series, to work out what changed without reading the history again. Other
+        # processes may record into the same file, so they are brought up to date before every snapshot
+        self._ids = {}
+        self._latest = np.full(16, np.nan)  # grows by doubling, indexed by series id
+        self._seen = 0  # the newest snapshot read into _latest
+        self._catchUp()
+
+    def _catchUp(self):
+        """reads the series and values written to the file since this object last did, such as by another process"""
+        rows = self._db.execute('SELECT id, area, feature FROM series WHERE id > ?',
+                                (max(self._ids.values(), default=0),))
+        self._ids.update(((area, feature), i) for i, area, feature in rows)
+        newest = self._db.execute('SELECT MAX(id) FROM snapshots').fetchone()[0] or 0
+        if newest > self._seen:
+            for i, value, _ in self._db.execute('SELECT series, value, MAX(snapshot) FROM changes WHERE snapshot > ? '
+                                                'GROUP BY series', (self._seen,)):
+                self._latest = self._grow(self._latest, i)
+                self._latest[i] = value
+            self._seen = newest
+
+    @staticmethod
+    def _grow(array, index):
+        """makes an array indexed by series id long enough for index"""
+        if index < len(array):
+            return array
+        grown = np.full(max(2 * len(array), index + 1), np.nan)
+        grown[:len(array)] = array
+        return grown
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+    def record(self, areas, features, values, taken=None):
+        """adds a snapshot, writing only the values that changed since the last one. Values that are missing (NaN),
+        such as those of urban areas that could not be retrieved, keep their last value
+
+        :param areas: a list of strings of urban areas, one per row of values, the last row is used for an urban area
+        that is listed twice
+        :param features: a list of strings naming the features, one per column of values, likewise
+        :param values: a matrix with a row for every urban area and a column for every feature
+        :param taken: the time of the snapshot in seconds since the epoch, now by default
+        :return: a tuple containing (the id of the snapshot, the number of values written)
+        """
+        values = np.asarray(values, dtype=float).reshape(len(areas), len(features))
+        rows = {a: i for i, a in enumerate(areas)}
+        columns = {f: i for i, f in enumerate(features)}
+        areas, features = list(rows), list(columns)
+        values = values[np.ix_(list(rows.values()), list(columns.values()))]
+
+        with self._lock:
+            try:
+                with self._db:
+                    # other processes recording into the file wait until this snapshot is written, and what they
+                    # wrote before is read, so that the values are compared with the newest ones in the file
+                    self._db.execute('BEGIN IMMEDIATE')
+                    new = [(a, f) for a in areas for f in features if (a, f) not in self._ids]
+                    self._db.executemany('INSERT OR IGNORE INTO series (area, feature) VALUES (?, ?)', new)
+                    self._catchUp()
+                    ids = np.array([[self._ids[a, f] for f in features] for a in areas],
+                                   dtype=int).reshape(values.shape)
+                    self._latest = self._grow(self._latest, int(ids.max(initial=0)))
+
+                    flatIds, flatValues = ids.ravel(), values.ravel()
+                    changed = ~np.isnan(flatValues) & (self._latest[flatIds] != flatValues)
+                    flatIds, flatValues = flatIds[changed], flatValues[changed]
+
+                    snapshot = self._db.execute('INSERT INTO snapshots (taken) VALUES (?)',
+                                                (time.time() if taken is None else taken,)).lastrowid
+                    self._db.executemany('INSERT INTO changes (series, snapshot, value) VALUES (?, ?, ?)',
+                                         zip(flatIds.tolist(), [snapshot] * len(flatIds), flatValues.tolist()))
+            except BaseException:
+                # what was read inside the transaction that was rolled back may be gone, so everything is read again
+                self._ids, self._latest, self._seen = {}, np.full(16, np.nan), 0
+                self._catchUp()
+                raise
+            self._latest[flatIds] = flatValues
+            self._seen = snapshot
+        return snapshot, len(flatIds)
+
+    def getSnapshots(self):
+        """gets every snapshot
+
+        :return: a list of tuples containing (id, time taken in seconds since the epoch), oldest first
+        """
+        with self._lock:
+            return self._db.execute('SELECT id, taken FROM snapshots ORDER BY id').fetchall()
+
+    def series(self, area, feature):
+        """gets how one value of an urban area changed
+
+        :param area: a string containing an urban area
+        :param feature: a string naming the feature, such as 'Housing'
+        :return: a tuple containing (array of the times it changed in seconds since the epoch, array of the value from
+        then on), both empty if it was never recorded
+        """
+        with self._lock:
+            if (area, feature) not in self._ids:  # it may have been recorded by another process
+                self._catchUp()
+            rows = self._db.execute('SELECT s.taken, c.value FROM changes AS c JOIN snapshots AS s '
+                                    'ON s.id = c.snapshot WHERE c.series = ? ORDER BY c.snapshot',
+                                    (self._ids.get((area, feature), -1),)).fetchall()
+        return np.array([r[0] for r in rows], dtype=float), np.array([r[1] for r in rows], dtype=float)
+
+    def valuesAt(self, feature, when=None):
+        """gets the value of one feature in every urban area as it was at some time
+
+        :param feature: a string naming the feature
+        :param when: a time in seconds since the epoch, the newest values by default
+        :return: a dictionary with the urban areas recorded by then as keys and their values as values
+        """
+        with self._lock:
+            rows = self._db.execute(_VALUES_AT, (feature, self._snapshotAt(when))).fetchall()
+        return {area: value for area, value, _ in rows}
+
+    def _snapshotAt(self, when):
+        """:return: the id of the newest snapshot taken at or before when (any time if None), 0 if there is none"""
+        if when is None:
+            row = self._db.execute('SELECT MAX(id) FROM snapshots').fetchone()
+        else:
+            row = self._db.execute('SELECT MAX(id) FROM snapshots WHERE taken <= ?', (when,)).fetchone()
+        return row[0] or 0
+
+    def biggestChanges(self, feature, since=None, until=None, n=10, relative=False):
+        """finds the urban areas whose value of a feature changed the most between two times
+
+        :param feature: a string naming the feature, such as 'Account Manager p50'
+        :param since: a time in seconds since the epoch, by default the first value recorded of every urban area
+        :param until: a time in seconds since the epoch, the newest values by default
+        :param n: the number of urban areas to find
+        :param relative: True to rank by the change as a fraction of the value before, instead of by the change
+        :return: a list of tuples containing (urban area, value before, value after), the biggest change first
+        """
+        with self._lock:
+            after = self._db.execute(_VALUES_AT, (feature, self._snapshotAt(until))).fetchall()
+            if since is None:
+                before = self._db.execute(
+                    'SELECT s.area, c.value, MIN(c.snapshot) FROM changes AS c JOIN series AS s ON s.id = c.series '
+                    'WHERE s.feature = ? GROUP BY c.series', (feature,)).fetchall()
+            else:
+                before = self._db.execute(_VALUES_AT, (feature, self._snapshotAt(since))).fetchall()
+
+        old = {area: value for area, value, _ in before}
+        areas = [area for area, _, _ in after if area in old]
+        if not areas:
+            return []
+        was = np.array([old[a] for a in areas])
+        now = np.array([value for area, value, _ in after if area in old])
+        change = np.abs(now - was)
+        if relative:
+            with np.errstate(divide='ignore', invalid='ignore'):
+                change = np.nan_to_num(change / np.abs(was), nan=0.0, posinf=np.inf)
+        order = np.argsort(-change, kind='stable')[:n]
+        return [(areas[i], float(was[i]), float(now[i])) for i in order if change[i] > 0]
+
+
+def _main(args):
+    """runs the commands in the description of this file"""
+    if not args or args[0] not in ('record', 'series', 'changes'):
+        sys.exit(__doc__)
+
+    history = HistoryStore()
+    if args[0] == 'record':
+        from QualityBackEnd import UrbanAreas
+
+        status = {}
+        snapshot, changed = UrbanAreas().recordHistory(history, status=status)
+        print(f'snapshot {snapshot}: {changed} values changed')
+        failed = sorted(a for a, s in status.items() if s != 'ok')
+        if failed:
+            print(f'{len(failed)} urban areas could not all be retrieved and kept their last values: '
+                  f'{", ".join(failed)}', file=sys.stderr)
+    elif args[0] == 'series' and len(args) == 3:
+        for taken, value in zip(*history.series(args[1], args[2])):
+            print(time.strftime('%Y-%m-%d %H:%M', time.localtime(taken)), f'{value:g}')
+    elif args[0] == 'changes' and len(args) in (2, 3):
+        for area, before, after in history.biggestChanges(args[1], n=int(args[2]) if len(args) == 3 else 10):
+            print(f'{area}: {before:g} -> {after:g} ({after - before:+g})')
+    else:
+        sys.exit(__doc__)
+    history.close()
+
+
+if __name__ == '__main__':
+    _main(sys.argv[1:])
@@ -0,0 +1,401 @@
+"""
+Description: Opt-in profiling of what the application does for the user. Every action (a button in the main window,
+or a call made outside one to a public UrbanAreas method that retrieves data or plots) is timed as a whole and split
+into phases: waiting for pages from the API (fetch), decoding them (parse), building the chart (plot), laying it out
+(layout) and drawing it (draw).
+Each action can also be run under cProfile, have its memory traced with tracemalloc, or have its call stacks sampled
+into collapsed stacks for a flame graph. It is off unless turned on, and then costs one check per call.
+
+Turning it on, with any of the modes timers, cprofile, tracemalloc and stacks (or all), separated by commas:
+    URBAN_AREAS_PROFILE=timers,stacks python QualityFrontEnd.py
+    python QualityFrontEnd.py --profile cprofile --profile-dir profiles
+
+Every action adds a line to actions.jsonl in the directory (URBAN_AREAS_PROFILE_DIR, ./profiles by default), and the
+modes write <time>-<action>.prof (open with python -m pstats or snakeviz), <time>-<action>.memory.txt and
+<time>-<action>.folded (open with flamegraph.pl or speedscope) next to it.
+"""
+
+import functools
+import os
+import sys
+import threading
+import time
+
+MODES = ('timers', 'cprofile', 'tracemalloc', 'stacks')
+_SAMPLE_SECONDS = 0.005  # time between samples of the call stacks in the stacks mode
+_MEMORY_LINES = 25  # lines of code that allocated the most memory written for the tracemalloc mode
+
+_modes = frozenset()
+_directory = 'profiles'
+_lock = threading.Lock()
+_state = threading.local()  # the action being profiled on this thread and its stack of phases
+_count = 0  # actions written so far, part of their file names so that they do not overwrite each other
+_tracers = 0  # actions tracing memory right now, tracemalloc is stopped when the last one ends
+_startedTracing = False
+
+
+def enable(modes='timers', directory=None):
+    """turns profiling on
+
+    :param modes: a string of modes separated by commas, see MODES, 'all' for every mode or '1' for timers only
+    :param directory: a string with the directory the profiles are written to, by default URBAN_AREAS_PROFILE_DIR or
+    ./profiles
+    :return: None
+    """
+    global _modes, _directory
+
+    chosen = {m.strip().lower() for m in modes.split(',') if m.strip()}
+    if chosen & {'all', '*'}:
+        chosen = set(MODES)
+    if chosen & {'1', 'on', 'true', 'yes'}:
+        chosen = (chosen - {'1', 'on', 'true', 'yes'}) | {'timers'}
+    unknown = chosen - set(MODES)
+    if unknown:
+        raise ValueError(f'unknown profiling mode {", ".join(sorted(unknown))}, expected one of {", ".join(MODES)}')
+
+    _directory = directory or os.environ.get('URBAN_AREAS_PROFILE_DIR', 'profiles')
+    _modes = frozenset(chosen | {'timers'})  # every mode writes the phases of the action as well
+
+
+def disable():
+    """turns profiling off, actions already being profiled still write their profiles"""
+    global _modes
+    _modes = frozenset()
+
+
+def isEnabled():
+    """:return: True if profiling is on"""
+    return bool(_modes)
+
+
+class _Action:
+    """the timings of one action"""
+
+    def __init__(self, name):
+        self.name = name
+        self.started = time.time()
+        self.start = time.perf_counter()
+        self.thread = threading.get_ident()
+        self.threads = {self.thread}  # threads doing work for the action, sampled in the stacks mode
+        self.phases = {}  # phase -> seconds spent in it and not in a phase inside it
+        self.ownPhases = 0.0  # seconds of the phases on the thread of the action, the rest of its time is 'other'
+        self.methods = {}  # UrbanAreas method -> [calls, seconds including the methods it called]
+        self.lock = threading.Lock()
+
+    def addPhase(self, phase, seconds, own):
+        with self.lock:
+            self.phases[phase] = self.phases.get(phase, 0.0) + seconds
+            if own:
+                self.ownPhases += seconds
+
+    def addMethod(self, method, seconds):
+        with self.lock:
+            entry = self.methods.setdefault(method, [0, 0.0])
+            entry[0] += 1
+            entry[1] += seconds
+
+
+class _Phase:
+    """context manager timing a phase of the action on the current thread"""
+
+    __slots__ = ('action', 'name', 'start', 'inner')
+
+    def __init__(self, action, name):
+        self.action = action
+        self.name = name
+
+    def __enter__(self):
+        self.inner = 0.0  # seconds of phases inside this one, which count towards them instead
+        _state.phases.append(self)
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        elapsed = time.perf_counter() - self.start
+        _state.phases.pop()
+        if _state.phases:
+            _state.phases[-1].inner += elapsed
+        self.action.addPhase(self.name, elapsed - self.inner, threading.get_ident() == self.action.thread)
+        return False
+
+
+class _NoPhase:
+    """context manager that does nothing, used when there is nothing to time"""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NO_PHASE = _NoPhase()
+
+
+def phase(name, anyThread=False):
+    """times a phase of the action being profiled, use as: with phase('fetch'): ...
+
+    :param name: a string naming the phase, such as 'fetch', 'parse', 'plot', 'layout' or 'draw'
+    :param anyThread: True to also count the phase when it runs on a worker thread doing work for the action (see
+    bind()), the phases of worker threads overlap with the action and are left out of its 'other' time
+    :return: a context manager
+    """
+    action = getattr(_state, 'action', None) if _modes else None
+    if action is None or (not anyThread and threading.get_ident() != action.thread):
+        return _NO_PHASE
+    return _Phase(action, name)
+
+
+def bind(func):
+    """makes a function handed to a worker thread count towards the action being profiled on this thread
+
+    :param func: a function
+    :return: the function, wrapped if an action is being profiled
+    """
+    action = getattr(_state, 'action', None) if _modes else None
+    if action is None:
+        return func
+
+    @functools.wraps(func)
+    def bound(*args, **kwargs):
+        outer, outerPhases = getattr(_state, 'action', None), getattr(_state, 'phases', None)
+        _state.action, _state.phases = action, []
+        ident = threading.get_ident()
+        with action.lock:
+            action.threads.add(ident)
+        try:
+            return func(*args, **kwargs)
+        finally:
+            with action.lock:
+                if ident != action.thread:
+                    action.threads.discard(ident)
+            _state.action, _state.phases = outer, outerPhases
+
+    return bound
+
+
+def action(func=None, name=None):
+    """decorator for what the user asks the application to do, which profiles each call as one action. Calls made while
+    another action is being profiled on the same thread count towards that one
+
+    :param func: the function to decorate
+    :param name: a string naming the action, by default the qualified name of the function
+    :return: the decorated function
+    """
+    if func is None:
+        return functools.partial(action, name=name)
+    label = name or func.__qualname__
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        if not _modes or getattr(_state, 'action', None) is not None:
+            return func(*args, **kwargs)
+        return _run(label, func, args, kwargs)
+
+    return wrapper
+
+
+def paused(func):
+    """decorator for functions that wait for the user, such as tkinter's wait_window(). The time waited is counted as
+    the phase 'dialog', and whatever the user does meanwhile is profiled as actions of its own
+
+    :param func: the function to decorate
+    :return: the decorated function
+    """
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        current = getattr(_state, 'action', None) if _modes else None
+        if current is None:
+            return func(*args, **kwargs)
+
+        phases = _state.phases
+        _state.action, _state.phases = None, []
+        start = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            elapsed = time.perf_counter() - start
+            _state.action, _state.phases = current, phases
+            if phases:
+                phases[-1].inner += elapsed
+            current.addPhase('dialog', elapsed, True)
+
+    return wrapper
+
+
+def instrument(cls, phases=None, actions=None):
+    """wraps every public method of a class so its calls and time are recorded in the action being profiled
+
+    :param cls: the class to instrument, it is changed in place
+    :param phases: an optional function taking a method name and returning the phase its own time counts as, or None
+    :param actions: an optional function taking a method name and returning True if calls to it made outside of an
+    action are profiled as actions of their own, calls to the other methods are not recorded then
+    :return: the class
+    """
+    for attr, value in list(vars(cls).items()):
+        if attr.startswith('_') or not callable(value):
+            continue
+        setattr(cls, attr, _timed(value, f'{cls.__name__}.{attr}', phases(attr) if phases else None,
+                                  bool(actions and actions(attr))))
+    return cls
+
+
+def _timed(func, label, phaseName, standalone):
+    """wraps a method for instrument()"""
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        if not _modes:
+            return func(*args, **kwargs)
+        current = getattr(_state, 'action', None)
+        if current is None:
+            if not standalone:
+                return func(*args, **kwargs)
+            return _run(label, wrapper, args, kwargs)
+
+        start = time.perf_counter()
+        try:
+            if phaseName is None:
+                return func(*args, **kwargs)
+            with phase(phaseName):
+                return func(*args, **kwargs)
+        finally:
+            current.addMethod(label, time.perf_counter() - start)
+
+    return wrapper
+
+
+def _run(name, func, args, kwargs):
+    """runs a function as a profiled action and writes its profile"""
+    global _tracers, _startedTracing
+
+    current = _Action(name)
+    modes = _modes
+    _state.action, _state.phases = current, []
+
+    profiler = None
+    if 'cprofile' in modes:
+        import cProfile
+
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError:  # another profiler is running on this interpreter (Python 3.12 allows only one)
+            profiler = None
+
+    if 'tracemalloc' in modes:
+        import tracemalloc
+
+        with _lock:
+            if _tracers == 0 and not tracemalloc.is_tracing():
+                tracemalloc.start()
+                _startedTracing = True
+            _tracers += 1
+        tracemalloc.reset_peak()  # peaks are shared by actions that overlap
+
+    sampler = _Sampler(current) if 'stacks' in modes else None
+    try:
+        return func(*args, **kwargs)
+    finally:
+        seconds = time.perf_counter() - current.start
+        if profiler is not None:
+            profiler.disable()
+        if sampler is not None:
+            sampler.stop()
+        memory = None
+        if 'tracemalloc' in modes:
+            size, peak = tracemalloc.get_traced_memory()
+            snapshot = tracemalloc.take_snapshot().filter_traces([tracemalloc.Filter(False, __file__)])
+            memory = (size, peak, snapshot)
+            with _lock:
+                _tracers -= 1
+                if _tracers == 0 and _startedTracing:
+                    tracemalloc.stop()
+                    _startedTracing = False
+        _state.action, _state.phases = None, None
+
+        try:
+            _write(current, seconds, profiler, memory, sampler)
+        except OSError as e:
+            print(f'profile: could not write the profile of {name}: {e}', file=sys.stderr)
+
+
+class _Sampler:
+    """samples the call stacks of the threads doing work for an action, for a flame graph"""
+
+    def __init__(self, current):
+        self.action = current
+        self.stacks = {}  # collapsed stack -> samples
+        self.done = threading.Event()
+        self.thread = threading.Thread(target=self.sample, name='profile-sampler', daemon=True)
+        self.thread.start()
+
+    def sample(self):
+        names = {}
+        while not self.done.wait(_SAMPLE_SECONDS):
+            with self.action.lock:
+                threads = set(self.action.threads)
+            frames = sys._current_frames()
+            for ident in threads:
+                frame = frames.get(ident)
+                if frame is None:
+                    continue
+                if ident not in names:
+                    names[ident] = next((t.name for t in threading.enumerate() if t.ident == ident), str(ident))
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f'{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})')
+                    frame = frame.f_back
+                stack.append(names[ident])
+                key = ';'.join(reversed(stack))
+                self.stacks[key] = self.stacks.get(key, 0) + 1
+
+    def stop(self):
+        self.done.set()
+        self.thread.join()
+
+
+def _write(current, seconds, profiler, memory, sampler):
+    """writes the profile of an action to the profile directory"""
+    global _count
+    import json
+
+    with _lock:
+        _count += 1
+        count = _count
+    os.makedirs(_directory, exist_ok=True)
+    safeName = ''.join(c if c.isalnum() or c in '._-' else '_' for c in current.name)
+    prefix = os.path.join(_directory, time.strftime('%Y%m%d-%H%M%S', time.localtime(current.started)) +
+                          f'-{count:04d}-{safeName}')
+
+    phases = dict(current.phases)
+    phases['other'] = max(0.0, seconds - current.ownPhases)
+    record = {'action': current.name, 'started': current.started, 'seconds': seconds, 'phases': phases,
+              'methods': current.methods}
+    if profiler is not None:
+        profiler.dump_stats(prefix + '.prof')
+        record['cprofile'] = prefix + '.prof'
+    if memory is not None:
+        size, peak, snapshot = memory
+        record['memory'] = {'traced': size, 'peak': peak}
+        with open(prefix + '.memory.txt', 'w', encoding='utf-8') as f:
+            f.write(f'{current.name}: {size / 2 ** 20:.1f} MiB traced at the end, {peak / 2 ** 20:.1f} MiB at the '
+                    f'peak\n\n')
+            for stat in snapshot.statistics('lineno')[:_MEMORY_LINES]:
+                f.write(f'{stat}\n')
+        record['tracemalloc'] = prefix + '.memory.txt'
+    if sampler is not None:
+        with open(prefix + '.folded', 'w', encoding='utf-8') as f:
+            f.writelines(f'{stack} {samples}\n' for stack, samples in sorted(sampler.stacks.items()))
+        record['stacks'] = prefix + '.folded'
+
+    with _lock:
+        with open(os.path.join(_directory, 'actions.jsonl'), 'a', encoding='utf-8') as f:
+            f.write(json.dumps(record) + '\n')
+
+    split = ', '.join(f'{p} {s:.2f}' for p, s in sorted(phases.items(), key=lambda item: -item[1]) if s >= 0.005)
+    print(f'profile: {current.name} {seconds:.2f} s' + (f' ({split})' if split else ''), file=sys.stderr)
+
+
+if os.environ.get('URBAN_AREAS_PROFILE', '').strip().lower() not in ('', '0', 'off', 'false', 'no'):
+    enable(os.environ['URBAN_AREAS_PROFILE'])
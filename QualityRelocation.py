@@ -0,0 +1,235 @@
+"""
+Description: Ranks urban areas to move to for many people at once, such as a CSV of employees sent by HR. The data of
+every urban area (location, quality of life scores and the median salary of every job asked for) is retrieved once,
+and then each person's home urban area is found and every other urban area is scored for them with matrix operations:
+the salary for their job, the quality of life scores weighted by their priorities and the flight time from where they
+live. Each part is measured in standard deviations across the urban areas, so that the weights compare alike, and ten
+thousand people are scored in about a second.
+
+Usage: python QualityRelocation.py profiles.csv [shortlists.csv] [number of urban areas per person]
+
+The CSV of people has the columns name, job, latitude and longitude, and a column of weights for any of the quality of
+life metrics (such as Housing or Safety) and for Salary and Distance (a positive weight prefers shorter flights).
+Weights that are left out count as 0, and without any weight columns every metric, the salary and the distance count
+the same.
+"""
+
+import csv
+import os
+import sys
+
+import numpy as np
+
+from QualityTrip import distanceMatrix
+
+SALARY = 'Salary'
+DISTANCE = 'Distance'
+OUTPUT_COLUMNS = ('name', 'home_area', 'rank', 'urban_area', 'score', 'median_salary', 'flight_hours')
+_CHUNK = 4096  # people scored at a time, so the matrices of a large CSV are not all held at once
+
+
+def _standardize(values):
+    """measures values in standard deviations from their mean along the last axis, leaving NaN where missing"""
+    with np.errstate(invalid='ignore', divide='ignore'):
+        deviation = np.nanstd(values, axis=-1, keepdims=True)
+        z = (values - np.nanmean(values, axis=-1, keepdims=True)) / deviation
+    return np.where(deviation > 0, z, np.where(np.isnan(values), np.nan, 0.0))
+
+
+class RelocationScorer:
+    """The data of every urban area, ready to score urban areas to move to for many people at once."""
+
+    def __init__(self, areas, latitudes, longitudes, metrics, scores, jobs, salaries, radius=6373, speed=926):
+        """creates a scorer, see UrbanAreas.getRelocationScorer()
+
+        :param areas: a list of strings of urban areas
+        :param latitudes: the latitude of every urban area in degrees, NaN where it is not known
+        :param longitudes: the longitude of every urban area in degrees, NaN where it is not known
+        :param metrics: a list of strings of quality of life metrics
+        :param scores: a matrix of scores out of 10 with a row for every urban area and a column for every metric
+        :param jobs: a list of strings of jobs
+        :param salaries: a matrix of median salaries with a row for every job and a column for every urban area, NaN
+        where an urban area has no data for the job
+        :param radius: the radius of the earth in km
+        :param speed: the speed of a plane in km/h
+        """
+        self._areas = list(areas)
+        self._latitudes = np.asarray(latitudes, dtype=float)
+        self._longitudes = np.asarray(longitudes, dtype=float)
+        self._located = ~(np.isnan(self._latitudes) | np.isnan(self._longitudes))
+        self._metrics = list(metrics)
+        self._jobs = {job: i for i, job in enumerate(jobs)}
+        self._salaries = np.asarray(salaries, dtype=float).reshape(len(self._jobs), len(self._areas))
+        self._radius = radius
+        self._speed = speed
+
+        # scores missing for an urban area count as average, salaries missing leave the urban area out for people who
+        # care about salary
+        self._quality = np.nan_to_num(_standardize(np.asarray(scores, dtype=float).reshape(len(self._areas), -1).T)).T
+        with np.errstate(divide='ignore', invalid='ignore'):
+            salaryScores = _standardize(np.log(self._salaries))
+        # the last row, with no salaries, is used for jobs that are not known
+        self._salaryScores = np.vstack([salaryScores, np.full((1, len(self._areas)), np.nan)])
+
+    def getAreas(self):
+        """:return: a list of the urban areas, in the order of the indices handed back by score()"""
+        return list(self._areas)
+
+    def getCriteria(self):
+        """:return: a list of the names of the weights, the quality of life metrics followed by Salary and Distance"""
+        return self._metrics + [SALARY, DISTANCE]
+
+    def score(self, jobs, latitudes, longitudes, weights, k=5):
+        """scores every urban area for each of many people and keeps the best k for each, leaving out their home urban
+        area, urban areas whose location is not known and, for people whose salary weight is not 0, urban areas without
+        a salary for their job. The salary of a job that is not known is left out of the score
+
+        :param jobs: a list of strings of the job of every person
+        :param latitudes: a sequence of the latitude of every person in degrees
+        :param longitudes: a sequence of the longitude of every person in degrees
+        :param weights: a matrix with a row for every person and a column for every name in getCriteria()
+        :param k: the number of urban areas to keep for each person
+        :return: a tuple containing (array of the index of every person's home urban area, matrix of the indices of
+        their best urban areas, best first, matrix of the scores of those urban areas, -inf where a person has fewer
+        than k urban areas to choose from, matrix of the flight hours to those urban areas)
+        """
+        latitudes = np.asarray(latitudes, dtype=float)
+        longitudes = np.asarray(longitudes, dtype=float)
+        weights = np.asarray(weights, dtype=float).reshape(len(latitudes), len(self._metrics) + 2)
+        jobIndex = np.array([self._jobs.get(j, -1) for j in jobs], dtype=int)
+        k = min(k, len(self._areas))
+
+        homes = np.empty(len(latitudes), dtype=int)
+        best = np.empty((len(latitudes), k), dtype=int)
+        bestScores = np.empty((len(latitudes), k))
+        bestHours = np.empty((len(latitudes), k))
+        for start in range(0, len(latitudes), _CHUNK):
+            chunk = slice(start, start + _CHUNK)
+            homes[chunk], best[chunk], bestScores[chunk], bestHours[chunk] = self._scoreChunk(
+                jobIndex[chunk], latitudes[chunk], longitudes[chunk], weights[chunk], k)
+        return homes, best, bestScores, bestHours
+
+    def _scoreChunk(self, jobIndex, latitudes, longitudes, weights, k):
+        """scores a chunk of people, see score()"""
+        people = np.arange(len(latitudes))
+        hours = distanceMatrix(latitudes, longitudes, self._radius, self._latitudes, self._longitudes) / self._speed
+        hours[:, ~self._located] = np.nan
+        homes = np.nanargmin(np.where(np.isnan(hours), np.inf, hours), axis=1)
+
+        weights = weights.copy()
+        weights[jobIndex < 0, -2] = 0  # no salary data for jobs that are not known
+        total = np.abs(weights).sum(axis=1, keepdims=True)
+        weights /= np.where(total > 0, total, 1)  # every person's weights add up to 1
+        quality, salary, distance = weights[:, :-2], weights[:, -2:-1], weights[:, -1:]
+
+        salaries = self._salaryScores[jobIndex]
+        scores = (quality @ self._quality.T + salary * np.nan_to_num(salaries)
+                  - distance * np.nan_to_num(_standardize(hours)))
+        scores[(salary != 0) & np.isnan(salaries)] = -np.inf
+        scores[:, ~self._located] = -np.inf
+        scores[people, homes] = -np.inf
+
+        best = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        order = np.argsort(-scores[people[:, None], best], axis=1, kind='stable')
+        best = best[people[:, None], order]
+        return homes, best, scores[people[:, None], best], hours[people[:, None], best]
+
+    def medianSalary(self, job, area):
+        """:return: the median salary for a job in the urban area with the index area, NaN if there is none"""
+        i = self._jobs.get(job)
+        return float('nan') if i is None else float(self._salaries[i, area])
+
+
+def _columns(path, fieldnames):
+    """matches the columns of a CSV of people to their names in lower case, checking the ones needed are there
+
+    :param path: a string with the path of the CSV
+    :param fieldnames: a list of the column names in the header of the CSV
+    :return: a dictionary with the names in lower case as keys and the column names as values
+    """
+    columns = {c.strip().lower(): c for c in fieldnames or ()}
+    for needed in ('job', 'latitude', 'longitude'):
+        if needed not in columns:
+            raise ValueError(f'{path} has no {needed!r} column')
+    return columns
+
+
+def readProfiles(path, criteria):
+    """reads a CSV of people, see the description of this file for its columns
+
+    :param path: a string with the path of the CSV
+    :param criteria: a list of the names of the weights, see RelocationScorer.getCriteria()
+    :return: a tuple containing (list of names, list of jobs, array of latitudes, array of longitudes, matrix of
+    weights with a row for every person and a column for every name in criteria)
+    """
+    with open(path, newline='', encoding='utf-8-sig') as f:
+        reader = csv.DictReader(f)
+        columns = _columns(path, reader.fieldnames)
+        weightColumns = [columns.get(c.lower()) for c in criteria]
+        default = 0.0 if any(weightColumns) else 1.0  # without weight columns everything counts the same
+
+        names, jobs, latitudes, longitudes, weights = [], [], [], [], []
+        for line, row in enumerate(reader, start=2):
+            try:
+                latitudes.append(float(row[columns['latitude']]))
+                longitudes.append(float(row[columns['longitude']]))
+                weights.append([float(row[c]) if c and row[c] and row[c].strip() else default for c in weightColumns])
+            except (TypeError, ValueError):
+                raise ValueError(f'{path}, line {line}: coordinates and weights must be numbers')
+            names.append(row[columns['name']] if 'name' in columns else str(line - 1))
+            jobs.append((row[columns['job']] or '').strip())
+
+    return (names, jobs, np.array(latitudes, dtype=float), np.array(longitudes, dtype=float),
+            np.array(weights, dtype=float).reshape(len(names), len(criteria)))
+
+
+def relocate(urbanAreas, profilesPath, outputPath, k=5, status=None):
+    """writes a shortlist of the best urban areas to move to for every person in a CSV
+
+    :param urbanAreas: an UrbanAreas object
+    :param profilesPath: a string with the path of the CSV of people
+    :param outputPath: a string with the path of the CSV to write, with the columns in OUTPUT_COLUMNS and a row for
+    every urban area on every person's shortlist
+    :param k: the number of urban areas on each shortlist
+    :param status: an optional dictionary, filled in with the status of every urban area, see
+    UrbanAreas.getRelocationScorer()
+    :return: the number of people scored
+    """
+    with open(profilesPath, newline='', encoding='utf-8-sig') as f:  # only the jobs are needed to load the data
+        reader = csv.DictReader(f)
+        job = _columns(profilesPath, reader.fieldnames)['job']
+        jobs = {(row[job] or '').strip() for row in reader} - {''}
+    scorer = urbanAreas.getRelocationScorer(sorted(jobs), status=status)
+    names, jobs, latitudes, longitudes, weights = readProfiles(profilesPath, scorer.getCriteria())
+    homes, best, scores, hours = scorer.score(jobs, latitudes, longitudes, weights, k)
+
+    areas = scorer.getAreas()
+    partPath = outputPath + '.part'
+    with open(partPath, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(OUTPUT_COLUMNS)
+        for p in range(len(names)):
+            for rank in range(best.shape[1]):
+                if not np.isfinite(scores[p, rank]):
+                    break
+                a = best[p, rank]
+                salary = scorer.medianSalary(jobs[p], a)
+                writer.writerow((names[p], areas[homes[p]], rank + 1, areas[a], f'{scores[p, rank]:.3f}',
+                                 '' if np.isnan(salary) else f'{salary:.0f}', f'{hours[p, rank]:.2f}'))
+    os.replace(partPath, outputPath)
+    return len(names)
+
+
+if __name__ == '__main__':
+    from QualityBackEnd import UrbanAreas
+
+    if len(sys.argv) < 2:
+        sys.exit(__doc__)
+    output = sys.argv[2] if len(sys.argv) > 2 else 'shortlists.csv'
+    status = {}
+    count = relocate(UrbanAreas(), sys.argv[1], output, int(sys.argv[3]) if len(sys.argv) > 3 else 5, status)
+    print(f'wrote shortlists for {count} people to {output}')
+    failed = sorted(a for a, s in status.items() if s != 'ok')
+    if failed:
+        print(f'{len(failed)} urban areas could not all be retrieved and were left out or scored without some of '
+              f'their data: {", ".join(failed)}', file=sys.stderr)
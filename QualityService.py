@@ -0,0 +1,260 @@
+"""
+Description: Serves the data behind UrbanAreas over HTTP as JSON, so that other tools can use it without the tkinter
+interface. Every client shares one UrbanAreas object, and with it the page cache and the pool of connections to the API.
+Identical requests that arrive while one is already being answered wait for that answer instead of doing the work again,
+and charts are drawn to PNG by a small pool of workers and kept for a few minutes.
+
+Usage: python QualityService.py [port] [host]
+
+Endpoints (urban areas are given with a repeated area parameter, since some of their names contain commas):
+    GET /areas, /jobs, /metrics
+    GET /salaries?job=<job>&area=<area>&area=...
+    GET /scores?area=<area>&area=...
+    GET /cost-of-living?area=<area>&area=...
+    GET /distances?from=<area>&area=<area>&area=...
+    GET /nearest?lat=<latitude>&lon=<longitude>
+    GET /history?area=<area>&feature=<feature>
+    GET /history/changes?feature=<feature>&n=<number of areas>
+    GET /chart/salaries.png?job=<job>&area=...
+    GET /chart/compare-quality.png?metric=<metric>&area=...&view=<auto, bars, ranked, distribution or trend>
+    GET /chart/all-quality.png?area=<area>
+    GET /chart/cost-of-living.png?area=<area>
+    GET /chart/purchasing-power.png?job=<job>&area=...
+    GET /chart/map.png?from=<area>&area=...
+"""
+
+import json
+import math
+import sys
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from io import BytesIO
+from urllib.parse import parse_qs, urlsplit
+
+import QualityProfile
+from QualityBackEnd import UrbanAreas
+
+_RENDER_WORKERS = 4  # charts drawn at once
+_CHARTS_KEPT = 128  # charts kept after drawing, so asking for the same chart again does not draw it again
+_CHART_SECONDS = 300  # how long a drawn chart is kept
+
+
+class _BadRequest(Exception):
+    """a request with missing or invalid parameters, answered with 400"""
+
+
+class _Coalescer:
+    """Runs a piece of work once for every group of identical requests that arrive while it is running."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pending = {}  # key -> Future of the work being done for that key
+
+    def run(self, key, func):
+        """runs func, or waits for the answer if the same key is already running
+
+        :param key: a hashable describing the request
+        :param func: a function with no parameters that does the work
+        :return: what func returned
+        """
+        with self._lock:
+            future = self._pending.get(key)
+            owner = future is None
+            if owner:
+                future = Future()
+                self._pending[key] = future
+
+        if not owner:
+            return future.result()
+
+        try:
+            result = func()
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                del self._pending[key]
+        future.set_result(result)
+        return result
+
+
+class UrbanAreasService(ThreadingHTTPServer):
+    """HTTP server answering requests for urban area data from one shared UrbanAreas object"""
+
+    daemon_threads = True
+    request_queue_size = 256
+
+    def __init__(self, port=8080, host='127.0.0.1', urbanAreas=None):
+        """creates the server, call serve_forever() to start answering requests
+
+        :param port: the port to listen on, 0 picks a free one
+        :param host: the address to listen on, only this computer by default
+        :param urbanAreas: an optional UrbanAreas object to share, a new one is made by default
+        """
+        super().__init__((host, port), _Handler)
+        self.urbanAreas = urbanAreas if urbanAreas is not None else UrbanAreas()
+        self.coalescer = _Coalescer()
+        self.renderPool = ThreadPoolExecutor(max_workers=_RENDER_WORKERS, thread_name_prefix='render')
+        self.charts = OrderedDict()  # request key -> (time drawn, PNG), least recently used first
+        self.chartsLock = threading.Lock()
+        self.url = f'http://{host}:{self.server_address[1]}/'
+
+    def server_close(self):
+        super().server_close()
+        self.renderPool.shutdown(wait=False)
+
+    def answer(self, key, path, query):
+        """works out the answer to a request
+
+        :param key: a hashable identifying the request
+        :param path: the path of the request, such as '/salaries'
+        :param query: a dictionary of the query parameters, with a list of values for each
+        :return: a tuple containing (content type, body as bytes)
+        """
+        u = self.urbanAreas
+
+        def one(name):
+            if name not in query:
+                raise _BadRequest(f'missing parameter {name!r}')
+            return query[name][0]
+
+        def areas():
+            if 'area' not in query:
+                raise _BadRequest("missing parameter 'area'")
+            return query['area']
+
+        def number(name):
+            try:
+                return float(one(name))
+            except ValueError:
+                raise _BadRequest(f'{name!r} must be a number')
+
+        if path.startswith('/chart/') and path.endswith('.png'):
+            kind = path[len('/chart/'):-len('.png')]
+            view = query.get('view', ['auto'])[0]
+            if view not in ('auto', 'bars', 'ranked', 'distribution', 'trend'):
+                raise _BadRequest(f'unknown view {view!r}')
+            charts = {
+                'salaries': lambda: u.plotSalaries(one('job'), areas()),
+                'compare-quality': lambda: u.plotCompareQuality(one('metric'), areas(), view=view),
+                'all-quality': lambda: u.plotAllQuality(one('area')),
+                'cost-of-living': lambda: u.plotCostOfLiving(one('area')),
+                'purchasing-power': lambda: u.plotPurchasingPower(one('job'), areas()),
+                'map': lambda: u.plotMap(one('from'), areas()),
+            }
+            if kind not in charts:
+                raise LookupError(f'no chart called {kind!r}')
+
+            with self.chartsLock:
+                entry = self.charts.get(key)
+                if entry is not None and time.time() - entry[0] < _CHART_SECONDS:
+                    self.charts.move_to_end(key)
+                    return 'image/png', entry[1]
+
+            png = self.renderPool.submit(QualityProfile.action(_render, name=path), charts[kind]).result()
+            with self.chartsLock:
+                self.charts[key] = (time.time(), png)
+                self.charts.move_to_end(key)
+                while len(self.charts) > _CHARTS_KEPT:
+                    self.charts.popitem(last=False)
+            return 'image/png', png
+
+        if path == '/areas':
+            data = u.getUrbanAreas()
+        elif path == '/jobs':
+            data = u.getJobs()
+        elif path == '/metrics':
+            data = u.getMetrics()
+        elif path == '/salaries':
+            data = {a: dict(zip(('percentile_25', 'percentile_50', 'percentile_75'), v))
+                    for a, v in u.getSalaries(one('job'), areas()).items()}
+        elif path == '/scores':
+            data = u.getScores(areas())
+        elif path == '/cost-of-living':
+            names, items, costs = u.getCostOfLiving(areas())
+            data = {a: {item: c for item, c in zip(items, row) if not math.isnan(c)} for a, row in zip(names, costs)}
+        elif path == '/distances':
+            data = {a: {'km': km, 'flight_hours': hours} for a, (km, hours) in
+                    u.getDistances(one('from'), areas()).items()}
+        elif path == '/nearest':
+            lat, lon = number('lat'), number('lon')
+            if not (-90 <= lat <= 90 and -180 <= lon <= 180):
+                raise _BadRequest('coordinates out of range')
+            data = {'urban_area': u.nearestArea(lat, lon)[0]}
+        elif path == '/history':
+            times, values = u.getHistory().series(one('area'), one('feature'))
+            data = [{'time': t, 'value': v} for t, v in zip(times.tolist(), values.tolist())]
+        elif path == '/history/changes':
+            count = int(number('n')) if 'n' in query else 10
+            data = [{'urban_area': a, 'before': before, 'after': after}
+                    for a, before, after in u.getHistory().biggestChanges(one('feature'), n=count)]
+        else:
+            raise LookupError(f'no endpoint at {path}')
+        return 'application/json', json.dumps(data).encode()
+
+
+def _render(plot):
+    """draws a chart to PNG
+
+    :param plot: a function with no parameters that returns a figure
+    :return: the PNG as bytes
+    """
+    fig = plot()
+    buffer = BytesIO()
+    with QualityProfile.phase('draw'):
+        fig.savefig(buffer, format='png')
+    fig.clear()
+    return buffer.getvalue()
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'  # lets clients keep their connection open between requests
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        parts = urlsplit(self.path)
+        query = parse_qs(parts.query)
+        # identical requests are the same path with the same parameters, in any order
+        key = (parts.path, tuple(sorted((k, tuple(v)) for k, v in query.items())))
+        try:
+            ctype, body = self.server.coalescer.run(key, lambda: self.server.answer(key, parts.path, query))
+            status = 200
+        except _BadRequest as e:
+            ctype, body, status = 'application/json', json.dumps({'error': str(e)}).encode(), 400
+        except LookupError as e:  # unknown endpoint, urban area or chart
+            ctype, body, status = 'application/json', json.dumps({'error': f'not found: {e}'}).encode(), 404
+        except Exception as e:
+            ctype, body, status = 'application/json', json.dumps({'error': repr(e)}).encode(), 502
+
+        self.send_response(status)
+        self.send_header('Content-Type', ctype)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def serve(port=8080, host='127.0.0.1'):
+    """runs the service until it is interrupted
+
+    :param port: the port to listen on
+    :param host: the address to listen on
+    """
+    server = UrbanAreasService(port, host)
+    print('serving urban area data at', server.url)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == '__main__':
+    serve(int(sys.argv[1]) if len(sys.argv) > 1 else 8080, sys.argv[2] if len(sys.argv) > 2 else '127.0.0.1')
@@ -0,0 +1,144 @@
+"""
+Description: Finds urban areas that are alike. Every urban area is a row of a NumPy matrix holding its quality of life
+scores (and optionally the median salary of a job), and each column is normalized to a mean of 0 and a standard
+deviation of 1 so that no one metric outweighs the others. The matrix answers "which urban areas are most like this one"
+(k nearest neighbours) and groups the whole catalog with k-means. New or changed urban areas are written into the
+matrix in place, without building it again from the pages.
+"""
+
+import warnings
+
+import numpy as np
+
+
+class SimilarityIndex:
+    """A normalized matrix of urban area features, for nearest neighbour queries and clustering."""
+
+    def __init__(self, features):
+        """creates an empty index
+
+        :param features: a list of strings naming the columns, such as the quality of life metrics
+        """
+        self._features = list(features)
+        self._areas = []  # urban area of each row
+        self._rows = {}  # urban area -> row
+        self._raw = np.empty((16, len(self._features)))  # grows by doubling, only the first len(self._areas) rows used
+        self._normalized = None  # rows normalized column by column, worked out again on the first query after a change
+        self._squares = None  # squared length of every normalized row
+
+    def __len__(self):
+        return len(self._areas)
+
+    def __contains__(self, urbanArea):
+        return urbanArea in self._rows
+
+    def getFeatures(self):
+        """gets the names of the columns
+
+        :return: a list of strings
+        """
+        return list(self._features)
+
+    def getAreas(self):
+        """gets the urban areas in the index
+
+        :return: a list of strings, in the order they were added
+        """
+        return list(self._areas)
+
+    def update(self, vectors):
+        """adds urban areas to the index, or replaces the values of urban areas already in it
+
+        :param vectors: a dictionary with urban areas as keys and sequences of values (one per feature, NaN where
+        missing) as values
+        :return: None
+        """
+        if not vectors:
+            return
+        for area, values in vectors.items():
+            row = self._rows.get(area)
+            if row is None:
+                row = len(self._areas)
+                if row == len(self._raw):
+                    self._raw = np.concatenate((self._raw, np.empty_like(self._raw)))
+                self._rows[area] = row
+                self._areas.append(area)
+            self._raw[row] = values
+        self._normalized = None
+
+    def _matrix(self):
+        """normalizes the columns if the index changed since the last query
+
+        :return: the normalized matrix, with missing values at the mean of their column
+        """
+        if self._normalized is None:
+            raw = self._raw[:len(self._areas)]
+            with warnings.catch_warnings():
+                warnings.simplefilter('ignore', RuntimeWarning)  # a column with no values at all has a NaN mean
+                mean = np.nanmean(raw, axis=0)
+                std = np.nanstd(raw, axis=0)
+            std[~(std > 0)] = 1  # a column with one value (or none) says nothing about how alike areas are
+            normalized = (raw - mean) / std
+            normalized[np.isnan(normalized)] = 0
+            self._normalized = normalized
+            self._squares = np.einsum('ij,ij->i', normalized, normalized)
+        return self._normalized
+
+    def nearest(self, urbanArea, k=5):
+        """finds the urban areas most like one in the index
+
+        :param urbanArea: a string containing an urban area in the index
+        :param k: the number of urban areas to find
+        :return: a list of tuples containing (urban area, distance), closest first, without urbanArea itself
+        """
+        z = self._matrix()
+        row = self._rows[urbanArea]
+        distances = self._squares + self._squares[row] - 2 * (z @ z[row])
+        distances[row] = np.inf
+        k = min(k, len(self._areas) - 1)
+        if k <= 0:
+            return []
+        closest = np.argpartition(distances, k - 1)[:k]
+        closest = closest[np.argsort(distances[closest])]
+        return [(self._areas[i], float(np.sqrt(max(distances[i], 0)))) for i in closest]
+
+    def cluster(self, k, iterations=100, seed=0):
+        """groups the urban areas in the index into k clusters of alike areas with k-means
+
+        :param k: the number of clusters
+        :param iterations: the most rounds of moving the centres of the clusters
+        :param seed: the seed for choosing the first centres, so the same index gives the same clusters
+        :return: a tuple containing (a list of the cluster number of every urban area, in the order of getAreas(), an
+        array of the centres of the clusters in normalized units)
+        """
+        z = self._matrix()
+        n = len(z)
+        k = min(k, n)
+        if k <= 0:
+            return [], np.empty((0, len(self._features)))
+        rng = np.random.default_rng(seed)
+
+        # k-means++: every next centre is picked with a chance that grows with its distance from the centres so far
+        centres = np.empty((k, z.shape[1]))
+        centres[0] = z[rng.integers(n)]
+        closest = ((z - centres[0]) ** 2).sum(axis=1)
+        for c in range(1, k):
+            total = closest.sum()
+            pick = rng.choice(n, p=closest / total) if total > 0 else rng.integers(n)
+            centres[c] = z[pick]
+            closest = np.minimum(closest, ((z - centres[c]) ** 2).sum(axis=1))
+
+        labels = np.full(n, -1)
+        for _ in range(iterations):
+            distances = self._squares[:, None] + (centres ** 2).sum(axis=1)[None, :] - 2 * (z @ centres.T)
+            newLabels = np.argmin(distances, axis=1)
+            if np.array_equal(newLabels, labels):
+                break
+            labels = newLabels
+            counts = np.bincount(labels, minlength=k)
+            sums = np.zeros_like(centres)
+            np.add.at(sums, labels, z)
+            filled = counts > 0
+            centres[filled] = sums[filled] / counts[filled, None]  # an empty cluster keeps its centre
+        return labels.tolist(), centres
+
@@ -0,0 +1,177 @@
+"""
+Description: Keeps the world map as a pyramid of tiles on disk, so that maps can be zoomed in on the urban areas being
+shown without loading (or downloading) the whole image every time. The pyramid is built once from the source image:
+level 0 is the image at full size and every level after it is half the size of the one before, each cut into square
+tiles. Drawing a map only loads the tiles covering the part of the world shown, from the smallest level that is still
+sharp at the size the map is drawn.
+
+The tiles are kept in ~/.cache/urban_areas/tiles, which can be changed with the URBAN_AREAS_TILES environment variable,
+in a directory for every source image.
+"""
+
+import hashlib
+import json
+import math
+import os
+import shutil
+import tempfile
+import threading
+from collections import OrderedDict
+
+_TILE_SIZE = 256
+_TILES_KEPT = 256  # tiles kept in memory after loading, least recently used are dropped first
+_FORMAT_VERSION = 1
+
+
+def tileDirectory(source):
+    """works out the directory the tiles of a source image are kept in
+
+    :param source: a string identifying the source image, such as its url
+    :return: a string with the path of the directory
+    """
+    base = os.environ.get('URBAN_AREAS_TILES') or os.path.join(os.path.expanduser('~'), '.cache', 'urban_areas',
+                                                                'tiles')
+    return os.path.join(base, hashlib.sha1(source.encode()).hexdigest()[:16])
+
+
+class TilePyramid:
+    """A world map in an equirectangular projection, kept as tiles at several levels of detail."""
+
+    def __init__(self, directory):
+        """opens a pyramid that was built with build()
+
+        :param directory: a string with the directory of the pyramid
+        """
+        with open(os.path.join(directory, 'pyramid.json')) as f:
+            meta = json.load(f)
+        if meta.get('version') != _FORMAT_VERSION:
+            raise ValueError(f'the tiles in {directory} were built by a different version')
+        self._directory = directory
+        self._tileSize = meta['tileSize']
+        self._levels = [tuple(size) for size in meta['levels']]  # (width, height) of every level
+        self._tiles = OrderedDict()  # (level, row, column) -> loaded tile, least recently used first
+        self._lock = threading.Lock()
+        self.loaded = 0  # tiles read from disk so far, for the benchmarks
+
+    @classmethod
+    def build(cls, directory, image, tileSize=_TILE_SIZE):
+        """cuts an image into a pyramid of tiles and writes it to a directory. The tiles are written next to the
+        directory first and moved into place once they are all written
+
+        :param directory: a string with the directory to write the pyramid to
+        :param image: a PIL image of the world map in an equirectangular projection
+        :param tileSize: the width and height of the tiles in pixels
+        :return: the TilePyramid
+        """
+        from PIL import Image
+
+        parent = os.path.dirname(directory)
+        os.makedirs(parent, exist_ok=True)
+        work = tempfile.mkdtemp(dir=parent, prefix='.building-')
+        try:
+            level = image.convert('RGB')
+            levels = []
+            while True:
+                width, height = level.size
+                levels.append((width, height))
+                os.makedirs(os.path.join(work, str(len(levels) - 1)))
+                for row in range(math.ceil(height / tileSize)):
+                    for column in range(math.ceil(width / tileSize)):
+                        box = (column * tileSize, row * tileSize, min(width, (column + 1) * tileSize),
+                               min(height, (row + 1) * tileSize))
+                        level.crop(box).save(os.path.join(work, str(len(levels) - 1), f'{row}_{column}.jpg'),
+                                             quality=90)
+                if width <= tileSize and height <= tileSize:
+                    break
+                level = level.resize((max(1, width // 2), max(1, height // 2)), Image.LANCZOS)
+
+            with open(os.path.join(work, 'pyramid.json'), 'w') as f:
+                json.dump({'version': _FORMAT_VERSION, 'tileSize': tileSize, 'levels': levels}, f)
+            try:
+                os.replace(work, directory)
+            except OSError:  # another process built the same pyramid first
+                shutil.rmtree(work, ignore_errors=True)
+        except BaseException:
+            shutil.rmtree(work, ignore_errors=True)
+            raise
+        return cls(directory)
+
+    def getLevels(self):
+        """gets the size of every level
+
+        :return: a list of tuples containing (width, height) in pixels, largest first
+        """
+        return list(self._levels)
+
+    def _tile(self, level, row, column):
+        """loads a tile, or takes it from the tiles kept in memory"""
+        from PIL import Image
+
+        key = (level, row, column)
+        with self._lock:
+            tile = self._tiles.get(key)
+            if tile is not None:
+                self._tiles.move_to_end(key)
+                return tile
+
+        with Image.open(os.path.join(self._directory, str(level), f'{row}_{column}.jpg')) as f:
+            tile = f.convert('RGB')
+        with self._lock:
+            self.loaded += 1
+            self._tiles[key] = tile
+            while len(self._tiles) > _TILES_KEPT:
+                self._tiles.popitem(last=False)
+        return tile
+
+    def render(self, west, south, east, north, width=1000):
+        """puts together the part of the map inside a box from the tiles covering it
+
+        :param west: the longitude of the left edge of the box in degrees
+        :param south: the latitude of the bottom edge of the box in degrees
+        :param east: the longitude of the right edge of the box in degrees
+        :param north: the latitude of the top edge of the box in degrees
+        :param width: the width in pixels the map is drawn at, the smallest level at least this sharp is used
+        :return: a tuple containing (PIL image, (west, east, south, north) of the pixels in the image), ready for
+        imshow(image, extent=...)
+        """
+        from PIL import Image
+
+        west, east = max(-180.0, west), min(180.0, east)
+        south, north = max(-90.0, south), min(90.0, north)
+
+        level = 0
+        for k, (levelWidth, _) in enumerate(self._levels):
+            if (east - west) / 360 * levelWidth >= width:
+                level = k
+        levelWidth, levelHeight = self._levels[level]
+
+        left = max(0, math.floor((west + 180) / 360 * levelWidth))
+        right = min(levelWidth, math.ceil((east + 180) / 360 * levelWidth))
+        top = max(0, math.floor((90 - north) / 180 * levelHeight))
+        bottom = min(levelHeight, math.ceil((90 - south) / 180 * levelHeight))
+        right, bottom = max(right, left + 1), max(bottom, top + 1)
+
+        size = self._tileSize
+        image = Image.new('RGB', (right - left, bottom - top))
+        for row in range(top // size, (bottom - 1) // size + 1):
+            for column in range(left // size, (right - 1) // size + 1):
+                image.paste(self._tile(level, row, column), (column * size - left, row * size - top))
+
+        extent = (left / levelWidth * 360 - 180, right / levelWidth * 360 - 180,
+                  90 - bottom / levelHeight * 180, 90 - top / levelHeight * 180)
+        return image, extent
+
+
+def openPyramid(source, getImage):
+    """opens the pyramid of a source image, building it the first time
+
+    :param source: a string identifying the source image, such as its url
+    :param getImage: a function with no parameters returning the source as a PIL image, only called to build the pyramid
+    :return: a TilePyramid
+    """
+    directory = tileDirectory(source)
+    try:
+        return TilePyramid(directory)
+    except (OSError, ValueError, KeyError):
+        shutil.rmtree(directory, ignore_errors=True)  # missing, partly removed or from a different version
+    return TilePyramid.build(directory, getImage())
@@ -0,0 +1,156 @@
+"""
+Description: Works out a short order to visit many urban areas in, starting from one of them. The distances between
+every pair of urban areas are worked out at once as a matrix, a first order is built by always flying to the nearest
+urban area not visited yet, and it is then improved with 2-opt (reversing part of the trip) and Or-opt (moving one to
+three urban areas in a row to a better place) until neither finds anything shorter. The improvements are searched with
+NumPy over the whole trip at a time, so trips through every urban area are planned in well under a second.
+"""
+
+import numpy as np
+
+_EPSILON = 1e-9  # improvements smaller than this are rounding errors, not improvements
+
+
+def distanceMatrix(latitudes, longitudes, radius=6373, toLatitudes=None, toLongitudes=None):
+    """calculates the distances along the surface of the earth between every pair of points (haversine formula)
+
+    :param latitudes: a sequence of latitudes in degrees
+    :param longitudes: a sequence of longitudes in degrees, in the same order
+    :param radius: the radius of the earth, in the unit of the distances returned (km by default)
+    :param toLatitudes: an optional second sequence of latitudes to measure to, by default the same points
+    :param toLongitudes: the longitudes of the second sequence of points
+    :return: a NumPy array with the distance from point i to point j in row i, column j, square unless a second
+    sequence of points is given
+    """
+    lat = np.radians(np.asarray(latitudes, dtype=float))
+    lon = np.radians(np.asarray(longitudes, dtype=float))
+    toLat = lat if toLatitudes is None else np.radians(np.asarray(toLatitudes, dtype=float))
+    toLon = lon if toLongitudes is None else np.radians(np.asarray(toLongitudes, dtype=float))
+    ar = (np.sin((lat[:, None] - toLat[None, :]) / 2) ** 2
+          + np.cos(lat[:, None]) * np.cos(toLat[None, :]) * np.sin((lon[:, None] - toLon[None, :]) / 2) ** 2)
+    return 2 * radius * np.arctan2(np.sqrt(ar), np.sqrt(np.clip(1 - ar, 0, None)))
+
+
+def tourLength(distances, order, roundTrip=False):
+    """adds up the legs of a trip
+
+    :param distances: a square array of distances
+    :param order: a list of the indices visited, in order
+    :param roundTrip: True to count the leg from the last index back to the first
+    :return: the total distance
+    """
+    order = list(order) + ([order[0]] if roundTrip and order else [])
+    d = np.asarray(distances, dtype=float)
+    return float(d[order[:-1], order[1:]].sum())
+
+
+def planTour(distances, roundTrip=False):
+    """works out a short order to visit every point in, starting from point 0
+
+    :param distances: a square, symmetric array of distances (or times) between the points
+    :param roundTrip: True if the trip ends back at point 0, otherwise it ends wherever is shortest
+    :return: a list of the indices of the points in the order visited, starting with 0
+    """
+    d = np.asarray(distances, dtype=float)
+    n = len(d)
+    if n <= (3 if roundTrip else 2):
+        return list(range(n))  # every order is as short as any other
+
+    tour = _nearestNeighbour(d)
+    if not roundTrip:
+        # a trip that does not return is a round trip through one more, made up, point that can only be reached from
+        # the start for free and is far from everything else. It always ends up next to the start, and taking it out
+        # again leaves the shortest trip that does not return
+        far = d.sum() + 1
+        padded = np.full((n + 1, n + 1), far)
+        padded[:n, :n] = d
+        padded[n, n] = padded[0, n] = padded[n, 0] = 0
+        d = padded
+        tour = np.append(tour, n)
+
+    _twoOpt(d, tour)
+    while _orOpt(d, tour) and _twoOpt(d, tour):
+        pass  # each stops at a trip it cannot improve, so stop once neither can
+
+    if not roundTrip:
+        if tour[1] == n:  # the trip was found backwards, ending at the made up point
+            tour = np.concatenate((tour[:1], tour[:1:-1]))
+        else:
+            tour = tour[:-1]
+    return tour.tolist()
+
+
+def _nearestNeighbour(d):
+    """builds a trip from point 0 by always going to the nearest point not visited yet
+
+    :param d: a square array of distances
+    :return: a NumPy array of the indices in the order visited
+    """
+    n = len(d)
+    visited = np.zeros(n, dtype=bool)
+    tour = np.empty(n, dtype=int)
+    tour[0] = 0
+    visited[0] = True
+    for k in range(1, n):
+        row = np.where(visited, np.inf, d[tour[k - 1]])
+        tour[k] = np.argmin(row)
+        visited[tour[k]] = True
+    return tour
+
+
+def _twoOpt(d, tour):
+    """improves a round trip by reversing the part of it that shortens it the most, until no reversal shortens it.
+    Reversing the part between the legs k and l replaces them with a leg between their starts and one between their
+    ends, and the change in length of every pair of legs is worked out at once as a matrix
+
+    :param d: a square, symmetric array of distances
+    :param tour: a NumPy array of the indices in the order visited, changed in place, the first is never moved
+    :return: True if the trip was changed
+    """
+    changed = False
+    while True:
+        nxt = np.roll(tour, -1)
+        legs = d[tour, nxt]
+        delta = d[np.ix_(tour, tour)] + d[np.ix_(nxt, nxt)] - legs[:, None] - legs[None, :]
+        delta = np.triu(delta, 2)  # only pairs of legs with at least one point between them
+        k, l = np.unravel_index(np.argmin(delta), delta.shape)
+        if delta[k, l] > -_EPSILON:
+            return changed
+        tour[k + 1:l + 1] = tour[k + 1:l + 1][::-1].copy()
+        changed = True
+
+
+def _orOpt(d, tour):
+    """improves a round trip by moving one, two or three points in a row to the place between two other points where
+    they add the least, forwards or backwards, until no move shortens it. Every place is tried at once for each move
+
+    :param d: a square, symmetric array of distances
+    :param tour: a NumPy array of the indices in the order visited, changed in place, the first is never moved
+    :return: True if the trip was changed
+    """
+    m = len(tour)
+    changed = False
+    improved = True
+    while improved:
+        improved = False
+        for size in (1, 2, 3):
+            for i in range(1, m - size + 1):
+                segment = tour[i:i + size].copy()
+                first, last = segment[0], segment[-1]
+                before, after = tour[i - 1], tour[(i + size) % m]
+                saved = d[before, first] + d[last, after] - d[before, after]
+
+                rest = np.concatenate((tour[:i], tour[i + size:]))
+                nxt = np.roll(rest, -1)
+                legs = d[rest, nxt]
+                forwards = d[rest, first] + d[last, nxt] - legs
+                backwards = d[rest, last] + d[first, nxt] - legs
+                added = np.minimum(forwards, backwards)
+                added[i - 1] = np.inf  # where the points were taken from
+                j = int(np.argmin(added))
+                if added[j] < saved - _EPSILON:
+                    if backwards[j] < forwards[j]:
+                        segment = segment[::-1]
+                    tour[:] = np.concatenate((rest[:j + 1], segment, rest[j + 1:]))
+                    improved = changed = True
+    return changed
@@ -0,0 +1,64 @@
+"""
+Description: Benchmark for the statistics across the catalog. Builds the feature table of every urban area (scores,
+salary percentiles for some jobs and cost of living items) from the stub server, then compares working out the
+correlation of every pair of features in one pass of matrix products against a loop over the pairs.
+
+Usage: python benchmarks/bench_analytics.py [jobs]
+"""
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from stub_upstream import StubServer
+
+
+def loopCorrelate(values):
+    """the correlation of every pair of columns, one pair at a time over the rows that have both"""
+    import numpy as np
+
+    count = values.shape[1]
+    r = np.full((count, count), np.nan)
+    for i in range(count):
+        for j in range(count):
+            both = ~(np.isnan(values[:, i]) | np.isnan(values[:, j]))
+            if both.sum() >= 3 and values[both, i].std() > 0 and values[both, j].std() > 0:
+                r[i, j] = np.corrcoef(values[both, i], values[both, j])[0, 1]
+    return r
+
+
+def main():
+    import numpy as np
+
+    jobs = int(sys.argv[1]) if len(sys.argv) > 1 else 10
+    server = StubServer(latency=0.001)
+    os.environ['URBAN_AREAS_API'] = server.url
+    import QualityBackEnd as qb
+    from QualityAnalytics import correlate, regress
+
+    u = qb.UrbanAreas()
+    start = time.perf_counter()
+    table = u.getFeatureTable(jobs=u.getJobs()[:jobs], costs=True)
+    print(f'built table of {len(table.areas)} urban areas x {len(table.features)} features in '
+          f'{(time.perf_counter() - start) * 1000:.1f} ms ({np.isnan(table.values).mean():.0%} missing)')
+
+    start = time.perf_counter()
+    r, _ = correlate(table)
+    vectorized = time.perf_counter() - start
+    start = time.perf_counter()
+    expected = loopCorrelate(table.values)
+    looped = time.perf_counter() - start
+    print(f'correlations: {vectorized * 1000:.1f} ms in one pass, {looped * 1000:.1f} ms pair by pair '
+          f'(largest difference {np.nanmax(np.abs(r - expected)):.1e})')
+
+    start = time.perf_counter()
+    regress(table, table.features[-1])
+    print(f'regressions against one feature: {(time.perf_counter() - start) * 1000:.1f} ms')
+    server.stop()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,86 @@
+"""
+Description: Benchmark for the tiled world map. For a small and a large source image from the stub server, builds the
+tile pyramid once, then draws a world view and a regional view from the tiles (with the tiles loaded from disk, and
+again once they are kept in memory) and compares them with drawing the whole source image, as plotMap used to.
+
+Usage: python benchmarks/bench_basemap.py [widths...]
+"""
+
+import os
+import shutil
+import sys
+import tempfile
+import time
+from io import BytesIO
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import matplotlib
+
+matplotlib.use('Agg')
+
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+
+from stub_upstream import worldMap
+
+VIEWS = {'world': (-180, -90, 180, 90), 'region': (-10, 35, 30, 60)}  # west, south, east, north
+
+
+def timeDraw(draw, repeats=3):
+    """draws a map on a new figure several times
+
+    :return: the median time in ms
+    """
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fig = Figure(figsize=(10, 7))
+        ax = fig.add_subplot()
+        draw(ax)
+        FigureCanvasAgg(fig).draw()
+        times.append(time.perf_counter() - start)
+        fig.clear()
+    times.sort()
+    return times[len(times) // 2] * 1000
+
+
+def main():
+    widths = [int(w) for w in sys.argv[1:]] or [1280, 8192]
+    from PIL import Image
+    from QualityTiles import TilePyramid
+
+    work = tempfile.mkdtemp()
+    try:
+        for width in widths:
+            jpeg = worldMap(width)
+            directory = os.path.join(work, str(width))
+            start = time.perf_counter()
+            TilePyramid.build(directory, Image.open(BytesIO(jpeg)))
+            print(f'source {width}x{width // 2}: built the tiles once in {(time.perf_counter() - start) * 1000:.0f} ms')
+
+            def whole(ax, bounds):
+                ax.imshow(Image.open(BytesIO(jpeg)), extent=(-180, 180, -90, 90))
+                ax.set_xlim(bounds[0], bounds[2])
+                ax.set_ylim(bounds[1], bounds[3])
+
+            for name, bounds in VIEWS.items():
+                pyramid = TilePyramid(directory)
+
+                def tiled(ax):
+                    image, extent = pyramid.render(*bounds, width=1000)
+                    ax.imshow(image, extent=extent)
+
+                cold = timeDraw(tiled, repeats=1)
+                loaded = pyramid.loaded
+                warm = timeDraw(tiled)
+                full = timeDraw(lambda ax: whole(ax, bounds))
+                print(f'  {name:<6}: whole image {full:7.0f} ms, tiles from disk {cold:6.0f} ms ({loaded} tiles), '
+                      f'tiles in memory {warm:6.0f} ms')
+    finally:
+        shutil.rmtree(work, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,90 @@
+"""
+Description: Benchmark for the adaptive concurrency controller. Retrieves the salaries and scores of every urban area
+from the stub server, first with a range of fixed concurrency limits to find the best the server allows, then with the
+adaptive controller, and compares the throughput and the number of throttled (429) requests. Every adaptive round is
+followed by a round with the best fixed limit, so that both are measured while the machine is equally busy. The
+adaptive controller passes when its steady state (the median of the rounds after the first) reaches REQUIRED_SHARE of
+the best fixed limit's, without a single throttled request in any round.
+
+Usage: python benchmarks/bench_concurrency.py [rounds]
+"""
+
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from stub_upstream import StubServer
+
+FIXED = (4, 8, 16, 24, 32)
+REPEATS = 3  # runs of every fixed limit, the median is kept since a single run varies by a tenth or more
+REQUIRED_SHARE = 0.85
+
+
+def run(qb, server, urls):
+    """retrieves every url once
+
+    :return: a tuple containing (requests per second, pages retrieved, requests throttled by the server)
+    """
+    with qb._cacheLock:  # every round retrieves the pages from the server instead of the cache
+        qb._cache.clear()
+        assert not qb._pending
+    server.resetCounters()
+    start = time.perf_counter()
+    pages = qb._fetchAll(urls)
+    elapsed = time.perf_counter() - start
+    return len(urls) / elapsed, len(pages), server.throttled
+
+
+def main():
+    rounds = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    server = StubServer()
+    os.environ['URBAN_AREAS_API'] = server.url
+    import QualityBackEnd as qb
+
+    hrefs = [server.url + f'urban_areas/slug:{slug}/' for slug in server.catalog.areas]
+    urls = [h + 'salaries/' for h in hrefs] + [h + 'scores/' for h in hrefs]
+    qb._fetchAll(urls[:8])  # warms up the connections
+    print(f'stub: {len(urls)} pages per round, {server.latency * 1000:.0f} ms latency, capacity {server.capacity}, '
+          f'429 past {server.limit} open requests')
+
+    best, bestRate = None, 0
+    for n in FIXED:
+        rates = []
+        for _ in range(REPEATS):
+            qb._controller = qb._ConcurrencyController(initial=n, minimum=n, maximum=n)
+            rate, got, throttled = run(qb, server, urls)
+            rates.append(rate if got == len(urls) else 0)
+        if statistics.median(rates) > bestRate:
+            best, bestRate = n, statistics.median(rates)
+        print(f'fixed {n:>2}:   {statistics.median(rates):7.1f} req/s (median of {REPEATS}), {got}/{len(urls)} pages, '
+              f'{throttled} throttled in the last run')
+
+    adaptive = qb._ConcurrencyController()
+    rates, fixedRates = [], []
+    total = 0
+    for r in range(rounds):
+        qb._controller = adaptive
+        rate, got, throttled = run(qb, server, urls)
+        rates.append(rate if got == len(urls) else 0)
+        total += throttled
+        print(f'adaptive round {r + 1}: {rate:7.1f} req/s, {got}/{len(urls)} pages, {throttled} throttled, '
+              f'limit now {adaptive.getLimit()}, peak open at server {server.peak}')
+        qb._controller = qb._ConcurrencyController(initial=best, minimum=best, maximum=best)
+        rate, got, throttled = run(qb, server, urls)
+        fixedRates.append(rate if got == len(urls) else 0)
+        print(f'  fixed {best:>2}:       {rate:7.1f} req/s, {got}/{len(urls)} pages, {throttled} throttled')
+    server.stop()
+
+    share = statistics.median(rates[1:] or rates) / statistics.median(fixedRates[1:] or fixedRates)
+    ok = share >= REQUIRED_SHARE and total == 0
+    print(f'[{"OK" if ok else "FAIL"}] adaptive steady state is {share:.0%} of the best fixed limit '
+          f'({REQUIRED_SHARE:.0%} required), {total} requests throttled in total (0 allowed)')
+    return 0 if ok else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
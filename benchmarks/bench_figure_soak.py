@@ -0,0 +1,98 @@
+"""
+Description: Memory soak benchmark for the plots. Opens and closes 500 charts from the back end against the stub server,
+drawing each one like the plotting window does, and reports the resident memory along the way. With the figures made
+outside of pyplot the memory should stay flat after the first charts. The pyplot mode keeps every figure registered
+with pyplot, like the application did before, to show the growth for comparison.
+
+Usage: python benchmarks/bench_figure_soak.py [charts] [figure|reuse|pyplot]
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import matplotlib
+import numpy as np
+
+matplotlib.use('Agg')
+
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+from stub_upstream import StubServer
+
+ALLOWED_GROWTH_MB = 10  # growth allowed from the first fifth of the charts to the end, along the fitted trend
+
+
+def rss():
+    """gets the resident memory of this process in MB"""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 2 ** 20
+    except OSError:
+        import resource
+
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def main():
+    charts = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    mode = sys.argv[2] if len(sys.argv) > 2 else 'figure'
+
+    server = StubServer(latency=0.001)
+    os.environ['URBAN_AREAS_API'] = server.url
+    os.environ['URBAN_AREAS_MAP'] = server.mapUrl
+    import QualityBackEnd as qb
+    import matplotlib.pyplot as plt
+
+    u = qb.UrbanAreas()
+    areas = u.getUrbanAreas()[:10]
+    plots = [
+        lambda fig: u.plotSalaries('Account Manager', areas, fig),
+        lambda fig: u.plotCompareQuality('Housing', areas, fig),
+        lambda fig: u.plotAllQuality(areas[0], fig),
+        lambda fig: u.plotCostOfLiving(areas[1], fig),
+        lambda fig: u.plotPurchasingPower('Account Manager', areas, fig=fig),
+        lambda fig: u.plotMap(areas[0], areas[1:], fig),
+    ]
+
+    reused = None
+    samples = []  # (charts, MB) after every round of the plots, so that each is taken at the same point in the round
+    for i in range(charts):
+        if mode == 'pyplot':
+            fig = plots[i % len(plots)](plt.figure(figsize=(12, 8)))  # never closed, as PlotWin used to do
+        elif mode == 'reuse':
+            reused = fig = plots[i % len(plots)](reused)
+        else:
+            fig = plots[i % len(plots)](None)
+        FigureCanvasAgg(fig).draw()
+        if mode == 'figure':
+            fig.clear()  # what PlotWin does when its window is closed
+        del fig
+
+        if (i + 1) % len(plots) == 0:
+            samples.append((i + 1, rss()))
+        if (i + 1) % (charts // 10 or 1) == 0:
+            print(f'{i + 1:>4} charts: {rss():7.1f} MB')
+
+    # the memory swings by tens of MB within a round of the different plots, so the growth is the slope of a line
+    # fitted through the samples after the first fifth, once the caches are warm, rather than the last minus the first
+    steady = np.array(samples[len(samples) // 5:], dtype=float).reshape(-1, 2)
+    if len(steady) > 1:
+        growth = np.polyfit(steady[:, 0], steady[:, 1], 1)[0] * (steady[-1, 0] - steady[0, 0])
+        print(f'{mode}: grew {growth:.1f} MB from {steady[0, 0]:.0f} to {steady[-1, 0]:.0f} charts along the trend '
+              f'(allowed {ALLOWED_GROWTH_MB} MB)')
+    else:
+        growth = 0.0
+        print(f'{mode}: too few charts to measure the growth')
+    server.stop()
+    if mode != 'pyplot' and growth > ALLOWED_GROWTH_MB:
+        print('[FAIL] memory is growing with every chart')
+        return 1
+    print('[OK]' if mode != 'pyplot' else '')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
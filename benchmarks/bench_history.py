@@ -0,0 +1,58 @@
+"""
+Description: Benchmark for the history of scores and salaries. Records a year of daily snapshots of made up values
+(with a small share of them changing every day) into a new history file, then reports the time to record a snapshot,
+the size of the file against writing every value every day, and the time of the queries.
+
+Usage: python benchmarks/bench_history.py [snapshots] [share of values changing per snapshot]
+"""
+
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def main():
+    import numpy as np
+    from QualityHistory import HistoryStore
+
+    snapshots = int(sys.argv[1]) if len(sys.argv) > 1 else 365
+    share = float(sys.argv[2]) if len(sys.argv) > 2 else 0.01
+    rng = np.random.default_rng(0)
+    areas = [f'City {i:03d}' for i in range(266)]
+    features = [f'Metric {i}' for i in range(17)] + [f'Job {j} p{p}' for j in range(50) for p in (25, 50, 75)]
+    values = rng.uniform(0, 10, (len(areas), len(features)))
+
+    path = os.path.join(tempfile.mkdtemp(), 'history.sqlite')
+    history = HistoryStore(path)
+    day = 86400
+    first = time.time() - snapshots * day
+    times = []
+    for s in range(snapshots):
+        changing = rng.random(values.shape) < share
+        values = np.where(changing, values * rng.uniform(0.9, 1.1, values.shape), values)
+        start = time.perf_counter()
+        history.record(areas, features, values, taken=first + s * day)
+        times.append(time.perf_counter() - start)
+
+    cells = values.size
+    print(f'{snapshots} snapshots of {len(areas)} urban areas x {len(features)} features ({share:.0%} changing): '
+          f'first {times[0] * 1000:.0f} ms, then {np.median(times[1:]) * 1000:.1f} ms each')
+    print(f'file {os.path.getsize(path) / 2 ** 20:.1f} MiB, {cells * snapshots * 8 / 2 ** 20:.1f} MiB for every value '
+          f'of every snapshot as raw floats')
+
+    for name, query in (('series of one value', lambda: history.series(areas[7], features[3])),
+                        ('one feature of every area a month ago', lambda: history.valuesAt(features[40],
+                                                                                          time.time() - 30 * day)),
+                        ('areas that changed the most', lambda: history.biggestChanges(features[40], n=10))):
+        start = time.perf_counter()
+        for _ in range(20):
+            query()
+        print(f'{name}: {(time.perf_counter() - start) / 20 * 1000:.2f} ms')
+    history.close()
+
+
+if __name__ == '__main__':
+    main()
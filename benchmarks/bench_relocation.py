@@ -0,0 +1,70 @@
+"""
+Description: Benchmark for scoring urban areas to move to for many people. Writes a CSV of random people (jobs,
+coordinates and weights), then times loading the data of every urban area from the stub server, scoring every urban
+area for every person and writing the shortlists, and fails if scoring 10000 people takes over five seconds.
+
+Usage: python benchmarks/bench_relocation.py [people]
+"""
+
+import csv
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from stub_upstream import StubServer
+
+LIMIT_SECONDS = 5  # for scoring 10000 people, once the data is loaded
+
+
+def main():
+    import numpy as np
+
+    people = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    server = StubServer(latency=0.001)
+    os.environ['URBAN_AREAS_API'] = server.url
+    import QualityBackEnd as qb
+    from QualityRelocation import readProfiles, relocate
+
+    u = qb.UrbanAreas()
+    rng = np.random.default_rng(0)
+    jobs = u.getJobs()[:20] + ['Unknown Job']
+    weightColumns = u.getMetrics()[:6] + ['Salary', 'Distance']
+
+    directory = tempfile.mkdtemp()
+    profiles = os.path.join(directory, 'profiles.csv')
+    with open(profiles, 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(['name', 'job', 'latitude', 'longitude'] + weightColumns)
+        for i in range(people):
+            writer.writerow([f'person {i}', jobs[rng.integers(len(jobs))], f'{rng.uniform(-40, 60):.4f}',
+                             f'{rng.uniform(-170, 170):.4f}'] + list(rng.integers(0, 6, len(weightColumns))))
+
+    start = time.perf_counter()
+    scorer = u.getRelocationScorer(jobs)
+    loaded = time.perf_counter() - start
+    names, profileJobs, latitudes, longitudes, weights = readProfiles(profiles, scorer.getCriteria())
+    start = time.perf_counter()
+    scorer.score(profileJobs, latitudes, longitudes, weights, 5)
+    scored = time.perf_counter() - start
+
+    start = time.perf_counter()
+    relocate(u, profiles, os.path.join(directory, 'shortlists.csv'), 5)  # the data is cached by now
+    whole = time.perf_counter() - start
+    print(f'loaded {len(scorer.getAreas())} urban areas and {len(jobs) - 1} jobs in {loaded * 1000:.0f} ms')
+    print(f'scored {people} people in {scored * 1000:.0f} ms, reading and writing the CSVs as well in '
+          f'{whole * 1000:.0f} ms')
+    server.stop()
+
+    limit = LIMIT_SECONDS * people / 10000
+    if scored > limit:
+        print(f'[FAIL] scoring took over {limit:.1f} s')
+        sys.exit(1)
+    print('[OK]')
+
+
+if __name__ == '__main__':
+    main()
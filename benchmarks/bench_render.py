@@ -0,0 +1,69 @@
+"""
+Description: Benchmark for drawing charts of many urban areas. Draws plotCompareQuality and plotSalaries for 10, 100
+and 266 urban areas from the stub server, with the pages already cached, once with one bar per urban area (as every
+chart used to be drawn) and once with the view chosen by the number of urban areas (sorted pages of horizontal bars or
+the distribution), and reports the time to build and draw each chart.
+
+Usage: python benchmarks/bench_render.py [repeats]
+"""
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import matplotlib
+
+matplotlib.use('Agg')
+
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+from stub_upstream import StubServer
+
+SIZES = (10, 100, 266)
+
+
+def timeChart(plot, repeats):
+    """builds and draws a chart several times
+
+    :return: the median time in ms
+    """
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fig = plot()
+        FigureCanvasAgg(fig).draw()
+        times.append(time.perf_counter() - start)
+        fig.clear()
+    times.sort()
+    return times[len(times) // 2] * 1000
+
+
+def main():
+    repeats = int(sys.argv[1]) if len(sys.argv) > 1 else 3
+    server = StubServer(latency=0.001)
+    os.environ['URBAN_AREAS_API'] = server.url
+    import QualityBackEnd as qb
+
+    u = qb.UrbanAreas()
+    areas = u.getUrbanAreas()
+    u.getScores(areas)  # caches the pages, so only drawing is timed
+    u.getSalaries('Account Manager', areas)
+
+    charts = {
+        'plotCompareQuality': lambda n, view: lambda: u.plotCompareQuality('Housing', areas[:n], view=view),
+        'plotSalaries': lambda n, view: lambda: u.plotSalaries('Account Manager', areas[:n], view=view),
+    }
+    print(f'{"chart":<20} {"areas":>5} {"one bar each ms":>16} {"auto ms":>9}  auto view')
+    for name, chart in charts.items():
+        for n in SIZES:
+            bars = timeChart(chart(n, 'bars'), repeats)
+            auto = timeChart(chart(n, 'auto'), repeats)
+            print(f'{name:<20} {n:>5} {bars:>16.0f} {auto:>9.0f}  {qb._chooseView("auto", n)}')
+    server.stop()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,94 @@
+"""
+Description: Load test for the HTTP service. Starts the stub upstream and the service, then has many clients send a mix
+of data and chart requests (with many of them identical, as happens when several tools ask for the same areas) for a
+set time, and reports requests per second, latency percentiles and how many requests reached the upstream.
+
+Usage: python benchmarks/bench_service.py [clients] [seconds]
+"""
+
+import os
+import random
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import matplotlib
+
+matplotlib.use('Agg')
+
+from stub_upstream import StubServer
+
+
+def main():
+    clients = int(sys.argv[1]) if len(sys.argv) > 1 else 32
+    seconds = float(sys.argv[2]) if len(sys.argv) > 2 else 10
+
+    upstream = StubServer()
+    os.environ['URBAN_AREAS_API'] = upstream.url
+    os.environ['URBAN_AREAS_MAP'] = upstream.mapUrl
+    import requests
+    from QualityService import UrbanAreasService
+
+    service = UrbanAreasService(port=0)
+    threading.Thread(target=service.serve_forever, daemon=True).start()
+    areas = service.urbanAreas.getUrbanAreas()
+    upstream.resetCounters()
+
+    def randomPath(rng):
+        picks = '&'.join('area=' + a for a in rng.sample(areas[:40], 5))
+        return rng.choice([
+            'areas',
+            f'scores?{picks}',
+            f'salaries?job=Account+Manager&{picks}',
+            f'cost-of-living?{picks}',
+            f'distances?from=Aarhus&{picks}',
+            f'nearest?lat={rng.randint(-40, 60)}&lon={rng.randint(-170, 170)}',
+            f'chart/compare-quality.png?metric=Housing&{picks}',
+            f'chart/all-quality.png?area={rng.choice(areas[:40])}',
+        ])
+
+    latencies = {'json': [], 'png': []}
+    errors = [0]
+    lock = threading.Lock()
+    stop = time.perf_counter() + seconds
+
+    def client(seed):
+        rng = random.Random(seed)
+        session = requests.Session()
+        while time.perf_counter() < stop:
+            path = randomPath(rng)
+            start = time.perf_counter()
+            response = session.get(service.url + path)
+            elapsed = time.perf_counter() - start
+            with lock:
+                latencies['png' if '.png' in path else 'json'].append(elapsed)
+                if response.status_code != 200:
+                    errors[0] += 1
+
+    threads = [threading.Thread(target=client, args=(i % 8,)) for i in range(clients)]  # 8 distinct request streams
+    begin = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - begin
+
+    total = sum(len(v) for v in latencies.values())
+    print(f'{clients} clients for {elapsed:.1f} s: {total / elapsed:.1f} requests/s, {errors[0]} errors, '
+          f'{upstream.served} upstream requests ({upstream.throttled} throttled)')
+    for kind, values in latencies.items():
+        if values:
+            values.sort()
+            p = lambda q: values[min(len(values) - 1, int(q * len(values)))] * 1000
+            print(f'  {kind:>4}: {len(values):6d} requests, p50 {p(0.5):7.1f} ms, p99 {p(0.99):7.1f} ms')
+
+    service.shutdown()
+    service.server_close()
+    upstream.stop()
+
+
+if __name__ == '__main__':
+    main()
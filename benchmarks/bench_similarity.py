@@ -0,0 +1,53 @@
+"""
+Description: Benchmark for the similarity index. Builds the index of every urban area from the stub server, then
+reports the time of a nearest neighbour query, of clustering the catalog with k-means, and of bringing the index up to
+date after some of the score pages change.
+
+Usage: python benchmarks/bench_similarity.py [queries]
+"""
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from stub_upstream import StubServer
+
+
+def main():
+    queries = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    server = StubServer(latency=0.001)
+    os.environ['URBAN_AREAS_API'] = server.url
+    import QualityBackEnd as qb
+
+    u = qb.UrbanAreas()
+    areas = u.getUrbanAreas()
+
+    start = time.perf_counter()
+    index = u.getSimilarityIndex()
+    print(f'built index of {len(index)} urban areas x {len(index.getFeatures())} features in '
+          f'{(time.perf_counter() - start) * 1000:.1f} ms (retrieving the score pages)')
+
+    index.nearest(areas[0])  # normalizes the matrix
+    start = time.perf_counter()
+    for i in range(queries):
+        index.nearest(areas[i % len(areas)], 5)
+    print(f'nearest 5: {(time.perf_counter() - start) / queries * 1e6:.1f} us per query')
+
+    for k in (4, 8, 16):
+        start = time.perf_counter()
+        u.clusterAreas(k)
+        print(f'k-means with k={k}: {(time.perf_counter() - start) * 1000:.1f} ms')
+
+    for area in areas[:10]:
+        qb._indexPageChanged(u._urbanAreasID[area] + 'scores/')
+    start = time.perf_counter()
+    u.similarAreas(areas[0])
+    print(f'query after 10 urban areas changed: {(time.perf_counter() - start) * 1000:.1f} ms')
+    server.stop()
+
+
+if __name__ == '__main__':
+    main()
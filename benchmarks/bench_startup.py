@@ -0,0 +1,66 @@
+"""
+Description: Start up benchmark for the application. Imports the back end and the front end in a fresh interpreter with
+python -X importtime and checks that the total import time stays within a budget and that the heavy modules (requests,
+matplotlib and PIL) are not loaded until a feature needs them.
+
+Usage: python benchmarks/bench_startup.py [budget in milliseconds] [number of runs]
+"""
+
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MODULES = ('QualityBackEnd', 'QualityFrontEnd')
+DEFERRED = ('requests', 'matplotlib', 'PIL')
+BUDGET_MS = 150  # budget for importing both modules, including tkinter
+
+
+def importTimes():
+    """imports the application modules in a new interpreter with -X importtime
+
+    :return: a dictionary with the name of every imported module as keys and the cumulative import time in microseconds
+    as values
+    """
+    code = 'import ' + ', '.join(MODULES)
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', code], cwd=ROOT, capture_output=True, text=True,
+                            check=True)
+
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        times[name.strip()] = int(cumulative)
+    return times
+
+
+def main():
+    budget = float(sys.argv[1]) if len(sys.argv) > 1 else BUDGET_MS
+    runs = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+
+    totals = []
+    loaded = set()
+    for _ in range(runs):
+        times = importTimes()
+        totals.append(sum(times[m] for m in MODULES) / 1000)
+        loaded |= {m for m in DEFERRED if m in times}
+
+    best = min(totals)
+    print(f'import {", ".join(MODULES)}: best {best:.1f} ms, worst {max(totals):.1f} ms over {runs} runs '
+          f'(budget {budget:.0f} ms)')
+
+    failed = False
+    if loaded:
+        print('[FAIL] imported at start up:', ', '.join(sorted(loaded)))
+        failed = True
+    if best > budget:
+        print('[FAIL] start up is over budget')
+        failed = True
+    if not failed:
+        print('[OK]')
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
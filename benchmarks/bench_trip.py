@@ -0,0 +1,66 @@
+"""
+Description: Benchmark for the trip planner. Plans trips through random points on the earth for a range of sizes and
+reports the time to solve each one and how much shorter the improved trip is than the nearest neighbour trip it starts
+from. Then plans a trip through 50 urban areas from the stub server through UrbanAreas.planTrip(), where the pages are
+already cached, to check that the planner stays interactive.
+
+Usage: python benchmarks/bench_trip.py [repeats]
+"""
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import numpy as np
+
+from stub_upstream import StubServer
+
+SIZES = (10, 25, 50, 100, 150, 200, 266)
+BUDGET_MS = 1000  # the most a trip through 50 urban areas may take to plan
+
+
+def main():
+    repeats = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    from QualityTrip import distanceMatrix, planTour, tourLength, _nearestNeighbour
+
+    rng = np.random.default_rng(0)
+    print(f'{"N":>4} {"one way ms":>11} {"round trip ms":>14} {"shorter than nearest neighbour":>31}')
+    for n in SIZES:
+        times = {False: [], True: []}
+        gains = []
+        for _ in range(repeats):
+            d = distanceMatrix(rng.uniform(-60, 70, n + 1), rng.uniform(-180, 180, n + 1))
+            for roundTrip in (False, True):
+                start = time.perf_counter()
+                order = planTour(d, roundTrip)
+                times[roundTrip].append(time.perf_counter() - start)
+            greedy = tourLength(d, _nearestNeighbour(d).tolist(), True)
+            gains.append(1 - tourLength(d, order, True) / greedy)
+        print(f'{n:>4} {np.median(times[False]) * 1000:>11.1f} {np.median(times[True]) * 1000:>14.1f} '
+              f'{np.mean(gains):>30.1%}')
+
+    server = StubServer(latency=0.001)
+    os.environ['URBAN_AREAS_API'] = server.url
+    import QualityBackEnd as qb
+
+    u = qb.UrbanAreas()
+    areas = u.getUrbanAreas()
+    u.planTrip(areas[0], areas[1:51])  # retrieves and caches the pages
+    start = time.perf_counter()
+    order, legs, total = u.planTrip(areas[0], areas[1:51], roundTrip=True)
+    elapsed = (time.perf_counter() - start) * 1000
+    server.stop()
+
+    print(f'planTrip through 50 urban areas: {elapsed:.1f} ms, {total:.1f} hours by flight (budget {BUDGET_MS} ms)')
+    if elapsed > BUDGET_MS:
+        print('[FAIL] planning a trip is too slow to stay interactive')
+        return 1
+    print('[OK]')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,257 @@
+"""
+Description: A local stand-in for the Teleport API used by the benchmarks. It serves made up but repeatable data for the
+pages the back end reads (urban areas, salaries, scores, details, images and locations) and acts like a busy server:
+every request takes a set latency, the latency grows once more than `capacity` requests are open at once, and past
+`limit` open requests the server answers 429 with a Retry-After header.
+
+Usage: python benchmarks/stub_upstream.py [port]
+then run the application with URBAN_AREAS_API=http://127.0.0.1:<port>/api/ and
+URBAN_AREAS_MAP=http://127.0.0.1:<port>/map.jpg
+"""
+
+import json
+import math
+import random
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, unquote, urlsplit
+
+NAMES = ['Aarhus', 'Adelaide', 'Albuquerque', 'Almaty', 'Amsterdam', 'Anchorage', 'Andorra', 'Ankara', 'Asheville',
+         'Asuncion', 'Athens', 'Atlanta', 'Auckland', 'Austin', 'Baku', 'Bangalore', 'Bangkok', 'Barcelona', 'Beijing',
+         'Beirut', 'Belfast', 'Belgrade', 'Berlin', 'Bogota', 'Boston', 'Brisbane', 'Brussels', 'Bucharest', 'Budapest',
+         'Buenos Aires', 'Cairo', 'Calgary', 'Cape Town', 'Chicago', 'Copenhagen', 'Dallas', 'Delhi', 'Denver', 'Dubai',
+         'Dublin', 'Edinburgh', 'Helsinki', 'Hong Kong', 'Istanbul', 'Lisbon', 'London', 'Madrid', 'Melbourne',
+         'Montreal', 'Oslo', 'Paris', 'Prague', 'Seoul', 'Stockholm', 'Sydney', 'Tokyo', 'Toronto', 'Vienna', 'Zurich']
+
+JOBS = ['Account Manager', 'Accountant', 'Administrative Assistant', 'Architect', 'Business Analyst', 'C++ Developer',
+        'Cashier', 'Chemical Engineer', 'Chief Executive Officer', 'Civil Engineer', 'Data Analyst', 'Data Scientist',
+        'Dentist', 'Designer', 'Doctor', 'Electrical Engineer', 'Executive Assistant', 'Finance Manager',
+        'Graphic Designer', 'Hardware Engineer', 'Human Resources Manager', 'IT Manager', 'Industrial Designer',
+        'Java Developer', 'Lawyer', 'Marketing Manager', 'Mechanical Engineer', 'Mobile Developer', 'Nurse',
+        'Office Manager', 'Operations Manager', 'Pharmacist', 'Physician', 'Product Manager', 'Project Manager',
+        'Python Developer', 'QA Engineer', 'Receptionist', 'Research Scientist', 'Sales Manager', 'Software Engineer',
+        'Systems Administrator', 'Teacher', 'UX Designer', 'Web Developer', 'Web Designer']
+
+METRICS = ['Housing', 'Cost of Living', 'Startups', 'Venture Capital', 'Travel Connectivity', 'Commute',
+           'Business Freedom', 'Safety', 'Healthcare', 'Education', 'Environmental Quality', 'Economy', 'Taxation',
+           'Internet Access', 'Leisure & Culture', 'Tolerance', 'Outdoors']
+
+COSTS = [('COST-APPLES', 'A kilogram of Apples', 3), ('COST-BREAD', 'Bread', 2.5), ('COST-CAPPUCCINO', 'Cappuccino', 3),
+         ('COST-CINEMA', 'Movie ticket', 11), ('COST-FITNESS-CLUB', 'Monthly fitness club membership', 45),
+         ('COST-IMPORT-BEER', 'A beer', 5), ('COST-PUBLIC-TRANSPORT', 'Monthly public transport', 60),
+         ('COST-RESTAURANT-MEAL', 'Lunch', 14), ('COST-TAXI', '5km taxi ride', 10),
+         ('COST-APARTMENT-SMALL', 'Small apartment', 1100)]
+
+# a 1x1 PNG, served for the urban area images
+PIXEL = bytes.fromhex('89504e470d0a1a0a0000000d49484452000000010000000108060000001f15c4890000000d4944415478da63f8cf'
+                      'c0f01f0005000201a5f3e0f20000000049454e44ae426082')
+
+
+_maps = {}  # width -> JPEG
+
+
+def worldMap(width=1280):
+    """draws a stand-in for the world map, a JPEG twice as wide as it is tall with a line every 30 degrees
+
+    :param width: the width of the image in pixels, the /map.jpg?width=... of the stub
+    """
+    if width not in _maps:
+        from io import BytesIO
+        from PIL import Image, ImageDraw
+
+        height = width // 2
+        img = Image.new('RGB', (width, height), (170, 200, 230))
+        draw = ImageDraw.Draw(img)
+        for x in range(0, width, width // 12):
+            draw.line([(x, 0), (x, height)], fill=(90, 120, 150), width=max(1, width // 1280))
+        for y in range(0, height, height // 6):
+            draw.line([(0, y), (width, y)], fill=(90, 120, 150), width=max(1, width // 1280))
+        buffer = BytesIO()
+        img.save(buffer, 'JPEG')
+        _maps[width] = buffer.getvalue()
+    return _maps[width]
+
+
+def slugOf(name):
+    return name.lower().replace(' ', '-')
+
+
+class Catalog:
+    """the made up data served by the stub, generated from a seed so that every run serves the same values"""
+
+    def __init__(self, size=266, seed=0):
+        rng = random.Random(seed)
+        names = NAMES[:size] + [f'City {i:03d}' for i in range(len(NAMES), size)]
+        self.areas = {}
+        for name in names:
+            lat = rng.uniform(-50, 65)
+            lon = rng.uniform(-170, 175)
+            price = rng.uniform(0.4, 1.8)
+            self.areas[slugOf(name)] = {
+                'name': name,
+                'latlon': {'north': lat + 0.3, 'south': lat - 0.3, 'east': lon + 0.3, 'west': lon - 0.3},
+                'salaries': {job: sorted(rng.uniform(15000, 160000) * price for _ in range(3)) for job in JOBS
+                             if rng.random() > 0.05},
+                'scores': [round(rng.uniform(0, 10), 3) for _ in METRICS],
+                'costs': None if rng.random() < 0.1 else [round(c * price * rng.uniform(0.8, 1.2), 2)
+                                                          for _, _, c in COSTS],
+            }
+
+    def page(self, base, path):
+        """builds the JSON for a path below /api/
+
+        :return: the decoded JSON, or None if there is no such page
+        """
+        parts = [p for p in path.split('/') if p]
+        if parts == ['urban_areas']:
+            return {'count': len(self.areas), '_links': {'ua:item': [
+                {'name': a['name'], 'href': f'{base}urban_areas/slug:{slug}/'} for slug, a in self.areas.items()]}}
+
+        if len(parts) >= 2 and parts[0] == 'urban_areas' and parts[1].startswith('slug:'):
+            a = self.areas.get(parts[1][len('slug:'):])
+            if a is None:
+                return None
+            section = parts[2] if len(parts) > 2 else ''
+            if section == '':
+                return {'name': a['name'], 'bounding_box': {'latlon': a['latlon']}}
+            if section == 'salaries':
+                return {'salaries': [{'job': {'id': slugOf(job).upper(), 'title': job},
+                                      'salary_percentiles': {'percentile_25': p[0], 'percentile_50': p[1],
+                                                             'percentile_75': p[2]}}
+                                     for job, p in a['salaries'].items()]}
+            if section == 'scores':
+                return {'categories': [{'name': m, 'score_out_of_10': s, 'color': '#f3c32c'}
+                                       for m, s in zip(METRICS, a['scores'])],
+                        'teleport_city_score': sum(a['scores']) * 100 / (10 * len(METRICS))}
+            if section == 'details':
+                categories = [{'id': 'CLIMATE', 'label': 'Climate',
+                               'data': [{'id': 'WEATHER-TYPE', 'label': 'Weather type', 'string_value': 'mild'}]}]
+                if a['costs'] is not None:
+                    data = [{'id': 'CONSUMER-PRICE-INDEX-TELESCORE', 'label': 'Inflation', 'float_value': 0.5}]
+                    data += [{'id': i, 'label': label, 'currency_dollar_value': c}
+                             for (i, label, _), c in zip(COSTS, a['costs'])]
+                    categories.append({'id': 'COST-OF-LIVING', 'label': 'Cost of Living', 'data': data})
+                return {'categories': categories}
+            if section == 'images':
+                return {'photos': [{'image': {'web': f'{base}images/{parts[1][len("slug:"):]}.png'}}]}
+            return None
+
+        if len(parts) == 2 and parts[0] == 'locations':
+            lat, lon = (float(v) for v in parts[1].split(','))
+
+            def distance(a):
+                box = a['latlon']
+                return math.hypot((box['north'] + box['south']) / 2 - lat, (box['east'] + box['west']) / 2 - lon)
+
+            slug, a = min(self.areas.items(), key=lambda item: distance(item[1]))
+            if distance(a) > 20:
+                return {'_embedded': {'location:nearest-urban-areas': [], 'location:nearest-cities': []}}
+            link = {'name': a['name'], 'href': f'{base}urban_areas/slug:{slug}/'}
+            return {'_embedded': {'location:nearest-urban-areas': [{'_links': {'location:nearest-urban-area': link}}],
+                                  'location:nearest-cities': [{'_links': {'location:nearest-city': link}}]}}
+        return None
+
+
+class StubServer(ThreadingHTTPServer):
+    """the stub server, with the load it is under and counters of what it served"""
+
+    daemon_threads = True
+    request_queue_size = 256
+
+    def __init__(self, port=0, size=266, latency=0.02, capacity=16, limit=24, retryAfter=1):
+        """starts serving on 127.0.0.1 in a background thread
+
+        :param port: the port to listen on, 0 picks a free one
+        :param size: the number of urban areas
+        :param latency: seconds every request takes when the server is not busy
+        :param capacity: open requests the server handles without slowing down
+        :param limit: open requests past which the server answers 429
+        :param retryAfter: seconds given in the Retry-After header of a 429
+        """
+        super().__init__(('127.0.0.1', port), _Handler)
+        self.catalog = Catalog(size)
+        self.latency = latency
+        self.capacity = capacity
+        self.limit = limit
+        self.retryAfter = retryAfter
+        self.url = f'http://127.0.0.1:{self.server_address[1]}/api/'
+        self.mapUrl = f'http://127.0.0.1:{self.server_address[1]}/map.jpg'
+        self.lock = threading.Lock()
+        self.inFlight = 0
+        self.served = 0
+        self.throttled = 0
+        self.peak = 0
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+
+    def resetCounters(self):
+        with self.lock:
+            self.served = self.throttled = self.peak = 0
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'  # keeps connections open, like the real API
+    disable_nagle_algorithm = True  # otherwise the headers and the body wait on each other over a kept open connection
+
+    def do_GET(self):
+        server = self.server
+        with server.lock:
+            server.inFlight += 1
+            server.peak = max(server.peak, server.inFlight)
+            busy = server.inFlight
+        try:
+            if busy > server.limit:
+                with server.lock:
+                    server.throttled += 1
+                self._send(429, b'{"message": "Too Many Requests"}', {'Retry-After': str(server.retryAfter)})
+                return
+
+            time.sleep(server.latency * max(1.0, busy / server.capacity))
+
+            path = self.path
+            while '%' in path and unquote(path) != path:  # the back end sends slug%3A and slug%253A
+                path = unquote(path)
+
+            if path.startswith('/api/images/'):
+                body, ctype = PIXEL, 'image/png'
+            elif path.split('?')[0] == '/map.jpg':
+                query = parse_qs(urlsplit(path).query)
+                body, ctype = worldMap(int(query.get('width', ['1280'])[0])), 'image/jpeg'
+            else:
+                page = server.catalog.page(server.url, path[len('/api/'):]) if path.startswith('/api/') else None
+                if page is None:
+                    self._send(404, b'{"message": "Not Found"}')
+                    return
+                body, ctype = json.dumps(page).encode(), 'application/json'
+            with server.lock:
+                server.served += 1
+            self._send(200, body, {'Content-Type': ctype})
+        finally:
+            with server.lock:
+                server.inFlight -= 1
+
+    def _send(self, status, body, headers=None):
+        self.send_response(status)
+        for k, v in (headers or {}).items():
+            self.send_header(k, v)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+if __name__ == '__main__':
+    s = StubServer(port=int(sys.argv[1]) if len(sys.argv) > 1 else 8765)
+    print('serving the stub API at', s.url)
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        s.stop()